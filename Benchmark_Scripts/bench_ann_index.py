@@ -0,0 +1,108 @@
+"""FAISS index types on synthetic corpora: memory, build time, QPS and recall.
+
+Vectors are clustered unit vectors of MiniLM's dimension, generated into a
+memmap so the 1M-vector corpus (1.5 GB) never has to fit in memory twice.
+Each index type from ann_index.INDEX_TYPES is built with its default
+parameters. For each type the script reports:
+- serialized index size
+- build time (training included)
+- single-query QPS
+- recall@k against the exact (flat) results for the same queries
+
+It then sweeps nprobe / ef_search to show the recall-speed trade-off that
+``python ann_index.py --nprobe N`` tunes.
+
+    python Benchmark_Scripts/bench_ann_index.py [--sizes 10000,100000,1000000] [--types flat,sq8,ivf_flat,ivf_pq,hnsw]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import bench_utils
+import faiss
+import numpy as np
+
+from ann_index import INDEX_TYPES, apply_search_params, build_faiss_index
+
+
+def synthetic_vectors(path, count, dim, clusters=1000, block=50000, seed=0):
+    # Real embeddings cluster by topic; uniform random vectors would make every ANN index look bad
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(count, dim))
+    for i in range(0, count, block):
+        n = min(block, count - i)
+        rows = centers[rng.integers(clusters, size=n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+        vectors[i:i + n] = rows / np.linalg.norm(rows, axis=1, keepdims=True)
+    vectors.flush()
+    return np.load(path, mmap_mode="r")
+
+
+def queries_like(vectors, count, seed=1):
+    # Perturbed corpus vectors, so queries land where the data is
+    rng = np.random.default_rng(seed)
+    rows = np.asarray(vectors[np.sort(rng.choice(len(vectors), size=count, replace=False))])
+    rows = rows + 0.3 * rng.standard_normal(rows.shape).astype(np.float32) / np.sqrt(rows.shape[1])
+    return np.ascontiguousarray(rows / np.linalg.norm(rows, axis=1, keepdims=True), dtype=np.float32)
+
+
+def timed_search(index, queries, k):
+    # One query at a time, like the API serves them
+    start = time.perf_counter()
+    results = [index.search(queries[i:i + 1], k)[1][0] for i in range(len(queries))]
+    return len(queries) / (time.perf_counter() - start), results
+
+
+def recall(results, truth):
+    return float(np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated corpus sizes (try 1000000)")
+    parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    parser.add_argument("--dim", type=int, default=bench_utils.EMBEDDING_DIM)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+    types = args.types.split(",")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in [int(x) for x in args.sizes.split(",")]:
+            vectors = synthetic_vectors(os.path.join(tmp, f"vectors_{count}.npy"), count, args.dim)
+            queries = queries_like(vectors, args.queries)
+            print(f"\n{count:,} vectors x {args.dim} dims ({vectors.nbytes / 2 ** 20:.0f} MB raw), "
+                  f"{args.queries} queries, recall@{args.k} vs flat")
+            print(f"{'type':>9} {'index MB':>9} {'build s':>8} {'QPS':>9} {'recall':>7}  params")
+
+            truth = None
+            for index_type in ["flat"] + [t for t in types if t != "flat"]:
+                start = time.perf_counter()
+                index, params = build_faiss_index(vectors, index_type)
+                build = time.perf_counter() - start
+                size = faiss.serialize_index(index).nbytes
+                qps, results = timed_search(index, queries, args.k)
+                if truth is None:
+                    truth = results
+                if index_type not in types:
+                    continue
+                shown = {key: value for key, value in params.items() if key != "type"}
+                print(f"{index_type:>9} {size / 2 ** 20:>9.1f} {build:>8.2f} {qps:>9.0f} "
+                      f"{recall(results, truth):>7.3f}  {shown}")
+
+                sweep = {"nprobe": [1, 4, 16, 64], "ef_search": [16, 32, 64, 128]}
+                for name, values in sweep.items():
+                    if name not in params:
+                        continue
+                    for value in values:
+                        if name == "nprobe" and value > params["nlist"]:
+                            continue
+                        apply_search_params(index, {name: value})
+                        qps, results = timed_search(index, queries, args.k)
+                        print(f"{'':>9} {'':>9} {'':>8} {qps:>9.0f} {recall(results, truth):>7.3f}  {name}={value}")
+                del index
+
+
+if __name__ == "__main__":
+    main()
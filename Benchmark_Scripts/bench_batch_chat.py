@@ -0,0 +1,122 @@
+"""Batch answering: /api/chat/batch vs a serial /api/chat loop.
+
+Drives the FastAPI app in-process with a stub LLM that sleeps --delay
+seconds per answer. The script reports questions/sec for the serial loop
+(one HTTP call per question, as the nightly jobs do today) and for the
+batch endpoint at several concurrency levels. It also times retrieval
+alone: per-question embed + search vs one vectorized embedding and one
+batched FAISS search. With --rate-limit-every N, every Nth LLM call in
+the batch runs fails with a 429, which exercises the shared cooldown and
+retries.
+
+    python Benchmark_Scripts/bench_batch_chat.py [--questions 64] [--delay 0.3] [--rate-limit-every 0]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+import bench_utils
+import httpx
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+import app
+from docstore import load_vectorstore
+from entity_router import EntityRouter
+from hybrid_retrieval import BM25Index
+from incremental_index import INDEX_DIR
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+    class response:
+        status_code = 429
+        headers = {"retry-after": "0.2"}
+
+
+def stub_llm(delay, rate_limit_every):
+    calls = itertools.count(1)
+
+    async def ainvoke(prompt_value):
+        if rate_limit_every and next(calls) % rate_limit_every == 0:
+            raise FakeRateLimitError("rate limit reached")
+        await asyncio.sleep(delay)
+        return AIMessage(content="Ad astra abyssosque, Traveler.")
+
+    return RunnableLambda(lambda prompt_value: AIMessage(content="Ad astra abyssosque, Traveler."), afunc=ainvoke)
+
+
+async def serial(client, questions):
+    start = time.perf_counter()
+    for question in questions:
+        r = await client.post("/api/chat", json={"message": question})
+        r.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def batch(client, questions, concurrency):
+    start = time.perf_counter()
+    results = []
+    async with client.stream("POST", "/api/chat/batch",
+                             json={"questions": questions, "concurrency": concurrency}) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if line:
+                results.append(json.loads(line))
+    return time.perf_counter() - start, results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=64)
+    parser.add_argument("--delay", type=float, default=0.3, help="stub LLM latency in seconds")
+    parser.add_argument("--levels", default="4,8,16", help="comma-separated batch concurrency levels")
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--embedder", default="auto")
+    args = parser.parse_args()
+
+    base = [item["question"] for item in bench_utils.load_questions()]
+    # Distinct wording per copy so the semantic cache can't answer repeats
+    questions = [f"{base[i % len(base)]} ({i // len(base) + 1})" if i >= len(base) else base[i]
+                 for i in range(args.questions)]
+
+    embedder = bench_utils.load_embedder(args.embedder)
+    app.embedder = embedder
+    app.vectorstore = load_vectorstore(INDEX_DIR, embedder)
+    app.bm25_index = BM25Index.load(INDEX_DIR)
+    app.entity_router = EntityRouter.from_vectorstore(app.vectorstore)
+    app.groq_llm = stub_llm(args.delay, 0)
+    app.rag_chain = app.setup_modern_rag_chain(app.vectorstore, app.groq_llm, app.bm25_index, app.entity_router)
+
+    # Retrieval alone
+    retriever = app.make_retriever(app.vectorstore, app.bm25_index, app.entity_router)
+    start = time.perf_counter()
+    for question in questions:
+        retriever.invoke(question)
+    per_question = time.perf_counter() - start
+    start = time.perf_counter()
+    retriever.documents_batch(questions, embedder.embed_documents(questions))
+    batched = time.perf_counter() - start
+    print(f"retrieval for {len(questions)} questions: per-question {per_question * 1000:.0f} ms, "
+          f"batched {batched * 1000:.0f} ms")
+
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        app.response_cache.invalidate()
+        elapsed = await serial(client, questions)
+        print(f"{'serial /api/chat':>24}: {len(questions) / elapsed:>7.2f} questions/s ({elapsed:.1f}s)")
+        # The serial endpoint has no retries of its own, so only batches see 429s
+        app.groq_llm = stub_llm(args.delay, args.rate_limit_every)
+        for level in [int(x) for x in args.levels.split(",")]:
+            elapsed, results = await batch(client, questions, level)
+            errors = sum("error" in r for r in results)
+            retries = sum(max(r["attempts"] - 1, 0) for r in results)
+            print(f"{f'batch, concurrency {level}':>24}: {len(questions) / elapsed:>7.2f} questions/s "
+                  f"({elapsed:.1f}s, {len(results)} results, {errors} errors, {retries} retries)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+"""Offline index build throughput (chunks/sec) and peak RSS by worker count.
+
+Each configuration runs build_index.py's pipeline in a fresh subprocess so
+peak RSS numbers don't leak between runs. The hash embedder burns
+--embed-ms of CPU per chunk to stand in for MiniLM.
+
+    python Benchmark_Scripts/bench_build_index.py [--workers 0,1,2,4] [--batch-size 64]
+"""
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import bench_utils
+
+import build_index
+
+
+def run_single(config):
+    factory = functools.partial(bench_utils.HashEmbeddings, cost_ms=config["embed_ms"])
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = build_index.build_index(os.path.join(tmp, "genshin_vector_db"), embedder_factory=factory,
+                                        workers=config["workers"], batch_size=config["batch_size"])
+    print(json.dumps(stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="0,1,2,4")
+    parser.add_argument("--batch-size", type=int, default=build_index.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--embed-ms", type=float, default=4.0)
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_single(json.loads(args.run))
+        return
+
+    print(f"{'workers':>8} {'chunks':>7} {'chunks/s':>9} {'total s':>8} {'rss MB':>7} {'worker MB':>10}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        config = {"workers": workers, "batch_size": args.batch_size, "embed_ms": args.embed_ms}
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--run", json.dumps(config)],
+                             check=True, capture_output=True, text=True).stdout
+        stats = json.loads(out.strip().splitlines()[-1])
+        print(f"{workers:>8} {stats['chunks']:>7} {stats['chunks_per_sec']:>9} {stats['total_seconds']:>8} "
+              f"{stats['peak_rss_mb']:>7} {stats['peak_worker_rss_mb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Retrieval quality per context token: legacy JSON slices vs entity documents.
+
+For every question in genshin_questions.json both indexes are searched at
+k=3. A retrieved chunk counts as relevant when it mentions one of the
+question's expected entities. Reported per strategy:
+
+- hit@k: questions with at least one relevant chunk
+- precision: relevant chunks / retrieved chunks
+- tokens/query: estimated context tokens sent to the LLM
+- hits per 1k tokens: relevant chunks per 1000 context tokens
+
+    python Benchmark_Scripts/bench_chunking.py [--embedder auto|minilm|lexical] [--k 3]
+"""
+import argparse
+import json
+import time
+
+import bench_utils
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores import FAISS
+
+import document_builder
+
+LEGACY_FILES = [
+    "data/character_lore.json",
+    "data/wiki_sections.json",
+    "data/characters.json",
+    "data/lore.json",
+]
+
+
+def legacy_chunks():
+    # The pre-document_builder pipeline: 10-record JSON slices split at 500/50
+    docs = []
+    for file in LEGACY_FILES:
+        with open(file, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            for i in range(0, len(data), 10):
+                docs.append(Document(page_content=json.dumps(data[i:i+10], ensure_ascii=False),
+                                     metadata={"file": file, "chunk": i}))
+        else:
+            keys = list(data.keys())
+            for i in range(0, len(keys), 10):
+                chunk = {k: data[k] for k in keys[i:i+10]}
+                docs.append(Document(page_content=json.dumps(chunk, ensure_ascii=False),
+                                     metadata={"file": file, "chunk": i}))
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    return splitter.split_documents(docs)
+
+
+def evaluate(name, chunks, embedder, questions, k):
+    start = time.perf_counter()
+    store = FAISS.from_documents(chunks, embedder)
+    build_s = time.perf_counter() - start
+
+    hits = relevant = retrieved = tokens = 0
+    for item in questions:
+        docs = store.similarity_search(item["question"], k=k)
+        entities = [e.lower() for e in item["entities"]]
+        matches = [d for d in docs if any(e in d.page_content.lower() for e in entities)]
+        hits += bool(matches)
+        relevant += len(matches)
+        retrieved += len(docs)
+        tokens += sum(bench_utils.count_tokens(d.page_content) for d in docs)
+
+    n = len(questions)
+    return {
+        "strategy": name,
+        "chunks": len(chunks),
+        "build_s": round(build_s, 2),
+        "hit_at_k": round(hits / n, 3),
+        "precision": round(relevant / retrieved, 3) if retrieved else 0.0,
+        "tokens_per_query": round(tokens / n, 1),
+        "hits_per_1k_tokens": round(relevant * 1000 / tokens, 2) if tokens else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embedder", default="auto", help="auto, minilm, lexical or hash")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    embedder = bench_utils.load_embedder(args.embedder)
+    questions = bench_utils.load_questions()
+    results = [
+        evaluate("legacy-json-slices", legacy_chunks(), embedder, questions, args.k),
+        evaluate("entity-documents", list(document_builder.iter_documents()), embedder, questions, args.k),
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = ["strategy", "chunks", "build_s", "hit_at_k", "precision", "tokens_per_query", "hits_per_1k_tokens"]
+    print(" ".join(f"{c:>20}" for c in columns))
+    for row in results:
+        print(" ".join(f"{row[c]!s:>20}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Conversation context: prompt tokens per turn, old verbatim history vs budgeted context.
+
+Plays a scripted --turns conversation, with follow-up questions, through
+chat_with_context. Fake LLMs stand in for Groq: the answer model replies
+with a ~1,500 character answer, like the real one. The context model
+returns a short summary or a standalone rewrite. Each turn is compared
+with the old behaviour, where the last 6 history entries were pasted
+verbatim into both the prompt and the retrieval query. The script checks
+that no prompt exceeds PROMPT_TOKEN_BUDGET and counts summary and rewrite
+calls.
+
+    python Benchmark_Scripts/bench_context.py [--turns 30] [--embedder auto]
+"""
+import argparse
+import asyncio
+
+import bench_utils
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+import app
+from conversation_context import count_tokens
+from docstore import load_vectorstore
+from hybrid_retrieval import BM25Index
+from incremental_index import INDEX_DIR
+
+SCRIPT = [
+    "Who is Zhongli?",
+    "What is his connection to the Geo Archon?",
+    "Tell me more about the contract he made with Liyue.",
+    "Who is Venti?",
+    "How does he get along with Zhongli?",
+    "What happened to the other Archons?",
+    "Tell me about Raiden Shogun.",
+    "Why did she close Inazuma's borders?",
+    "What is the Vision Hunt Decree?",
+    "Who opposed it?",
+]
+
+
+def fake_answer_llm(answer_chars=1500):
+    def invoke(prompt_value):
+        question = prompt_value.to_messages()[-1].content.rsplit("Current question: ", 1)[-1]
+        return AIMessage(content=(f"On \"{question}\": " + "the archives of Irminsul hold more. " * 60)[:answer_chars])
+
+    async def ainvoke(prompt_value):
+        return invoke(prompt_value)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+
+def fake_context_llm():
+    def invoke(prompt_value):
+        messages = prompt_value.to_messages()
+        if "running summary" in messages[0].content:
+            return AIMessage(content="The user asked about the Archons: Zhongli and the Geo contract, Venti, "
+                                     "Raiden Shogun and Inazuma's isolation, and the Vision Hunt Decree. " * 2)
+        question = messages[-1].content.rsplit("Latest question: ", 1)[-1]
+        return AIMessage(content=question.replace(" his ", " Zhongli's ").replace(" she ", " Raiden Shogun "))
+
+    async def ainvoke(prompt_value):
+        return invoke(prompt_value)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+
+def old_context_input(history, user_input):
+    # The previous build_context_input: last 6 entries verbatim
+    recent = history[-6:]
+    if not recent:
+        return user_input
+    return "\n".join(["Previous conversation:"] + [f"{r}: {m}" for r, m in recent] + [f"Current question: {user_input}"])
+
+
+async def run(turns):
+    retriever = app.HybridRetriever(vectorstore=app.vectorstore, bm25=app.bm25_index, k=3)
+    system_tokens = count_tokens(app.get_system_template().replace("{context}", ""))
+    session_id = "bench_context"
+    rows = []
+    for turn in range(turns):
+        question = SCRIPT[turn % len(SCRIPT)]
+        history = app.session_store.get(session_id) or []
+
+        old_input = old_context_input(history, question)
+        old_docs = retriever.invoke(old_input)
+        old_tokens = system_tokens + count_tokens("\n\n".join(d.page_content for d in old_docs)) + count_tokens(old_input)
+
+        usage = {}
+        await app.chat_with_context(session_id, question, usage)
+        rows.append((turn + 1, old_tokens, usage["prompt_tokens"], count_tokens(old_input),
+                     usage["query_tokens"], usage["history_tokens"], usage["summarized_turns"]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--embedder", default="auto")
+    args = parser.parse_args()
+
+    embedder = bench_utils.load_embedder(args.embedder)
+    app.embedder = embedder
+    app.vectorstore = load_vectorstore(INDEX_DIR, embedder)
+    app.bm25_index = BM25Index.load(INDEX_DIR)
+    app.groq_llm = fake_answer_llm()
+    app.context_manager.llm = fake_context_llm()
+    app.rag_chain = app.setup_modern_rag_chain(app.vectorstore, app.groq_llm, app.bm25_index)
+
+    rows = asyncio.run(run(args.turns))
+    print(f"{'turn':>4} {'old prompt':>11} {'new prompt':>11} {'old query':>10} {'new query':>10} "
+          f"{'history':>8} {'folded':>7}")
+    for turn, old_tokens, new_tokens, old_query, new_query, history_tokens, folded in rows:
+        print(f"{turn:>4} {old_tokens:>11} {new_tokens:>11} {old_query:>10} {new_query:>10} "
+              f"{history_tokens:>8} {folded:>7}")
+
+    old = [r[1] for r in rows]
+    new = [r[2] for r in rows]
+    print(f"prompt tokens: old mean {sum(old) / len(old):.0f} / max {max(old)}, "
+          f"new mean {sum(new) / len(new):.0f} / max {max(new)} (budget {app.PROMPT_TOKEN_BUDGET})")
+    print(f"over budget: {sum(n > app.PROMPT_TOKEN_BUDGET for n in new)}/{len(new)} turns; "
+          f"summary calls {app.context_manager.summary_calls}, rewrite calls {app.context_manager.rewrite_calls}")
+
+
+if __name__ == "__main__":
+    main()
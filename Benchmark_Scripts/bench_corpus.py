@@ -0,0 +1,121 @@
+"""Document loading: today's load_documents vs streaming the JSONL corpus.
+
+The four data/*.json files are copied --scales times over into a temporary
+directory, with each copy's entities renamed so nothing deduplicates. For
+each scale the script converts them to data/corpus/ (corpus.py) and then,
+each in a fresh subprocess so memory numbers don't leak between runs:
+
+    legacy   list(iter_documents()) with no corpus, as main.py used to load
+    corpus   iter_documents() consumed lazily from data/corpus/
+
+It reports documents/sec, the peak Python heap while loading (tracemalloc,
+measured on a second pass), and checks that both produce the same
+documents.
+
+    python Benchmark_Scripts/bench_corpus.py [--scales 1,4,16]
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import bench_utils
+
+import document_builder
+from corpus import SOURCES, write_source
+
+DATA_FILES = (document_builder.CHARACTER_LORE_FILE, document_builder.CHARACTERS_FILE,
+              document_builder.WIKI_SECTIONS_FILE, document_builder.LORE_FILE)
+
+
+def load(mode):
+    if mode == "legacy":
+        return list(document_builder.iter_documents(directory="no-corpus"))
+    return document_builder.iter_documents()
+
+
+def run_single(config):
+    os.chdir(config["dir"])
+    digest = hashlib.sha256()
+    start = time.perf_counter()
+    count = 0
+    for doc in load(config["mode"]):
+        digest.update(doc.page_content.encode("utf-8"))
+        count += 1
+    elapsed = time.perf_counter() - start
+
+    # Second pass under tracemalloc: peak Python heap while loading
+    tracemalloc.start()
+    for _ in load(config["mode"]):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(json.dumps({"documents": count, "seconds": elapsed, "peak_mb": peak / 2 ** 20,
+                      "digest": digest.hexdigest()}))
+
+
+def scale_data(directory, scale):
+    # Copy k of every entity is renamed "<name> k" so each copy is its own entity
+    os.makedirs(os.path.join(directory, "data"), exist_ok=True)
+    for path in DATA_FILES:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            scaled = {f"{key} {k}" if k else key: value for k in range(scale) for key, value in data.items()}
+        else:
+            scaled = []
+            for k in range(scale):
+                for entry in data:
+                    entry = json.loads(json.dumps(entry))
+                    profile = entry.get("result", entry)
+                    for field in ("name", "title"):
+                        if k and profile.get(field):
+                            profile[field] = f"{profile[field]} {k}"
+                    scaled.append(entry)
+        with open(os.path.join(directory, path), "w", encoding="utf-8") as f:
+            json.dump(scaled, f, indent=2, ensure_ascii=False)
+    return sum(os.path.getsize(os.path.join(directory, path)) for path in DATA_FILES) / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1,4,16")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_single(json.loads(args.run))
+        return
+
+    print(f"{'scale':>6} {'json MB':>8} {'convert s':>10} {'mode':>7} {'docs':>7} {'docs/s':>8} "
+          f"{'heap MB':>8} {'output':>8}")
+    for scale in (int(s) for s in args.scales.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            megabytes = scale_data(tmp, scale)
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            start = time.perf_counter()
+            for source in SOURCES:
+                write_source(source, document_builder.legacy_records(source))
+            convert = time.perf_counter() - start
+            os.chdir(cwd)
+
+            results = {}
+            for mode in ("legacy", "corpus"):
+                out = subprocess.run([sys.executable, os.path.abspath(__file__), "--run",
+                                      json.dumps({"mode": mode, "dir": tmp})],
+                                     check=True, capture_output=True, text=True).stdout
+                results[mode] = stats = json.loads(out.strip().splitlines()[-1])
+                same = stats["digest"] == results["legacy"]["digest"]
+                print(f"{scale:>6} {megabytes:>8.1f} {convert:>10.2f} {mode:>7} {stats['documents']:>7} "
+                      f"{stats['documents'] / stats['seconds']:>8.0f} {stats['peak_mb']:>8.1f} "
+                      f"{'same' if same else 'DIFFERS':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Startup time and per-worker memory: pickled docstore vs mmap docstore.
+
+Starts --workers processes at once for each format. Each process loads the
+index, runs a few queries and reports:
+- load time
+- RSS growth
+- PSS growth from /proc/self/smaps_rollup
+
+PSS splits shared pages between the processes mapping them. So it shows how
+much of the mmap docstore (and the mmapped index.faiss) the workers share
+via the page cache. Linux only.
+
+    python Benchmark_Scripts/bench_docstore.py [--workers 4] [--index-dir genshin_vector_db]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import bench_utils
+
+import docstore
+
+
+def memory_kb():
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1].lower()] = int(parts[1])
+    return values
+
+
+def run_worker(fmt, index_dir, barrier_path):
+    from langchain_community.vectorstores import FAISS
+
+    embedder = bench_utils.HashEmbeddings()
+    before = memory_kb()
+    start = time.perf_counter()
+    if fmt == "pickle":
+        store = FAISS.load_local(index_dir, embeddings=embedder, allow_dangerous_deserialization=True)
+    else:
+        store = docstore.load_vectorstore(index_dir, embedder)
+    load_ms = (time.perf_counter() - start) * 1000
+    for question in bench_utils.load_questions()[:20]:
+        store.similarity_search(question["question"], k=3)
+
+    # Wait until every worker has loaded so shared pages are counted across all of them
+    open(f"{barrier_path}.{os.getpid()}", "w").close()
+    while len([p for p in os.listdir(os.path.dirname(barrier_path)) if p.startswith("ready")]) < int(os.environ["BENCH_WORKERS"]):
+        time.sleep(0.01)
+    after = memory_kb()
+    print(json.dumps({"load_ms": load_ms, "rss_mb": (after["rss"] - before["rss"]) / 1024,
+                      "pss_mb": (after["pss"] - before["pss"]) / 1024}))
+    time.sleep(0.5)
+
+
+def measure(fmt, index_dir, workers):
+    with tempfile.TemporaryDirectory() as sync_dir:
+        env = {**os.environ, "BENCH_WORKERS": str(workers)}
+        procs = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "--run", fmt, index_dir,
+                                   os.path.join(sync_dir, "ready")], stdout=subprocess.PIPE, text=True, env=env)
+                 for _ in range(workers)]
+        results = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in procs]
+    n = len(results)
+    return {key: sum(r[key] for r in results) / n for key in ("load_ms", "rss_mb", "pss_mb")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--index-dir", default=os.path.join(bench_utils.ROOT_DIR, "genshin_vector_db"))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--run", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_worker(*args.run)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Write a pickled copy of the same index for comparison
+        pickle_dir = os.path.join(tmp, "pickle")
+        docstore.load_editable_vectorstore(args.index_dir, bench_utils.HashEmbeddings()).save_local(pickle_dir)
+
+        print(f"{'format':>8} {'workers':>8} {'load ms':>8} {'rss MB':>7} {'pss MB':>7}")
+        for fmt, index_dir in (("pickle", pickle_dir), ("mmap", args.index_dir)):
+            stats = measure(fmt, index_dir, args.workers)
+            print(f"{fmt:>8} {args.workers:>8} {stats['load_ms']:>8.1f} {stats['rss_mb']:>7.1f} {stats['pss_mb']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
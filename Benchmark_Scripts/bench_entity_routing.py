@@ -0,0 +1,102 @@
+"""Entity routing: precision and search latency, routed vs global.
+
+Precision: for each question in genshin_questions.json, the share of the
+top-k chunks that mention an expected entity. This is measured with and
+without restricting the search to the rows of the entities tagged in the
+question.
+
+Latency: the same queries run against the FAISS index padded with
+--pad-rows random vectors. This shows what the ID selector saves as the
+corpus grows.
+
+    python Benchmark_Scripts/bench_entity_routing.py [--embedder auto] [--k 3] [--pad-rows 200000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import bench_utils
+import faiss
+import numpy as np
+
+from docstore import load_vectorstore
+from entity_router import EntityRouter
+from hybrid_retrieval import BM25Index, HybridRetriever, dense_search
+from incremental_index import update_index
+
+
+def precision(docs, entities):
+    if not docs:
+        return 0.0
+    return sum(any(e.lower() in d.page_content.lower() for e in entities) for d in docs) / len(docs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embedder", default="auto")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--pad-rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    embedder = bench_utils.load_embedder(args.embedder)
+    questions = bench_utils.load_questions()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = os.path.join(tmp, "genshin_vector_db")
+        update_index(embedder, index_dir=index_dir)
+        vectorstore = load_vectorstore(index_dir, embedder)
+        bm25 = BM25Index.load(index_dir)
+
+        start = time.perf_counter()
+        router = EntityRouter.from_vectorstore(vectorstore)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        tag_ms = []
+        routed = 0
+        print(f"{'mode':>8} {'global P@k':>11} {'routed P@k':>11}")
+        for mode in ("dense", "hybrid"):
+            plain = HybridRetriever(vectorstore=vectorstore, bm25=bm25, k=args.k, mode=mode)
+            with_router = HybridRetriever(vectorstore=vectorstore, bm25=bm25, router=router, k=args.k, mode=mode)
+            p_global, p_routed = [], []
+            for item in questions:
+                p_global.append(precision(plain.invoke(item["question"]), item["entities"]))
+                p_routed.append(precision(with_router.invoke(item["question"]), item["entities"]))
+            print(f"{mode:>8} {np.mean(p_global):>11.3f} {np.mean(p_routed):>11.3f}")
+
+        allowed = []
+        for item in questions:
+            start = time.perf_counter()
+            rows = router.route(item["question"])
+            tag_ms.append((time.perf_counter() - start) * 1000)
+            routed += rows is not None
+            allowed.append(rows)
+        print(f"router build {build_ms:.1f} ms, tagging p50 {bench_utils.percentile(tag_ms, 50):.3f} ms, "
+              f"questions routed {routed}/{len(questions)}")
+
+        # Pad the index with random vectors to see selector savings at scale
+        dim = vectorstore.index.d
+        padded = faiss.IndexFlatL2(dim)
+        padded.add(vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal))
+        rng = np.random.default_rng(0)
+        for i in range(0, args.pad_rows, 50000):
+            padded.add(rng.standard_normal((min(50000, args.pad_rows - i), dim)).astype(np.float32))
+        vectorstore.index = padded
+
+        vectors = [embedder.embed_query(item["question"]) for item in questions]
+        timings = {"global": [], "routed": []}
+        for vector, rows in zip(vectors, allowed):
+            if rows is None:
+                continue
+            for name, selection in (("global", None), ("routed", rows)):
+                start = time.perf_counter()
+                dense_search(vectorstore, vector, args.k, selection)
+                timings[name].append((time.perf_counter() - start) * 1000)
+        print(f"dense search over {padded.ntotal} rows (routed questions only):")
+        for name, values in timings.items():
+            print(f"  {name:>7}: p50 {bench_utils.percentile(values, 50):.2f} ms, "
+                  f"p99 {bench_utils.percentile(values, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""HTML extraction throughput: the old BeautifulSoup path vs wiki_extract backends.
+
+The old path is what the scrapers did before: BeautifulSoup with
+html.parser, keeping only the top-level <p> tags. Each wiki_extract
+backend that is installed (selectolax, lxml, and the standard-library
+"stream" parser) runs over the same pages. For each one the script reports
+pages/sec, MB/sec, how many sections, list items and infobox fields it
+captured, and how many junk lines it left (blank or shorter than 3
+characters once stripped).
+
+Fixtures are saved HTML files (--fixtures DIR, e.g. pages dumped from real
+Fandom articles). Without --fixtures, mock_wiki pages of several sizes are
+used.
+
+    python Benchmark_Scripts/bench_extract.py [--fixtures DIR] [--pages 60] [--repeat 3]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import bench_utils
+from bs4 import BeautifulSoup
+
+from mock_wiki import wiki_page
+
+sys.path.insert(0, os.path.join(bench_utils.ROOT_DIR, "Scraping_Scripts"))
+
+from wiki_extract import available_backends, extract_page, page_text  # noqa: E402
+
+
+def legacy_extract(html):
+    # The scrapers' extraction before wiki_extract
+    soup = BeautifulSoup(html, "html.parser")
+    content = soup.select_one("div.mw-parser-output")
+    if not content:
+        return ""
+    paragraphs = content.find_all("p", recursive=False)
+    return "\n".join(p.get_text().strip() for p in paragraphs if p.get_text().strip())
+
+
+def junk_lines(text):
+    return sum(len(line.strip()) < 3 for line in text.split("\n"))
+
+
+def load_fixtures(args):
+    if args.fixtures:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(args.fixtures, "*.html"))):
+            with open(path, "rb") as f:
+                pages.append(f.read())
+        return pages
+    return [wiki_page(f"/wiki/Page_{i}", paragraphs=12 * (1 + i % 10)) for i in range(args.pages)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", help="directory of saved .html pages")
+    parser.add_argument("--pages", type=int, default=60, help="mock pages when --fixtures isn't given")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_fixtures(args)
+    megabytes = sum(len(page) for page in pages) / 2 ** 20
+    print(f"{len(pages)} pages, {megabytes:.1f} MB, best of {args.repeat}")
+    print(f"{'extractor':>24} {'pages/s':>8} {'MB/s':>6} {'speedup':>8} {'sections':>9} {'items':>6} "
+          f"{'infobox':>8} {'junk lines':>11}")
+
+    def run(extract):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results = [extract(page) for page in pages]
+            best = min(best, time.perf_counter() - start)
+        return best, results
+
+    baseline, texts = run(legacy_extract)
+    print(f"{'BeautifulSoup (old)':>24} {len(pages) / baseline:>8.1f} {megabytes / baseline:>6.1f} {1:>7.1f}x "
+          f"{'-':>9} {'-':>6} {'-':>8} {sum(junk_lines(t) for t in texts):>11}")
+
+    for backend in available_backends():
+        elapsed, results = run(lambda page: extract_page(page, backend))
+        sections = sum(len(r["sections"]) for r in results)
+        items = sum(len(items) for r in results for s in r["sections"] for items in s["lists"])
+        infobox = sum(len(r["infobox"]) for r in results)
+        junk = sum(junk_lines(page_text(r)) for r in results)
+        print(f"{f'wiki_extract {backend}':>24} {len(pages) / elapsed:>8.1f} {megabytes / elapsed:>6.1f} "
+              f"{baseline / elapsed:>7.1f}x {sections:>9} {items:>6} {infobox:>8} {junk:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Structured fast path: routing hit rate and latency vs the RAG chain.
+
+Hit rate: share of the factual questions below that are answered from
+data/characters.json with the expected value in the reply. The mostly
+narrative questions in genshin_questions.json should fall through to the
+RAG chain; the ones routed directly are listed so they can be checked.
+
+Latency: the same factual questions through chat_with_context with the fast
+path on and off. With it off they go through hybrid retrieval over the
+committed index and a fake LLM that waits --delay seconds (the 70B Groq
+call in production).
+
+    python Benchmark_Scripts/bench_fast_path.py [--delay 0.8] [--embedder auto]
+"""
+import argparse
+import asyncio
+import time
+
+import bench_utils
+
+import app
+import fast_path
+from docstore import load_vectorstore
+from entity_router import EntityRouter
+from hybrid_retrieval import BM25Index
+from incremental_index import INDEX_DIR
+
+# (question, text the direct answer must contain)
+FACTUAL_QUESTIONS = [
+    ("What is Amber's birthday?", "August 10th"),
+    ("What weapon does Xiao use?", "Polearm"),
+    ("List all Pyro bow users", "Amber"),
+    ("Which characters use a claymore?", "Diluc"),
+    ("What is Zhongli's vision?", "Geo"),
+    ("How many stars is Venti?", "5★"),
+    ("What is Keqing's constellation?", "Trulla Cementarii"),
+    ("Who voices Zhongli?", "Keith Silverstein"),
+    ("When is Diluc's birthday?", "April 30th"),
+    ("What region is Beidou from?", "Liyue"),
+    ("List all 4-star Hydro characters", "Xingqiu"),
+    ("What is Hu Tao's special dish?", "Ghostly March"),
+    ("Show every Cryo sword user", "Kaeya"),
+    ("What weapon does Raiden use?", "Polearm"),
+    ("Klee rarity", "5★"),
+    ("Which Anemo characters are from Mondstadt?", "Venti"),
+    ("What is Ganyu's affiliation?", "Liyue Qixing"),
+    ("When was Yoimiya released?", "v2.0"),
+    ("What is Noelle's vision and weapon?", "Claymore"),
+    ("Electro catalyst characters", "Lisa"),
+]
+
+
+async def time_chat(questions, session_prefix):
+    timings = []
+    for i, question in enumerate(questions):
+        start = time.perf_counter()
+        await app.chat_with_context(f"{session_prefix}_{i}", question)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.8, help="fake LLM latency in seconds")
+    parser.add_argument("--embedder", default="auto")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = fast_path.CharacterAttributeStore.from_file()
+    print(f"attribute store: {len(store.names)} characters loaded in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    hits, misses = 0, []
+    for question, expected in FACTUAL_QUESTIONS:
+        reply = fast_path.answer(question, store)
+        if reply is not None and expected in reply:
+            hits += 1
+        else:
+            misses.append(question)
+    print(f"routing hit rate: {hits}/{len(FACTUAL_QUESTIONS)} ({hits / len(FACTUAL_QUESTIONS):.0%})")
+    for question in misses:
+        print(f"  missed: {question}")
+
+    general = bench_utils.load_questions()
+    routed_general = [item["question"] for item in general if fast_path.answer(item["question"], store) is not None]
+    print(f"genshin_questions.json answered directly: {len(routed_general)}/{len(general)}")
+    for question in routed_general:
+        print(f"  routed: {question}")
+
+    # Latency through the chat pipeline, fast path on vs off
+    embedder = bench_utils.load_embedder(args.embedder)
+    app.embedder = embedder
+    app.vectorstore = load_vectorstore(INDEX_DIR, embedder)
+    app.groq_llm = bench_utils.fake_delayed_llm(args.delay)
+    app.rag_chain = app.setup_modern_rag_chain(app.vectorstore, app.groq_llm, BM25Index.load(INDEX_DIR),
+                                               EntityRouter.from_vectorstore(app.vectorstore))
+    # Only questions the fast path answers, so both runs do the same work
+    questions = [question for question, _ in FACTUAL_QUESTIONS if question not in misses]
+
+    app.attribute_store = store
+    routed = asyncio.run(time_chat(questions, "fast"))
+    app.attribute_store = None
+    app.response_cache.invalidate()
+    rag = asyncio.run(time_chat(questions, "rag"))
+
+    print(f"{'path':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, values in (("fast path", routed), ("rag chain", rag)):
+        print(f"{name:>10} {bench_utils.percentile(values, 50):>10.3f} {bench_utils.percentile(values, 99):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
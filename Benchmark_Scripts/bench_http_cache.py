@@ -0,0 +1,89 @@
+"""Conditional-GET cache: repeat scrapes with and without changed pages.
+
+Runs scrape_character_lore.py against mock_wiki.MockWikiServer four times
+with the same HttpCache:
+
+    cold       empty cache, every page downloaded
+    unchanged  nothing edited, so every page should be a 304
+    edited     --edit-fraction of the pages changed on the server
+    small      a new cache capped at --small-mb, so evictions force re-downloads
+
+For each run the script reports the time, the 304 ratio, the bytes the server
+sent and the bytes served from the cache, and the parses skipped. It also
+checks that the output file matches an uncached scrape. Everything runs in
+a temporary directory.
+
+    python Benchmark_Scripts/bench_http_cache.py [--latency 0.05] [--edit-fraction 0.1] [--small-mb 0.2]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import bench_utils
+
+from mock_wiki import MockWikiServer
+
+sys.path.insert(0, os.path.join(bench_utils.ROOT_DIR, "Scraping_Scripts"))
+os.environ["TQDM_DISABLE"] = "1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="server response time in seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--edit-fraction", type=float, default=0.1)
+    parser.add_argument("--small-mb", type=float, default=0.2, help="cache limit for the eviction run")
+    args = parser.parse_args()
+
+    with MockWikiServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        os.environ["WIKI_BASE_URL"] = f"{server.url}/wiki"
+        import scrape_character_lore
+        from fetch_engine import FetchEngine
+        from http_cache import HttpCache
+
+        os.chdir(tmp)
+
+        def scrape(cache):
+            engine = FetchEngine(concurrency=args.concurrency, per_host=args.concurrency, rate=None, cache=cache)
+            sent = server.bytes_sent
+            start = time.perf_counter()
+            scrape_character_lore.scrape_all_characters(engine, fresh=True)
+            elapsed = time.perf_counter() - start
+            with open("data/character_lore.json", encoding="utf-8") as f:
+                return engine, elapsed, server.bytes_sent - sent, f.read()
+
+        _, _, _, expected = scrape(None)
+        cache = HttpCache("cache")
+        print(f"{'run':>10} {'time s':>7} {'requests':>9} {'304s':>6} {'ratio':>6} {'sent MB':>8} "
+              f"{'cached MB':>10} {'parses skipped':>15} {'output':>8}")
+
+        paths = [f"/wiki/{name}{suffix}" for name in dict.fromkeys(scrape_character_lore.characters)
+                 for suffix in ("", "/Lore")]
+        runs = [("cold", cache), ("unchanged", cache), ("edited", cache),
+                ("small", HttpCache("small_cache", max_bytes=int(args.small_mb * 2 ** 20)))]
+        for name, run_cache in runs:
+            if name == "edited":
+                for path in random.Random(0).sample(paths, int(len(paths) * args.edit_fraction)):
+                    server.edit(path)
+                _, _, _, expected = scrape(None)
+            engine, elapsed, sent, output = scrape(run_cache)
+            if name == "small":
+                # Second pass over the capped cache: only what survived eviction can be a 304
+                engine, elapsed, sent, output = scrape(run_cache)
+            s = engine.stats
+            print(f"{name:>10} {elapsed:>7.2f} {s['requests']:>9} {s['not_modified']:>6} "
+                  f"{s['not_modified'] / max(1, s['requests']):>6.0%} {sent / 2 ** 20:>8.2f} "
+                  f"{s['bytes_saved'] / 2 ** 20:>10.2f} {s['parses_skipped']:>15} "
+                  f"{'same' if output == expected else 'DIFFERS':>8}")
+
+        for name, run_cache in (("cache", cache), ("small", runs[-1][1])):
+            stats = run_cache.stats()
+            print(f"{name}: {stats['entries']} entries, {stats['bytes'] / 2 ** 20:.2f} MB compressed "
+                  f"({stats['raw_bytes'] / 2 ** 20:.2f} MB raw), {stats['evictions']} evictions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Rebuild time after a one-file change: incremental update vs full rebuild.
+
+Builds an index of the current corpus in a temporary directory, then edits
+every entry of one source file (lore.json by default) and times:
+
+- full: re-embedding every chunk
+- incremental: embedding only the chunks whose content hash changed
+
+The hash embedder simulates MiniLM's CPU cost per chunk (--embed-ms).
+
+    python Benchmark_Scripts/bench_incremental.py [--embed-ms 4] [--changed-file data/lore.json]
+"""
+import argparse
+import os
+import tempfile
+
+import bench_utils
+
+import document_builder
+from incremental_index import update_index
+
+
+def corpus(changed_file=None):
+    for doc in document_builder.iter_documents():
+        if doc.metadata.get("file") == changed_file:
+            doc.page_content += "\n(Updated in the latest wiki refresh.)"
+        yield doc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embed-ms", type=float, default=4.0, help="simulated embedding cost per chunk")
+    parser.add_argument("--changed-file", default=document_builder.LORE_FILE)
+    args = parser.parse_args()
+
+    embedder = bench_utils.HashEmbeddings(cost_ms=args.embed_ms)
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = os.path.join(tmp, "genshin_vector_db")
+
+        _, initial = update_index(embedder, corpus(), index_dir=index_dir)
+        _, noop = update_index(embedder, corpus(), index_dir=index_dir)
+        _, incremental = update_index(embedder, corpus(args.changed_file), index_dir=index_dir)
+        _, full = update_index(embedder, corpus(args.changed_file), index_dir=index_dir, full=True)
+
+    print(f"corpus: {initial['chunks']} chunks, changed file: {args.changed_file}")
+    print(f"{'run':>12} {'added':>7} {'removed':>8} {'seconds':>8}")
+    for name, stats in [("initial", initial), ("no change", noop), ("incremental", incremental), ("full", full)]:
+        print(f"{name:>12} {stats['added']:>7} {stats['removed']:>8} {stats['seconds']:>8}")
+    print(f"speedup: {full['seconds'] / incremental['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Instrumentation overhead: cost per metric operation and per retrieval.
+
+Micro-benchmarks (ns per call, best of --repeat runs of --ops calls):
+
+    counter.inc          one labelled counter child
+    histogram.observe    one labelled histogram child
+    stage()              a stage timer with no active trace
+    stage() + trace      a stage timer inside a request trace
+    stage() disabled     METRICS=0
+    /metrics render      one scrape of everything recorded here (us)
+
+Then the retriever the API uses (hybrid, entity routing) answers every question
+in genshin_questions.json --rounds times, with metrics on and off, and the
+script reports the p50 of both and the difference. A retrieval records four
+stages (embed, dense_search, lexical_search, docstore).
+
+    python Benchmark_Scripts/bench_metrics.py [--embedder auto] [--ops 200000] [--rounds 20]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import bench_utils
+
+import metrics
+from docstore import load_vectorstore
+from entity_router import EntityRouter
+from hybrid_retrieval import BM25Index, HybridRetriever
+from incremental_index import update_index
+
+
+def ns_per_call(fn, ops, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        fn(ops)
+        best = min(best, (time.perf_counter_ns() - start) / ops)
+    return best
+
+
+def run_counter(ops):
+    child = metrics.Counter("bench_counter_total", "bench", ("kind",), registry=metrics.Registry()).labels("a")
+    for _ in range(ops):
+        child.inc()
+
+
+def run_histogram(ops):
+    child = metrics.Histogram("bench_seconds", "bench", ("kind",), registry=metrics.Registry()).labels("a")
+    for i in range(ops):
+        child.observe(i * 1e-7)
+
+
+def run_stage(ops):
+    for _ in range(ops):
+        with metrics.stage("bench"):
+            pass
+
+
+def run_traced_stage(ops):
+    token = metrics._current_trace.set(metrics.Trace())
+    try:
+        for i in range(ops):
+            if i % 16 == 0:
+                # A request records a handful of stages, not thousands
+                metrics._current_trace.get().stages.clear()
+            with metrics.stage("bench"):
+                pass
+    finally:
+        metrics._current_trace.reset(token)
+
+
+def run_disabled_stage(ops):
+    metrics.set_enabled(False)
+    try:
+        run_stage(ops)
+    finally:
+        metrics.set_enabled(True)
+
+
+def retrieval_p50(retriever, questions, rounds, enabled):
+    metrics.set_enabled(enabled)
+    latencies = []
+    try:
+        for _ in range(rounds):
+            for question in questions:
+                start = time.perf_counter()
+                retriever.invoke(question)
+                latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        metrics.set_enabled(True)
+    return bench_utils.percentile(latencies, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embedder", default="auto", help="auto, minilm, lexical or hash")
+    parser.add_argument("--index-dir", help="use an existing index instead of building one")
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=20, help="passes over the question set per setting")
+    args = parser.parse_args()
+
+    print(f"{'operation':>20} {'ns/call':>9}")
+    for name, fn in [("counter.inc", run_counter), ("histogram.observe", run_histogram),
+                     ("stage()", run_stage), ("stage() + trace", run_traced_stage),
+                     ("stage() disabled", run_disabled_stage)]:
+        print(f"{name:>20} {ns_per_call(fn, args.ops, args.repeat):>9.0f}")
+    start = time.perf_counter()
+    text = metrics.REGISTRY.render()
+    print(f"{'/metrics render':>20} {(time.perf_counter() - start) * 1e6:>9.0f} us ({len(text.splitlines())} lines)")
+
+    embedder = bench_utils.load_embedder(args.embedder)
+    questions = [item["question"] for item in bench_utils.load_questions()]
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = args.index_dir
+        if not index_dir:
+            index_dir = os.path.join(tmp, "genshin_vector_db")
+            update_index(embedder, index_dir=index_dir)
+        vectorstore = load_vectorstore(index_dir, embedder)
+        retriever = HybridRetriever(vectorstore=vectorstore, bm25=BM25Index.load(index_dir), k=3,
+                                    router=EntityRouter.from_vectorstore(vectorstore), lexical_budget_ms=None)
+        retriever.invoke("warm up")
+
+        # Alternate the two settings so drift in machine load hits both alike
+        on, off = [], []
+        for _ in range(3):
+            off.append(retrieval_p50(retriever, questions, args.rounds, enabled=False))
+            on.append(retrieval_p50(retriever, questions, args.rounds, enabled=True))
+        off_ms, on_ms = min(off), min(on)
+        print(f"\nretrieval p50 over {len(questions)} questions x {args.rounds}: "
+              f"metrics off {off_ms:.3f} ms, on {on_ms:.3f} ms, "
+              f"overhead {(on_ms - off_ms) * 1000:+.1f} us ({(on_ms - off_ms) / off_ms:+.1%})")
+
+
+if __name__ == "__main__":
+    main()
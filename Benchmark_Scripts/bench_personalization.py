@@ -0,0 +1,172 @@
+"""Personalized retrieval: latency, cache hit rate and how much of the context matches the user.
+
+--users users get preferences built from data/characters.json (a favourite
+character, two team mates, that character's region and element) in a
+temporary PreferencesStore. Each user then asks a session of --session
+questions, a third each of: questions about their favourite character
+("What is X's story?"), open-ended ones that name no entity ("Who is the
+strongest sword user?") and specific ones from genshin_questions.json.
+Each session is asked twice, the way a user comes back to the same topics.
+
+    plain         HybridRetriever.invoke, no user
+    cold          Personalizer.retrieve on the first session (profiles are built here)
+    cached        the repeated session, served from the per-user result cache
+    new version   every user saves their preferences again (version bump) and reasks
+
+The script reports retrieval latency p50/p99 for each pass, the result-cache
+hit rate, how many returned chunks came from the prefetched set, and two
+shares of the top --k chunks:
+
+    match       on open-ended questions, chunks whose character, region or
+                element matches the user (what personalization should raise)
+    precision   on specific questions, chunks mentioning an expected entity
+                (what it must not lower)
+
+    python Benchmark_Scripts/bench_personalization.py [--embedder auto] [--users 50] [--session 9] [--k 3]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import bench_utils
+
+from docstore import load_vectorstore
+from entity_router import EntityRouter
+from hybrid_retrieval import BM25Index, HybridRetriever
+from incremental_index import update_index
+from personalization import Personalizer, PreferenceIndex
+from preferences_store import PreferencesStore
+
+CHARACTER_QUESTIONS = [
+    "What is {}'s story?",
+    "Tell me about {}'s personality",
+    "Who are {}'s friends?",
+    "What does {} do?",
+]
+
+OPEN_QUESTIONS = [
+    "Who is the strongest sword user?",
+    "Tell me a sad story",
+    "Which characters are good healers?",
+    "Who has the most mysterious past?",
+    "What festivals do people celebrate?",
+    "Who are the most famous heroes?",
+    "Tell me about an ancient war",
+    "Which characters are related to each other?",
+    "Who fights with a bow?",
+    "What happened to the old gods?",
+]
+
+
+def load_characters(path="data/characters.json"):
+    with open(path, encoding="utf-8") as f:
+        entries = [entry.get("result", entry) for entry in json.load(f)]
+    return [c for c in entries if c.get("name") and c.get("region") and c.get("vision")]
+
+
+def make_users(characters, n, rng):
+    users = {}
+    for i in range(n):
+        favourite, *team = rng.sample(characters, 3)
+        users[f"user_{i}"] = {
+            "userId": f"user_{i}",
+            "favoriteCharacter": favourite["name"],
+            "favoriteRegion": favourite["region"][0],
+            "adventureRank": 55,
+            "mainTeam": [c["name"] for c in team],
+            "preferredElement": favourite["vision"],
+        }
+    return users
+
+
+def matches(doc, prefs, characters):
+    metadata = doc.metadata
+    return (metadata.get("name") in characters
+            or prefs["favoriteRegion"].lower() in str(metadata.get("region", "")).lower()
+            or prefs["preferredElement"].lower() == str(metadata.get("vision", "")).lower())
+
+
+def run_pass(name, retrieve, sessions, users, personalizer, k):
+    hits, misses, prefetch = (personalizer.hits, personalizer.misses, personalizer.prefetch_hits)
+    latencies, matched, open_total, relevant, specific_total = [], 0, 0, 0, 0
+    for user_id, questions in sessions.items():
+        prefs = users[user_id]
+        characters = set(personalizer._characters(prefs))
+        for question, entities in questions:
+            start = time.perf_counter()
+            docs = retrieve(question, user_id)[:k]
+            latencies.append((time.perf_counter() - start) * 1000)
+            if entities == "open":
+                matched += sum(matches(d, prefs, characters) for d in docs)
+                open_total += len(docs)
+            elif entities:
+                relevant += sum(any(e.lower() in d.page_content.lower() for e in entities) for d in docs)
+                specific_total += len(docs)
+    lookups = personalizer.hits - hits + personalizer.misses - misses
+    hit_rate = f"{(personalizer.hits - hits) / lookups:.1%}" if lookups else "-"
+    print(f"{name:>12} {bench_utils.percentile(latencies, 50):>8.2f} {bench_utils.percentile(latencies, 99):>8.2f} "
+          f"{hit_rate:>9} {personalizer.prefetch_hits - prefetch:>9} {matched / max(1, open_total):>7.1%} "
+          f"{relevant / max(1, specific_total):>10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embedder", default="auto", help="auto, minilm, lexical or hash")
+    parser.add_argument("--index-dir", help="evaluate an existing index instead of building one")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--session", type=int, default=9, help="questions per user session")
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    embedder = bench_utils.load_embedder(args.embedder)
+    specific = bench_utils.load_questions()
+    users = make_users(load_characters(), args.users, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = args.index_dir
+        if not index_dir:
+            index_dir = os.path.join(tmp, "genshin_vector_db")
+            update_index(embedder, index_dir=index_dir)
+        vectorstore = load_vectorstore(index_dir, embedder)
+        router = EntityRouter.from_vectorstore(vectorstore)
+        retriever = HybridRetriever(vectorstore=vectorstore, bm25=BM25Index.load(index_dir), k=args.k,
+                                    router=router, lexical_budget_ms=None)
+        retriever.invoke("warm up")
+
+        store = PreferencesStore(os.path.join(tmp, "user_preferences.db"))
+        for user_id, prefs in users.items():
+            store.put(user_id, prefs)
+
+        start = time.perf_counter()
+        index = PreferenceIndex.from_vectorstore(vectorstore)
+        index_ms = (time.perf_counter() - start) * 1000
+        personalizer = Personalizer(index, store, router)
+
+        sessions = {}
+        for user_id, prefs in users.items():
+            third = args.session // 3
+            about = [(q.format(prefs["favoriteCharacter"]), None) for q in rng.sample(CHARACTER_QUESTIONS, third)]
+            open_ended = [(q, "open") for q in rng.sample(OPEN_QUESTIONS, third)]
+            sessions[user_id] = about + open_ended + [(item["question"], item["entities"])
+                                                      for item in rng.sample(specific, args.session - 2 * third)]
+
+        print(f"{vectorstore.index.ntotal} chunks, {args.users} users x {args.session} questions, top {args.k}; "
+              f"preference index built in {index_ms:.0f} ms")
+        print(f"{'pass':>12} {'p50 ms':>8} {'p99 ms':>8} {'hit rate':>9} {'prefetch':>9} {'match':>7} {'precision':>10}")
+        run_pass("plain", lambda q, user_id: retriever.invoke(q), sessions, users, personalizer, args.k)
+        personalized = lambda q, user_id: personalizer.retrieve(retriever, q, user_id)
+        run_pass("cold", personalized, sessions, users, personalizer, args.k)
+        run_pass("cached", personalized, sessions, users, personalizer, args.k)
+        for user_id, prefs in users.items():
+            store.put(user_id, prefs)
+        run_pass("new version", personalized, sessions, users, personalizer, args.k)
+        print(json.dumps(personalizer.stats()))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""User preferences: the old rewrite-the-JSON-file path vs PreferencesStore.
+
+--workers processes (standing in for uvicorn workers) share one store
+seeded with --users users. Each process does --ops requests. A share of
+them (--write-fraction) are saves to users that only that process writes;
+the rest are reads of random users. Afterwards every user's stored
+adventureRank is checked against the last value written to it.
+
+    json    load the whole file per request, rewrite it with indent=2 per save,
+            under a process-local lock (app.py before PreferencesStore)
+    sqlite  PreferencesStore: cached reads, one-row WAL upserts
+
+For each backend the script reports requests/sec, read and save latency
+p50/p99, failed requests (e.g. a read of a half-written file) and lost
+updates, or whether the file was left corrupt.
+
+    python Benchmark_Scripts/bench_preferences.py [--users 2000] [--workers 4] [--ops 300]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+import bench_utils
+
+from preferences_store import PreferencesStore
+
+
+def make_preferences(user_id, rank):
+    return {
+        "userId": user_id,
+        "favoriteCharacter": "Raiden Shogun",
+        "favoriteRegion": "Inazuma",
+        "adventureRank": rank,
+        "mainTeam": ["Neuvillette", "Furina", "Kazuha", "Xilonen"],
+        "preferredElement": "Hydro",
+    }
+
+
+class JsonPreferences:
+    # The old app.py code path
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def get(self, user_id):
+        with self.lock:
+            return self._load().get(user_id)
+
+    def put(self, user_id, preferences):
+        with self.lock:
+            prefs = self._load()
+            prefs[user_id] = preferences
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(prefs, f, indent=2, ensure_ascii=False)
+
+
+def open_backend(backend, directory):
+    if backend == "json":
+        return JsonPreferences(os.path.join(directory, "user_preferences.json"))
+    return PreferencesStore(os.path.join(directory, "user_preferences.db"))
+
+
+def worker(backend, directory, worker_id, args, results):
+    store = open_backend(backend, directory)
+    rng = random.Random(worker_id)
+    users = [f"user_{i}" for i in range(args.users)]
+    own = users[worker_id::args.workers]
+    read_ms, write_ms, last_written = [], [], {}
+    errors = 0
+    for op in range(args.ops):
+        start = time.perf_counter()
+        try:
+            if rng.random() < args.write_fraction:
+                user_id = rng.choice(own)
+                rank = worker_id * 1_000_000 + op
+                store.put(user_id, make_preferences(user_id, rank))
+                last_written[user_id] = rank
+                write_ms.append((time.perf_counter() - start) * 1000)
+            else:
+                store.get(rng.choice(users))
+                read_ms.append((time.perf_counter() - start) * 1000)
+        except Exception:
+            errors += 1
+    results.put((read_ms, write_ms, last_written, errors))
+
+
+def run(backend, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        seed = {f"user_{i}": make_preferences(f"user_{i}", 0) for i in range(args.users)}
+        if backend == "json":
+            with open(os.path.join(tmp, "user_preferences.json"), "w", encoding="utf-8") as f:
+                json.dump(seed, f, indent=2)
+        else:
+            store = open_backend(backend, tmp)
+            for user_id, prefs in seed.items():
+                store.put(user_id, prefs)
+            store.close()
+
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=worker, args=(backend, tmp, w, args, results))
+                     for w in range(args.workers)]
+        start = time.perf_counter()
+        for p in processes:
+            p.start()
+        outputs = [results.get() for _ in processes]
+        for p in processes:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        read_ms = [ms for out in outputs for ms in out[0]]
+        write_ms = [ms for out in outputs for ms in out[1]]
+        errors = sum(out[3] for out in outputs)
+        written = sum(len(out[2]) for out in outputs)
+        store = open_backend(backend, tmp)
+        try:
+            lost = sum(
+                (store.get(user_id) or {}).get("adventureRank") != rank
+                for out in outputs for user_id, rank in out[2].items()
+            )
+            final = f"{lost}/{written}"
+        except ValueError:
+            # Interleaved rewrites left the JSON file unparseable: every user is gone
+            final = "file corrupt"
+
+    print(f"{backend:>7} {args.workers * args.ops / elapsed:>8.0f} "
+          f"{bench_utils.percentile(read_ms, 50):>8.2f} {bench_utils.percentile(read_ms, 99):>8.2f} "
+          f"{bench_utils.percentile(write_ms, 50):>8.2f} {bench_utils.percentile(write_ms, 99):>8.2f} "
+          f"{errors:>7} {final:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=300, help="requests per worker")
+    parser.add_argument("--write-fraction", type=float, default=0.2)
+    parser.add_argument("--backends", default="json,sqlite")
+    args = parser.parse_args()
+
+    print(f"{args.users} users, {args.workers} processes x {args.ops} requests, "
+          f"{args.write_fraction:.0%} saves")
+    print(f"{'backend':>7} {'req/s':>8} {'get p50':>8} {'get p99':>8} {'put p50':>8} {'put p99':>8} "
+          f"{'failed':>7} {'lost updates':>12}")
+    for backend in args.backends.split(","):
+        run(backend, args)
+
+
+if __name__ == "__main__":
+    main()
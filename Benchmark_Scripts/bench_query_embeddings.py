@@ -0,0 +1,97 @@
+"""Query embedding latency: cold, warm and cached, as histograms.
+
+cold:   the first embed_query in a fresh process (--cold-runs subprocesses),
+        which is what the first request paid before the startup warm-up
+warm:   distinct queries after CachedEmbeddings.warm_up(), all cache misses
+cached: the same queries again with different case and spacing, all hits
+
+    python Benchmark_Scripts/bench_query_embeddings.py [--embedder auto] [--queries 200] [--threads 0]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import bench_utils
+
+from query_embeddings import CachedEmbeddings, set_torch_threads
+
+BUCKETS_MS = [0.01, 0.03, 0.1, 0.3, 1, 3, 10, 30, 100, 300, 1000, 3000]
+
+
+def histogram(name, values):
+    print(f"{name}: n={len(values)}, p50 {bench_utils.percentile(values, 50):.3f} ms, "
+          f"p99 {bench_utils.percentile(values, 99):.3f} ms")
+    counts = [0] * (len(BUCKETS_MS) + 1)
+    for value in values:
+        counts[next((i for i, edge in enumerate(BUCKETS_MS) if value < edge), len(BUCKETS_MS))] += 1
+    peak = max(counts) or 1
+    for i, count in enumerate(counts):
+        if not count:
+            continue
+        label = f"< {BUCKETS_MS[i]:g} ms" if i < len(BUCKETS_MS) else f">= {BUCKETS_MS[-1]:g} ms"
+        print(f"  {label:>12} {count:>5} {'#' * max(1, round(40 * count / peak))}")
+
+
+def cold_run(embedder_name, threads):
+    # Runs in a fresh interpreter: load the model, then time the very first query
+    set_torch_threads(threads)
+    start = time.perf_counter()
+    embedder = bench_utils.load_embedder(embedder_name)
+    load_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    embedder.embed_query("Who is Zhongli?")
+    print(json.dumps({"load_ms": load_ms, "first_ms": (time.perf_counter() - start) * 1000}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embedder", default="auto")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--cold-runs", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = torch default)")
+    parser.add_argument("--cold-child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_child:
+        cold_run(args.embedder, args.threads)
+        return
+
+    cold, loads = [], []
+    for _ in range(args.cold_runs):
+        out = subprocess.run([sys.executable, __file__, "--cold-child", "--embedder", args.embedder,
+                              "--threads", str(args.threads)], capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        cold.append(result["first_ms"])
+        loads.append(result["load_ms"])
+    print(f"torch threads: {set_torch_threads(args.threads)}, model load p50 "
+          f"{bench_utils.percentile(loads, 50):.0f} ms")
+
+    base = [item["question"] for item in bench_utils.load_questions()]
+    queries = [f"{base[i % len(base)]} (variant {i})" for i in range(args.queries)]
+
+    embedder = CachedEmbeddings(bench_utils.load_embedder(args.embedder))
+    print(f"warm-up: {embedder.warm_up():.1f} ms")
+
+    warm = []
+    for query in queries:
+        start = time.perf_counter()
+        embedder.embed_query(query)
+        warm.append((time.perf_counter() - start) * 1000)
+
+    cached = []
+    for query in queries:
+        start = time.perf_counter()
+        embedder.embed_query(f"  {query.upper()} ")
+        cached.append((time.perf_counter() - start) * 1000)
+
+    histogram("cold (first query in a new process)", cold)
+    histogram("warm (cache miss after warm-up)", warm)
+    histogram("cached (normalized-text hit)", cached)
+    stats = embedder.stats()
+    print(f"cache: {stats['entries']} entries, {stats['bytes'] / 1024:.0f} KiB, hit rate {stats['hit_rate']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Offline re-ranking evaluation: answer-context precision and added latency.
+
+For each question in genshin_questions.json the retriever's top --k chunks
+(what the prompt would see) are scored:
+
+    precision   share of the k chunks that mention an expected entity
+    own page    share of the k chunks from an expected entity's own page
+    hit         share of questions with at least one relevant chunk
+
+Each configuration is run twice. The first pass has a cold score cache and
+the second reuses whatever scores the first cached. For each pass the script reports the latency
+added over plain retrieval (p50/p99 ms) and how many queries blew the
+budget and fell back to the retriever's order. The configurations are no
+re-ranking, the lexical scorer, the cross-encoder if sentence-transformers
+and the model can be loaded, and the cross-encoder (or lexical scorer) with
+a budget too small to finish. Its precision can differ a little from "none"
+because, with a re-ranker, each retrieval leg fetches --rerank-k candidates
+before fusion.
+
+    python Benchmark_Scripts/bench_rerank.py [--embedder auto] [--mode hybrid] [--k 3] [--rerank-k 30]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import bench_utils
+
+from docstore import load_vectorstore
+from hybrid_retrieval import BM25Index, HybridRetriever
+from incremental_index import update_index
+from reranker import LexicalScorer, Reranker, load_scorer
+
+
+def is_relevant(doc, entities):
+    text = doc.page_content.lower()
+    return any(e.lower() in text for e in entities)
+
+
+def is_own_page(doc, entities):
+    name = doc.metadata.get("name", "").lower()
+    return any(e.lower() in name for e in entities)
+
+
+def evaluate(retriever, questions, baseline=None):
+    precision = own = hits = 0
+    latencies = []
+    for item in questions:
+        start = time.perf_counter()
+        docs = retriever.invoke(item["question"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        relevant = [is_relevant(d, item["entities"]) for d in docs]
+        precision += sum(relevant) / max(1, len(docs))
+        own += sum(is_own_page(d, item["entities"]) for d in docs) / max(1, len(docs))
+        hits += any(relevant)
+    n = len(questions)
+    p50, p99 = bench_utils.percentile(latencies, 50), bench_utils.percentile(latencies, 99)
+    if baseline:
+        p50, p99 = p50 - baseline[0], p99 - baseline[1]
+    return {"precision": precision / n, "own_page": own / n, "hit": hits / n, "p50": p50, "p99": p99}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embedder", default="auto", help="auto, minilm, lexical or hash")
+    parser.add_argument("--index-dir", help="evaluate an existing index instead of building one")
+    parser.add_argument("--mode", default="hybrid", help="dense, lexical or hybrid")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--rerank-k", type=int, default=30)
+    parser.add_argument("--budget-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    embedder = bench_utils.load_embedder(args.embedder)
+    questions = bench_utils.load_questions()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = args.index_dir
+        if not index_dir:
+            index_dir = os.path.join(tmp, "genshin_vector_db")
+            update_index(embedder, index_dir=index_dir)
+        vectorstore = load_vectorstore(index_dir, embedder)
+        bm25 = BM25Index.load(index_dir)
+
+        def retriever(reranker=None):
+            return HybridRetriever(vectorstore=vectorstore, bm25=bm25, k=args.k, mode=args.mode,
+                                   lexical_budget_ms=None, reranker=reranker, rerank_k=args.rerank_k)
+
+        plain = retriever()
+        plain.invoke("warm up")
+        base = evaluate(plain, questions)
+        baseline = (base["p50"], base["p99"])
+
+        scorers = [LexicalScorer()]
+        model = load_scorer("auto")
+        if not isinstance(model, LexicalScorer):
+            scorers.append(model)
+        configs = [(s.name, Reranker(s, budget_ms=args.budget_ms)) for s in scorers]
+        # A budget no scorer can meet: every query should fall back to the retriever's order
+        configs.append((f"{scorers[-1].name} 0.01ms", Reranker(scorers[-1], budget_ms=0.01)))
+
+        print(f"{len(questions)} questions, {args.mode} retrieval, top {args.k} of {args.rerank_k} candidates, "
+              f"budget {args.budget_ms:.0f} ms")
+        print(f"{'re-ranker':>22} {'pass':>6} {'precision':>10} {'own page':>9} {'hit':>6} {'+p50 ms':>8} "
+              f"{'+p99 ms':>8} {'fallbacks':>10}")
+        print(f"{'none':>22} {'-':>6} {base['precision']:>10.3f} {base['own_page']:>9.3f} {base['hit']:>6.3f} "
+              f"{0:>8.2f} {0:>8.2f} {'-':>10}")
+        for name, reranker in configs:
+            for run in ("cold", "cached"):
+                fallbacks = reranker.fallbacks
+                r = evaluate(retriever(reranker), questions, baseline)
+                print(f"{name:>22} {run:>6} {r['precision']:>10.3f} {r['own_page']:>9.3f} {r['hit']:>6.3f} "
+                      f"{r['p50']:>8.2f} {r['p99']:>8.2f} {reranker.fallbacks - fallbacks:>10}")
+
+
+if __name__ == "__main__":
+    main()
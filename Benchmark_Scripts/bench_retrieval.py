@@ -0,0 +1,84 @@
+"""Offline retrieval evaluation: dense vs lexical (BM25) vs hybrid (RRF).
+
+For each question in genshin_questions.json, reports recall@k (share of
+questions with a chunk that mentions an expected entity in the top k) and
+p50/p99 retrieval latency, per mode.
+
+By default an index of the current corpus is built in a temporary directory
+with the selected embedder. Pass --index-dir to evaluate an existing index
+(it must have been built with the same embedder).
+
+    python Benchmark_Scripts/bench_retrieval.py [--embedder auto] [--k 3,10]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import bench_utils
+
+from docstore import load_vectorstore
+from hybrid_retrieval import BM25Index, HybridRetriever
+from incremental_index import update_index
+
+MODES = ("dense", "lexical", "hybrid")
+
+
+def is_relevant(doc, entities):
+    text = doc.page_content.lower()
+    return any(e.lower() in text for e in entities)
+
+
+def evaluate(vectorstore, bm25, questions, ks, mode):
+    retriever = HybridRetriever(vectorstore=vectorstore, bm25=bm25, k=max(ks), mode=mode, lexical_budget_ms=None)
+    hits = {k: 0 for k in ks}
+    latencies = []
+    for item in questions:
+        start = time.perf_counter()
+        docs = retriever.invoke(item["question"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        for k in ks:
+            hits[k] += any(is_relevant(d, item["entities"]) for d in docs[:k])
+
+    result = {"mode": mode}
+    result.update({f"recall@{k}": round(hits[k] / len(questions), 3) for k in ks})
+    result["p50_ms"] = round(bench_utils.percentile(latencies, 50), 2)
+    result["p99_ms"] = round(bench_utils.percentile(latencies, 99), 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embedder", default="auto", help="auto, minilm, lexical or hash")
+    parser.add_argument("--index-dir", help="evaluate an existing index instead of building one")
+    parser.add_argument("--k", default="3,10")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    ks = [int(k) for k in args.k.split(",")]
+    embedder = bench_utils.load_embedder(args.embedder)
+    questions = bench_utils.load_questions()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = args.index_dir
+        if not index_dir:
+            index_dir = os.path.join(tmp, "genshin_vector_db")
+            update_index(embedder, index_dir=index_dir)
+        vectorstore = load_vectorstore(index_dir, embedder)
+        bm25 = BM25Index.load(index_dir)
+        # Warm up both legs before timing
+        HybridRetriever(vectorstore=vectorstore, bm25=bm25).invoke("warm up")
+        results = [evaluate(vectorstore, bm25, questions, ks, mode) for mode in MODES]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = list(results[0])
+    print(" ".join(f"{c:>10}" for c in columns))
+    for row in results:
+        print(" ".join(f"{row[c]!s:>10}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Scraping throughput: the old serial requests loop vs the async fetch engine.
+
+Runs scrape_character_lore.py's page list (overview + lore for every
+character) against mock_wiki.MockWikiServer, which adds --latency seconds
+per response. The script reports pages/sec for:
+- serial: the original loop (a bare ``requests.get`` per page, no session)
+- engine: FetchEngine at several concurrency levels, with every
+  --fail-every'th response a 503 so retries are included
+
+With one CPU, parsing soon becomes the limit; --fetch-only replaces the
+parser with a byte count to show the engine's own throughput.
+
+It then checks resume: a run is cut off halfway, and a second run with the
+same checkpoint fetches only the pages the first one didn't finish.
+Outputs go to a temporary directory, never to data/.
+
+    python Benchmark_Scripts/bench_scraper.py [--latency 0.1] [--levels 4,8,16,32] [--fail-every 25]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import bench_utils
+import requests
+
+from mock_wiki import MockWikiServer
+
+sys.path.insert(0, os.path.join(bench_utils.ROOT_DIR, "Scraping_Scripts"))
+os.environ["TQDM_DISABLE"] = "1"
+
+
+def serial(urls, parse):
+    # What the scripts did before the engine
+    results = {}
+    for url in urls:
+        r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
+        if r.status_code == 200:
+            results[url] = parse(url, r)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.1, help="server response time in seconds")
+    parser.add_argument("--levels", default="4,8,16,32", help="comma-separated engine concurrency levels")
+    parser.add_argument("--fail-every", type=int, default=25, help="every Nth response is a 503 (0 = never)")
+    parser.add_argument("--fetch-only", action="store_true", help="skip HTML parsing in every run")
+    args = parser.parse_args()
+
+    with MockWikiServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        os.environ["WIKI_BASE_URL"] = f"{server.url}/wiki"
+        import scrape_character_lore
+        from fetch_engine import Checkpoint, FetchEngine
+
+        os.chdir(tmp)
+        urls = [f"{scrape_character_lore.base_url}/{name}{suffix}"
+                for name in dict.fromkeys(scrape_character_lore.characters) for suffix in ("", "/Lore")]
+        parse = scrape_character_lore.parse_wiki_response
+        if args.fetch_only:
+            parse = scrape_character_lore.parse_wiki_response = lambda url, response: {"bytes": len(response.content)}
+        print(f"{len(urls)} pages, {args.latency * 1000:.0f} ms server latency")
+
+        start = time.perf_counter()
+        expected = serial(urls, parse)
+        elapsed = time.perf_counter() - start
+        print(f"{'serial requests.get':>22}: {len(urls) / elapsed:>7.1f} pages/s ({elapsed:.1f}s)")
+
+        server.fail_every = args.fail_every
+        for level in [int(x) for x in args.levels.split(",")]:
+            engine = FetchEngine(concurrency=level, per_host=level, rate=None, base_delay=0.05)
+            start = time.perf_counter()
+            scrape_character_lore.scrape_all_characters(engine, fresh=True)
+            elapsed = time.perf_counter() - start
+            print(f"{f'engine, concurrency {level}':>22}: {len(urls) / elapsed:>7.1f} pages/s ({elapsed:.1f}s, "
+                  f"{engine.stats['retries']} retries, {engine.stats['failed']} failed)")
+
+        # Resume: stop a run halfway, then finish it from the checkpoint
+        level = int(args.levels.split(",")[0])
+        checkpoint = Checkpoint("resume_bench", fresh=True)
+        engine = FetchEngine(concurrency=level, per_host=level, rate=None, base_delay=0.05)
+        cutoff = len(urls) / 2 / level * args.latency
+        try:
+            asyncio.run(asyncio.wait_for(engine.run(urls, parse, checkpoint), timeout=cutoff))
+        except asyncio.TimeoutError:
+            pass
+        checkpoint.close()
+        first = len(Checkpoint("resume_bench").results)
+
+        checkpoint = Checkpoint("resume_bench")
+        engine = FetchEngine(concurrency=level, per_host=level, rate=None, base_delay=0.05)
+        results = engine.run_sync(urls, parse, checkpoint)
+        engine.finish(checkpoint)
+        print(f"resume: first run stopped after {first}/{len(urls)} pages; the rerun resumed "
+              f"{engine.stats['resumed']} and fetched {engine.stats['fetched']}; "
+              f"output {'matches' if results == expected else 'DIFFERS from'} the serial run")
+
+
+if __name__ == "__main__":
+    main()
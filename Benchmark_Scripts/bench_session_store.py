@@ -0,0 +1,77 @@
+"""Session store: throughput, latency and eviction with 100k synthetic sessions.
+
+Each backend receives --sessions sessions of --exchanges exchanges each,
+under a --max-mb history budget. A small set of "active" sessions is read
+and written between every batch of new ones. LRU eviction should keep all
+of them while the idle ones are evicted. The old dict dropped the first 10
+keys it had ever seen, whether or not they were in use.
+
+    python Benchmark_Scripts/bench_session_store.py [--sessions 100000] [--max-mb 32]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import bench_utils
+
+from build_index import peak_rss_mb
+from session_store import MemorySessionStore, SQLiteSessionStore, new_session_id
+
+
+def run(store, args):
+    active = [new_session_id() for _ in range(args.active)]
+    question = ("User", "What is Zhongli's connection to the Geo Archon and the Liyue Harbor contract?")
+    answer = ("Akasha", "Zhongli, a consultant of the Wangsheng Funeral Parlor, is " + "lore " * 150)
+
+    write_ms, read_ms = [], []
+    start = time.perf_counter()
+    for i in range(args.sessions):
+        session_id = new_session_id()
+        for _ in range(args.exchanges):
+            t = time.perf_counter()
+            store.append(session_id, question, answer)
+            write_ms.append((time.perf_counter() - t) * 1000)
+        if i % 100 == 0:
+            for session_id in active:
+                t = time.perf_counter()
+                store.get(session_id)
+                read_ms.append((time.perf_counter() - t) * 1000)
+                store.append(session_id, question, answer)
+    elapsed = time.perf_counter() - start
+
+    survivors = sum(store.get(session_id) is not None for session_id in active)
+    stats = store.stats()
+    print(f"{stats['backend']:>7}: {args.sessions / elapsed:>8.0f} sessions/s, "
+          f"append p50 {bench_utils.percentile(write_ms, 50):.3f} / p99 {bench_utils.percentile(write_ms, 99):.3f} ms, "
+          f"get p50 {bench_utils.percentile(read_ms, 50):.3f} / p99 {bench_utils.percentile(read_ms, 99):.3f} ms")
+    print(f"         kept {stats['sessions']} sessions in {stats['bytes'] / 1e6:.1f} MB "
+          f"(budget {stats['max_bytes'] / 1e6:.0f} MB), {stats['evictions']} evicted, "
+          f"active sessions kept {survivors}/{len(active)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--exchanges", type=int, default=2)
+    parser.add_argument("--active", type=int, default=50)
+    parser.add_argument("--max-mb", type=float, default=32)
+    args = parser.parse_args()
+    max_bytes = int(args.max_mb * 1024 * 1024)
+
+    run(MemorySessionStore(max_bytes=max_bytes), args)
+    print(f"         peak RSS {peak_rss_mb()[0]:.0f} MB")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.db")
+        run(SQLiteSessionStore(path, max_bytes=max_bytes), args)
+        print(f"         database {os.path.getsize(path) / 1e6:.1f} MB on disk")
+
+        # A restarted worker opens the same file and sees the same sessions
+        start = time.perf_counter()
+        reopened = SQLiteSessionStore(path, max_bytes=max_bytes)
+        print(f"reopen after restart: {(time.perf_counter() - start) * 1000:.1f} ms, "
+              f"{reopened.stats()['sessions']} sessions")
+
+
+if __name__ == "__main__":
+    main()
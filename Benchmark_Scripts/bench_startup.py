@@ -0,0 +1,195 @@
+"""Cold start: time to first healthy and time to first answer, with and without background initialization.
+
+Each run starts the API in a fresh uvicorn process, in a temporary working
+directory that holds an index of the corpus (built once with --embedder).
+The parent polls /api/health from the moment it spawns the process and
+records:
+
+    accepting      first response of any kind (503 "starting" with background init)
+    healthy        first 200 from /api/health
+    first answer   a POST /api/chat sent as soon as the server accepts, answered
+
+The LLM clients are replaced by a fake that takes --llm-delay seconds. The
+embedder is --embedder, plus --model-load-s seconds of simulated loading for
+the offline embedders, which load instantly, unlike MiniLM. With
+BACKGROUND_INIT=1 the server accepts right after its imports, and a chat sent
+that early gets a 503 with Retry-After that the client honours (scaled down
+to --retry-s). The script reports the median over --runs runs of each mode
+and the startup profile (akasha_startup_phase_seconds from /metrics) of the
+last run. --importtime adds the slowest modules of `import app`.
+
+    python Benchmark_Scripts/bench_startup.py [--runs 3] [--model-load-s 3] [--importtime]
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import bench_utils
+import httpx
+
+PHASE_RE = re.compile(r'^akasha_startup_phase_seconds\{phase="([^"]+)"\} (\S+)$', re.MULTILINE)
+
+
+# ------------------------------------------
+# Server process
+# ------------------------------------------
+def serve(args):
+    """Runs in the child: the API with fake LLM clients, from the prepared working directory."""
+    os.chdir(args.child)
+    import uvicorn
+
+    import app
+    from query_embeddings import CachedEmbeddings
+
+    def create_llms(api_key):
+        llm = bench_utils.fake_delayed_llm(args.llm_delay)
+        return llm, llm, llm
+
+    def create_embedder():
+        embedder = bench_utils.load_embedder(args.embedder)
+        if args.embedder in ("lexical", "hash"):
+            time.sleep(args.model_load_s)
+        return CachedEmbeddings(embedder, max_bytes=app.QUERY_EMBEDDING_CACHE_BYTES)
+
+    app.create_llms = create_llms
+    app.create_embedder = create_embedder
+    uvicorn.run(app.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def prepare_workdir(tmp, index_dir):
+    """A directory that looks like the repository root to app.py, with its own SQLite files."""
+    workdir = os.path.join(tmp, "server")
+    os.makedirs(os.path.join(workdir, "data"))
+    os.symlink(os.path.abspath(index_dir), os.path.join(workdir, "genshin_vector_db"))
+    for name in os.listdir("data"):
+        if name.endswith(".json"):
+            os.symlink(os.path.abspath(os.path.join("data", name)), os.path.join(workdir, "data", name))
+    return workdir
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ------------------------------------------
+# Measurements
+# ------------------------------------------
+def measure(args, workdir, background, question):
+    port = free_port()
+    env = dict(os.environ, BACKGROUND_INIT="1" if background else "0",
+               GROQ_API_KEY=os.getenv("GROQ_API_KEY", "bench"))
+    command = [sys.executable, os.path.abspath(__file__), "--child", workdir, "--port", str(port),
+               "--embedder", args.embedder, "--model-load-s", str(args.model_load_s),
+               "--llm-delay", str(args.llm_delay)]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+    accepting = healthy = answered = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+            while accepting is None:
+                if process.poll() is not None:
+                    raise SystemExit(f"❌ Server exited with status {process.returncode}")
+                try:
+                    status = client.get("/api/health").status_code
+                except httpx.TransportError:
+                    time.sleep(0.01)
+                    continue
+                accepting = time.perf_counter() - start
+                if status == 200:
+                    healthy = accepting
+
+            # The first question goes out as soon as the server accepts
+            while answered is None:
+                response = client.post("/api/chat", json={"message": question})
+                if response.status_code == 503:
+                    time.sleep(min(float(response.headers.get("Retry-After", 1)), args.retry_s))
+                    continue
+                response.raise_for_status()
+                answered = time.perf_counter() - start
+
+            while healthy is None:
+                if client.get("/api/health").status_code == 200:
+                    healthy = time.perf_counter() - start
+                else:
+                    time.sleep(0.01)
+            phases = dict((name, float(value)) for name, value in PHASE_RE.findall(client.get("/metrics").text))
+    finally:
+        process.terminate()
+        process.wait()
+    return {"accepting": accepting, "healthy": healthy, "answer": answered}, phases
+
+
+def import_profile(workdir, top):
+    """The modules that take longest to import (cumulative) in `import app`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=workdir,
+                            env=dict(os.environ, PYTHONPATH=bench_utils.ROOT_DIR),
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embedder", default="lexical", help="lexical, hash, minilm or auto")
+    parser.add_argument("--index-dir", help="serve an existing index instead of building one")
+    parser.add_argument("--runs", type=int, default=3, help="server starts per mode")
+    parser.add_argument("--model-load-s", type=float, default=3.0,
+                        help="simulated model load for the lexical and hash embedders")
+    parser.add_argument("--llm-delay", type=float, default=0.2, help="fake LLM latency in seconds")
+    parser.add_argument("--retry-s", type=float, default=0.1, help="cap on a 503's Retry-After")
+    parser.add_argument("--importtime", action="store_true", help="also profile `import app`")
+    parser.add_argument("--top", type=int, default=10, help="modules listed by --importtime")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        serve(args)
+        return
+
+    question = bench_utils.load_questions()[0]["question"]
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = args.index_dir
+        if not index_dir:
+            # Imported here: the server process runs this script too, and must import the retrieval stack only when app.py does
+            from incremental_index import update_index
+            index_dir = os.path.join(tmp, "genshin_vector_db")
+            print(f"🏗️ Building the index ({args.embedder} embeddings)...")
+            update_index(bench_utils.load_embedder(args.embedder), index_dir=index_dir)
+        workdir = prepare_workdir(tmp, index_dir)
+
+        print(f"{args.runs} starts per mode, model load {args.model_load_s:.1f} s, LLM {args.llm_delay:.2f} s")
+        print(f"{'BACKGROUND_INIT':>16} {'accepting s':>12} {'healthy s':>10} {'first answer s':>15}")
+        for background in (False, True):
+            runs = []
+            for _ in range(args.runs):
+                times, phases = measure(args, workdir, background, question)
+                runs.append(times)
+            median = {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+            print(f"{int(background):>16} {median['accepting']:>12.2f} {median['healthy']:>10.2f} "
+                  f"{median['answer']:>15.2f}")
+
+        print("\nStartup profile (last run, akasha_startup_phase_seconds):")
+        for name, seconds in phases.items():
+            print(f"{name:>16} {seconds * 1000:>8.0f} ms")
+
+        if args.importtime:
+            print("\nSlowest imports in `import app` (cumulative):")
+            for microseconds, module in import_profile(workdir, args.top):
+                print(f"{microseconds / 1000:>8.0f} ms {module}")
+
+
+if __name__ == "__main__":
+    main()
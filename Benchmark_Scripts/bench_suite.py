@@ -0,0 +1,303 @@
+"""Reproducible benchmark suite: index build, retrieval quality and latency, memory and chat throughput.
+
+One run builds an index of the current corpus in a temporary directory with
+the given chunk size (--max-chars) and embedder, then measures:
+
+    build       seconds to chunk, embed and index the corpus; chunk count; index size on disk
+    retrieval   p50/p95/p99 latency of the retriever the API uses, at --k
+    quality     recall@1/k/10 (a chunk mentions an expected entity), source
+                recall@k (a chunk comes from an expected entity's own page) and
+                MRR@10, over genshin_questions.json
+    memory      peak RSS of the run and RSS once the index is loaded
+    chat        POST /api/chat requests/sec and p50/p99 with --clients concurrent
+                clients, in-process, against a fake LLM that takes --llm-delay seconds
+
+Everything runs offline. The default lexical embedder is deterministic, so
+the quality numbers repeat exactly from run to run. Results are written as
+JSON (--out). With --baseline, every gated metric is compared with an earlier
+result file. The script exits with status 1 if a timing, size or throughput
+metric is more than --threshold worse (relative), ignoring changes below the
+metric's noise floor. It also exits with 1 if a quality metric drops by more
+than --quality-threshold (absolute, default 0). Quality is deterministic, so
+any drop there is real.
+
+    python Benchmark_Scripts/bench_suite.py --out results/main.json
+    python Benchmark_Scripts/bench_suite.py --max-chars 500 --k 5 --baseline results/main.json
+    python Benchmark_Scripts/bench_suite.py --compare results/main.json results/branch.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import bench_utils
+import httpx
+
+import app
+from docstore import load_vectorstore
+from document_builder import DEFAULT_MAX_CHARS, iter_documents
+from entity_router import EntityRouter
+from hybrid_retrieval import BM25Index, HybridRetriever
+from incremental_index import update_index
+
+SCHEMA_VERSION = 1
+
+# metric -> (better direction, noise floor in the metric's own unit); only
+# these are compared against a baseline. "quality." metrics are gated on an
+# absolute drop instead of a relative one
+GATED = {
+    "build.seconds": ("lower", 0.5),
+    "index.mb": ("lower", 0.05),
+    "retrieval.p50_ms": ("lower", 0.1),
+    "retrieval.p95_ms": ("lower", 0.2),
+    "quality.recall@k": ("higher", None),
+    "quality.source_recall@k": ("higher", None),
+    "quality.mrr@10": ("higher", None),
+    "memory.peak_rss_mb": ("lower", 10.0),
+    "chat.rps": ("higher", 1.0),
+    "chat.p99_ms": ("lower", 10.0),
+}
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def directory_mb(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)) / 2**20
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def mentions(doc, entities):
+    text = doc.page_content.lower()
+    return any(e.lower() in text for e in entities)
+
+
+def own_page(doc, entities):
+    name = doc.metadata.get("name", "").lower()
+    return any(e.lower() in name for e in entities)
+
+
+# ------------------------------------------
+# Stages
+# ------------------------------------------
+def bench_build(embedder, index_dir, max_chars):
+    start = time.perf_counter()
+    update_index(embedder, iter_documents(max_chars), index_dir=index_dir, full=True)
+    seconds = time.perf_counter() - start
+    with open(os.path.join(index_dir, "manifest.json"), encoding="utf-8") as f:
+        chunks = len(json.load(f).get("chunks", []))
+    return {"build.seconds": seconds, "build.chunks": chunks, "index.mb": directory_mb(index_dir)}
+
+
+def bench_quality(retriever, questions, k):
+    recall = {1: 0, k: 0, 10: 0}
+    source = reciprocal = 0.0
+    for item in questions:
+        docs = retriever.invoke(item["question"])
+        relevant = [mentions(d, item["entities"]) for d in docs]
+        for cutoff in recall:
+            recall[cutoff] += any(relevant[:cutoff])
+        source += any(own_page(d, item["entities"]) for d in docs[:k])
+        reciprocal += next((1 / rank for rank, hit in enumerate(relevant, start=1) if hit), 0.0)
+    n = len(questions)
+    return {
+        "quality.recall@1": recall[1] / n,
+        "quality.recall@k": recall[k] / n,
+        "quality.recall@10": recall[10] / n,
+        "quality.source_recall@k": source / n,
+        "quality.mrr@10": reciprocal / n,
+    }
+
+
+def bench_latency(retriever, questions, rounds):
+    latencies = []
+    for _ in range(rounds):
+        for item in questions:
+            start = time.perf_counter()
+            retriever.invoke(item["question"])
+            latencies.append((time.perf_counter() - start) * 1000)
+    return {f"retrieval.p{p}_ms": bench_utils.percentile(latencies, p) for p in (50, 95, 99)}
+
+
+async def bench_chat(questions, requests, clients):
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+    latencies = []
+
+    async def client_loop(client):
+        while not queue.empty():
+            i = queue.get_nowait()
+            start = time.perf_counter()
+            # A fresh session per request: every answer goes through retrieval and the LLM
+            response = await client.post("/api/chat", json={"message": questions[i % len(questions)]["question"],
+                                                            "session_id": f"bench_{i}"})
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    return {"chat.rps": requests / elapsed, "chat.p50_ms": bench_utils.percentile(latencies, 50),
+            "chat.p99_ms": bench_utils.percentile(latencies, 99)}
+
+
+def run_suite(args):
+    config = {
+        "embedder": args.embedder,
+        "max_chars": args.max_chars,
+        "k": args.k,
+        "mode": args.mode,
+        "rounds": args.rounds,
+        "chat_requests": args.requests,
+        "clients": args.clients,
+        "llm_delay": args.llm_delay,
+    }
+    questions = bench_utils.load_questions(args.questions) if args.questions else bench_utils.load_questions()
+    embedder = bench_utils.load_embedder(args.embedder)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = os.path.join(tmp, "genshin_vector_db")
+        print(f"🏗️ Building the index ({args.embedder} embeddings, max {args.max_chars} chars per chunk)...")
+        results.update(bench_build(embedder, index_dir, args.max_chars))
+
+        vectorstore = load_vectorstore(index_dir, embedder)
+        bm25 = BM25Index.load(index_dir)
+        router = EntityRouter.from_vectorstore(vectorstore)
+        results["memory.rss_after_load_mb"] = rss_mb()
+
+        def retriever(k):
+            return HybridRetriever(vectorstore=vectorstore, bm25=bm25, router=router, k=k, mode=args.mode,
+                                   lexical_budget_ms=None)
+
+        print(f"🔎 Retrieval over {len(questions)} questions...")
+        results.update(bench_quality(retriever(max(args.k, 10)), questions, args.k))
+        timed = retriever(args.k)
+        timed.invoke("warm up")
+        results.update(bench_latency(timed, questions, args.rounds))
+
+        print(f"💬 {args.requests} chat requests from {args.clients} clients...")
+        app.vectorstore, app.bm25_index, app.entity_router = vectorstore, bm25, router
+        app.groq_llm = bench_utils.fake_delayed_llm(args.llm_delay)
+        app.rag_chain = app.setup_modern_rag_chain(vectorstore, app.groq_llm, bm25, router)
+        results.update(asyncio.run(bench_chat(questions, args.requests, args.clients)))
+        results["memory.peak_rss_mb"] = peak_rss_mb()
+
+    return {
+        "schema": SCHEMA_VERSION,
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "questions": len(questions),
+        },
+        "config": config,
+        "results": {name: round(value, 4) for name, value in results.items()},
+    }
+
+
+# ------------------------------------------
+# Regression check
+# ------------------------------------------
+def compare(baseline, current, threshold, quality_threshold=0.0):
+    """Print a table of gated metrics; returns the names that regressed."""
+    if baseline.get("config") != current.get("config"):
+        print(f"⚠️ Configs differ: baseline {baseline.get('config')} vs current {current.get('config')}")
+    regressions = []
+    print(f"{'metric':>24} {'baseline':>10} {'current':>10} {'change':>8}  status")
+    for name, (better, floor) in GATED.items():
+        old, new = baseline["results"].get(name), current["results"].get(name)
+        if old is None or new is None:
+            continue
+        delta = new - old if better == "higher" else old - new
+        change = (new - old) / old if old else 0.0
+        if name.startswith("quality."):
+            worse, improved = -delta > quality_threshold, delta > quality_threshold
+        else:
+            significant = abs(delta) > floor and (old == 0 or abs(delta) / abs(old) > threshold)
+            worse, improved = significant and delta < 0, significant and delta > 0
+        if worse:
+            status = "❌ regression"
+            regressions.append(name)
+        elif improved:
+            status = "✅ improved"
+        else:
+            status = "ok"
+        print(f"{name:>24} {old:>10.4g} {new:>10.4g} {change:>+8.1%}  {status}")
+    return regressions
+
+
+def load_result(path):
+    with open(path, encoding="utf-8") as f:
+        result = json.load(f)
+    if result.get("schema") != SCHEMA_VERSION:
+        raise SystemExit(f"❌ {path} has schema {result.get('schema')}, expected {SCHEMA_VERSION}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embedder", default="lexical", help="lexical (deterministic), hash, minilm or auto")
+    parser.add_argument("--max-chars", type=int, default=DEFAULT_MAX_CHARS, help="chunk size (document_builder)")
+    parser.add_argument("--k", type=int, default=3, help="chunks retrieved per question")
+    parser.add_argument("--mode", default="hybrid", help="dense, lexical or hybrid")
+    parser.add_argument("--questions", help="question set (default Benchmark_Scripts/genshin_questions.json)")
+    parser.add_argument("--rounds", type=int, default=10, help="timed passes over the question set")
+    parser.add_argument("--requests", type=int, default=64, help="chat requests")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent chat clients")
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="fake LLM latency in seconds")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this earlier result file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression")
+    parser.add_argument("--quality-threshold", type=float, default=0.0, help="allowed absolute drop in quality")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="only compare two existing result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(load_result(args.compare[0]), load_result(args.compare[1]), args.threshold,
+                              args.quality_threshold)
+    else:
+        result = run_suite(args)
+        print(json.dumps(result, indent=2))
+        if args.out:
+            os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+            print(f"💾 Results written to {args.out}")
+        regressions = (compare(load_result(args.baseline), result, args.threshold, args.quality_threshold)
+                       if args.baseline else [])
+
+    if regressions:
+        print(f"❌ {len(regressions)} metric(s) regressed: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import itertools
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+# Benchmarks are run from the repository root (python Benchmark_Scripts/<name>.py),
+# so make the top-level modules importable
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+EMBEDDING_DIM = 384
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic 384-dim embedder so benchmarks run without the MiniLM model.
+
+    Each vector is seeded from the text's hash; ``cost_ms`` simulates the
+    per-call CPU time of the real encoder.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM, cost_ms=0.0):
+        self.dim = dim
+        self.cost_ms = cost_ms
+
+    def _embed(self, text):
+        seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:4], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def _spin(self, n=1):
+        if self.cost_ms:
+            deadline = time.perf_counter() + self.cost_ms * n / 1000
+            while time.perf_counter() < deadline:
+                pass
+
+    def embed_documents(self, texts):
+        self._spin(len(texts))
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        self._spin()
+        return self._embed(text)
+
+
+class LexicalEmbeddings(Embeddings):
+    """Feature-hashed bag-of-words embedder.
+
+    Used for retrieval-quality benchmarks when the MiniLM model cannot be
+    loaded; it ranks by word overlap, which is enough to compare chunking
+    strategies against each other.
+    """
+
+    _TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in self._TOKEN_RE.findall(text.lower()):
+            bucket = int.from_bytes(hashlib.md5(token.encode("utf-8")).digest()[:4], "little")
+            vector[bucket % self.dim] += 1.0
+        vector = np.log1p(vector)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def load_embedder(name="auto"):
+    """Return the MiniLM embedder, falling back to LexicalEmbeddings offline."""
+    if name in ("auto", "minilm"):
+        try:
+            from langchain_huggingface import HuggingFaceEmbeddings
+            return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        except Exception as e:
+            if name == "minilm":
+                raise
+            print(f"⚠️ MiniLM unavailable ({e.__class__.__name__}); using lexical embeddings")
+    if name == "hash":
+        return HashEmbeddings()
+    return LexicalEmbeddings()
+
+
+def load_questions(path=os.path.join(ROOT_DIR, "Benchmark_Scripts", "genshin_questions.json")):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def count_tokens(text):
+    # Rough token estimate (~4 characters per token for English prose)
+    return max(1, len(text) // 4)
+
+
+def fake_delayed_llm(delay=0.5, text="Ad astra abyssosque, Traveler."):
+    """Stand-in for ChatGroq that waits ``delay`` seconds before answering."""
+
+    def invoke(prompt_value):
+        time.sleep(delay)
+        return AIMessage(content=text)
+
+    async def ainvoke(prompt_value):
+        await asyncio.sleep(delay)
+        return AIMessage(content=text)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+
+def fake_texts(n):
+    names = ["Zhongli", "Venti", "Raiden Shogun", "Nahida", "Furina", "Amber", "Xiao", "Kuki Shinobu"]
+    topics = ["lore", "vision", "weapon", "region", "constellation", "story quest"]
+    return [
+        f"{name} {topic} entry {i}: notes about {name} and their {topic} in Teyvat."
+        for i, (name, topic) in zip(range(n), itertools.cycle(itertools.product(names, topics)))
+    ]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    return float(np.percentile(np.asarray(values, dtype=np.float64), pct))
@@ -0,0 +1,72 @@
+"""Concurrency load test for POST /api/chat.
+
+Drives the FastAPI app in-process with a fake LLM that sleeps ``--delay``
+seconds per completion, and reports requests/sec at increasing numbers of
+concurrent clients. With the async pipeline, throughput should scale close
+to linearly with concurrency until the retrieval pool saturates.
+
+    python Benchmark_Scripts/load_test_chat.py --delay 0.5 --requests 64
+"""
+import argparse
+import asyncio
+import time
+
+import bench_utils
+import httpx
+from langchain_community.vectorstores import FAISS
+
+import app
+
+
+def setup_app(delay):
+    embedder = bench_utils.HashEmbeddings(cost_ms=2)
+    app.vectorstore = FAISS.from_texts(bench_utils.fake_texts(2000), embedder)
+    app.groq_llm = bench_utils.fake_delayed_llm(delay)
+    app.rag_chain = app.setup_modern_rag_chain(app.vectorstore, app.groq_llm)
+
+
+async def run_level(client, concurrency, total_requests):
+    queue = asyncio.Queue()
+    for i in range(total_requests):
+        queue.put_nowait(i)
+    latencies = []
+
+    async def worker(worker_id):
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            r = await client.post("/api/chat", json={
+                "message": f"Tell me about Zhongli ({i})",
+                "session_id": f"load_{concurrency}_{worker_id}",
+            })
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return total_requests / elapsed, latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.5, help="fake LLM latency in seconds")
+    parser.add_argument("--requests", type=int, default=64, help="requests per concurrency level")
+    parser.add_argument("--levels", default="1,4,16,64", help="comma-separated client counts")
+    args = parser.parse_args()
+
+    setup_app(args.delay)
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for level in (int(x) for x in args.levels.split(",")):
+            rps, latencies = await run_level(client, level, max(args.requests, level))
+            print(f"{level:>8} {rps:>8.1f} {bench_utils.percentile(latencies, 50):>8.0f} "
+                  f"{bench_utils.percentile(latencies, 99):>8.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
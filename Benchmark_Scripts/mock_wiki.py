@@ -0,0 +1,167 @@
+"""Local stand-in for the wiki and character API, serving canned pages.
+
+Routes mirror the real sites closely enough for the scraping scripts:
+
+    /wiki/<page>[/Lore]   Fandom article (div.mw-parser-output plus the usual chrome)
+    /characters/<id>      character API JSON
+    /db/char/             Honey Hunter character list
+    /db/char/<name>/      Honey Hunter character profile
+
+Every response waits ``latency`` seconds, like a remote server would, and
+``fail_every`` makes every Nth request answer 503 so retries get exercised.
+Pages carry an ETag and Last-Modified and answer conditional requests with
+304 until ``edit(path)`` changes them.
+"""
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+FILLER = ("The Archons shaped Teyvat after the Archon War, and each nation still bears the mark of its god. "
+          "Travelers who cross the land hear songs of the old gods and of the Abyss that waits beneath it. ")
+
+
+def wiki_page(path, paragraphs=12, revision=0):
+    # Laid out like a real Fandom article: the infobox inside the first <p>,
+    # headings with edit links, footnotes, a table of contents, thumbnails,
+    # stat tables, navboxes and a references list around the prose
+    title = unquote(path.rsplit("/", 1)[-1]).replace("_", " ")
+    scripts = "".join(f"<script>var wgConfig{i} = {json.dumps({'key': FILLER * 2})};</script>" for i in range(20))
+    nav = "".join(f'<li><a href="/wiki/Page_{i}">Page {i}</a></li>' for i in range(200))
+    infobox = "".join(f'<div class="pi-item pi-data pi-item-spacing pi-border-color" data-source="f{i}">'
+                      f'<h3 class="pi-data-label pi-secondary-font">Field {i}</h3>'
+                      f'<div class="pi-data-value pi-font">Value {i}</div></div>' for i in range(8))
+    sections = []
+    for s in range(4):
+        body = "".join(f"<p>{title} (section {s}, part {i}, revision {revision}). {FILLER * 3}"
+                       f"<a href='/wiki/Teyvat'>Teyvat</a> <b>lore</b>.<sup id=\"cite_ref-{s}-{i}\" class=\"reference\">"
+                       f"<a href=\"#cite_note-{i}\">[{i + 1}]</a></sup></p>\n" for i in range(paragraphs // 4))
+        items = "".join(f"<li>{title} fact {s}.{i}: {FILLER[:80]}</li>" for i in range(5))
+        sections.append(
+            f'<h2><span class="mw-headline" id="Section_{s}">Section {s}</span>'
+            f'<span class="mw-editsection"><span class="mw-editsection-bracket">[</span><a href="?action=edit">edit</a>'
+            f'<span class="mw-editsection-bracket">]</span></span></h2>\n'
+            f'<div class="thumb tright"><div class="thumbinner"><img src="/img/{s}.png" width="200">'
+            f'<div class="thumbcaption">Artwork of {title}</div></div></div>\n{body}'
+            f'<h3><span class="mw-headline" id="Details_{s}">Details {s}</span></h3>\n<ul>{items}</ul>\n')
+    table = "".join(f"<tr><td>{title} stat {i}</td><td>{i * 7}</td></tr>" for i in range(60))
+    refs = "".join(f'<li id="cite_note-{i}">Source {i}</li>' for i in range(paragraphs))
+    return f"""<!DOCTYPE html>
+<html><head><title>{title} | Genshin Impact Wiki | Fandom</title>{scripts}
+<style>.mw-parser-output {{ font-size: 14px; }}</style></head>
+<body><nav class="global-navigation"><ul>{nav}</ul></nav>
+<main class="page"><h1 class="page-header__title">{title}</h1>
+<div id="mw-content-text"><div class="mw-parser-output"><p><aside role="region" class="portable-infobox pi-background">
+<h2 class="pi-item pi-item-spacing pi-title" data-source="title">{title}</h2>
+<figure class="pi-item pi-image"><img src="/img/{title}.png"></figure>
+<section class="pi-item pi-group"><h2 class="pi-item pi-header">Details</h2>{infobox}</section></aside>
+</p><p><b>{title}</b> is a subject of the Genshin Impact wiki. {FILLER}</p>
+<div id="toc" class="toc"><ul><li>Section 0</li><li>Section 1</li></ul></div>
+{"".join(sections)}<h2><span class="mw-headline" id="Trivia">Trivia</span></h2><table class="wikitable">{table}</table>
+<table class="navbox"><tr><td><ul>{nav}</ul></td></tr></table>
+<h2><span class="mw-headline" id="References">References</span></h2>
+<div class="mw-references-wrap"><ol class="references">{refs}</ol></div>
+</div></div></main><footer>{FILLER}</footer></body></html>""".encode("utf-8")
+
+
+def character_json(char_id):
+    return json.dumps({"result": {"id": char_id, "name": f"Character {char_id}", "vision": "Pyro",
+                                  "weapon": "Bow", "rarity": "4_star", "description": FILLER}}).encode("utf-8")
+
+
+def honey_list(count=60):
+    links = "".join(f'<a class="char_sea_cont" href="/db/char/hero_{i}/">Hero {i}</a>' for i in range(count))
+    return f"<html><body><div class='char_list'>{links}</div></body></html>".encode("utf-8")
+
+
+def honey_profile(name):
+    rows = "".join(f'<div class="sea_char_box"><div title="Stat {i}">Stat {i}</div><div>{i * 11}</div></div>'
+                   for i in range(12))
+    return f"<html><body><div class='char_profile_stat_main'>{rows}</div></body></html>".encode("utf-8")
+
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-response (cancelled runs) are expected here
+        pass
+
+
+class MockWikiServer:
+    """Threaded HTTP server on 127.0.0.1; use as a context manager."""
+
+    def __init__(self, latency=0.05, fail_every=0, port=0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.revisions = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    count = server.requests
+                time.sleep(server.latency)
+                if server.fail_every and count % server.fail_every == 0:
+                    return self._send(503, b"busy", "text/plain")
+                path = self.path.split("#")[0]
+                if path.startswith("/wiki/"):
+                    return self._send(200, wiki_page(path, revision=server.revisions.get(path, 0)),
+                                      "text/html; charset=utf-8", path)
+                if path.startswith("/characters/"):
+                    return self._send(200, character_json(int(path.rsplit("/", 1)[-1])), "application/json")
+                if path == "/db/char/":
+                    return self._send(200, honey_list(), "text/html; charset=utf-8")
+                if path.startswith("/db/char/"):
+                    return self._send(200, honey_profile(path.strip("/").rsplit("/", 1)[-1]), "text/html; charset=utf-8")
+                self._send(404, b"not found", "text/plain")
+
+            def _send(self, status, body, content_type, path=None):
+                etag = last_modified = None
+                if path is not None:
+                    etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+                    last_modified = formatdate(server.started + server.revisions.get(path, 0), usegmt=True)
+                    if self.headers.get("If-None-Match") == etag:
+                        with server._lock:
+                            server.not_modified += 1
+                        status, body = 304, b""
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if etag:
+                    self.send_header("ETag", etag)
+                    self.send_header("Last-Modified", last_modified)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+        self.httpd = QuietServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def edit(self, path):
+        """Change the page at ``path`` (e.g. ``/wiki/Amber``) so its ETag changes."""
+        with self._lock:
+            self.revisions[path] = self.revisions.get(path, 0) + 1
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,17 @@
+import os
+import sys
+
+# corpus.py and document_builder.py live at the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from corpus import source_path  # noqa: E402
+from document_builder import export_source  # noqa: E402
+
+
+def write_corpus(source, entries):
+    """Write scraped ``(key, entry)`` pairs to ``data/corpus/<source>.jsonl`` next to the JSON output."""
+    count = export_source(source, entries)
+    print(f"📚 Wrote {count} corpus records to {source_path(source)}")
+    return count
@@ -1,19 +1,24 @@
-import requests
+import argparse
 import json
 import os
 
-def fetch_all_characters(base_url="https://gsi.fly.dev/characters", total_characters=52):
-    all_characters = []
+from fetch_engine import Checkpoint, FetchEngine, add_engine_arguments, engine_from_args
+from corpus_writer import write_corpus
 
-    for char_id in range(total_characters):
-        url = f"{base_url}/{char_id}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            character_data = response.json()
-            all_characters.append(character_data)
-            print(f"✅ Fetched character ID {char_id}: {character_data.get('name', 'Unknown')}")
-        else:
-            print(f"⚠️ Failed to fetch character ID {char_id}: {response.status_code}")
+# CHARACTER_API_URL points the fetcher at a mirror or a local test server
+CHARACTER_API_URL = os.getenv("CHARACTER_API_URL", "https://gsi.fly.dev/characters")
+
+def parse_character(url, response):
+    character_data = response.json()
+    print(f"✅ Fetched character ID {url.rsplit('/', 1)[-1]}: {character_data.get('name', 'Unknown')}")
+    return character_data
+
+def fetch_all_characters(base_url=CHARACTER_API_URL, total_characters=52, engine=None, fresh=False):
+    engine = engine or FetchEngine()
+    checkpoint = Checkpoint("characters", fresh=fresh)
+    urls = [f"{base_url}/{char_id}" for char_id in range(total_characters)]
+    results = engine.run_sync(urls, parse_character, checkpoint, desc="Fetching characters")
+    all_characters = [results[url] for url in urls if url in results]
 
     # Ensure data folder exists
     os.makedirs("data", exist_ok=True)
@@ -21,8 +26,14 @@ def fetch_all_characters(base_url="https://gsi.fly.dev/characters", total_charac
     # Save to JSON file
     with open("data/characters.json", "w", encoding="utf-8") as f:
         json.dump(all_characters, f, indent=2, ensure_ascii=False)
+    write_corpus("characters", enumerate(all_characters))
 
+    engine.finish(checkpoint)
     print(f"\n🎉 Saved {len(all_characters)} characters to data/characters.json")
 
 if __name__ == "__main__":
-    fetch_all_characters()
+    parser = argparse.ArgumentParser(description="Fetch every character from the character API")
+    parser.add_argument("--total", type=int, default=52, help="character IDs 0..total-1")
+    add_engine_arguments(parser)
+    args = parser.parse_args()
+    fetch_all_characters(total_characters=args.total, engine=engine_from_args(args), fresh=args.fresh)
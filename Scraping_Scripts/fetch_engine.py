@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import random
+import asyncio
+from urllib.parse import urlsplit
+
+import httpx
+from tqdm import tqdm
+
+from http_cache import CACHE_DIR, DEFAULT_MAX_BYTES, HttpCache
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0"
+}
+
+CHECKPOINT_DIR = "data/.checkpoints"
+
+# Worth another try; anything else (404, 403...) fails straight away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def retry_after(response):
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+# ------------------------------------------
+# Per-host limits
+# ------------------------------------------
+class HostLimiter:
+    """At most ``concurrency`` requests in flight and ``rate`` starts per second to one host."""
+
+    def __init__(self, concurrency, rate=None):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+
+    def pause(self, seconds):
+        # A 429 slows down every request to the host, not just the one that got it
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        try:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self._semaphore.release()
+
+
+# ------------------------------------------
+# Checkpoints
+# ------------------------------------------
+class Checkpoint:
+    """Append-only JSONL of finished pages, so an interrupted run can resume.
+
+    Each line is ``{"url": ..., "result": ...}``. A killed run can leave a
+    truncated last line, which is ignored on load.
+    """
+
+    def __init__(self, name, fresh=False, directory=CHECKPOINT_DIR):
+        self.path = os.path.join(directory, f"{name}.jsonl")
+        self.results = {}
+        self._file = None
+        if fresh and os.path.exists(self.path):
+            os.remove(self.path)
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.results[record["url"]] = record["result"]
+
+    def record(self, url, result):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps({"url": url, "result": result}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.results[url] = result
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# ------------------------------------------
+# Fetch engine
+# ------------------------------------------
+class FetchEngine:
+    """Fetches many pages concurrently over one pooled HTTP client.
+
+    At most ``concurrency`` requests are in flight overall and ``per_host``
+    to any one host, whose request starts are spaced to ``rate`` per second.
+    Timeouts, connection errors and 429/5xx responses are retried with
+    jittered exponential backoff (or the server's Retry-After). Parsing runs
+    in a worker thread so it never stalls the downloads.
+
+    With an ``HttpCache``, requests are conditional. Pages the server reports
+    unchanged (304) come from the cache, are flagged with
+    ``response.extensions["from_cache"]`` and collected in ``unchanged``, and
+    reuse their stored parse result unless ``reparse`` is set.
+    """
+
+    def __init__(self, concurrency=16, per_host=4, rate=5.0, max_retries=3, base_delay=0.5,
+                 timeout=20.0, headers=HEADERS, transport=None, cache=None, reparse=False):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.rate = rate
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.timeout = timeout
+        self.headers = headers
+        self.transport = transport
+        self.cache = cache
+        self.reparse = reparse
+        self._hosts = {}
+        self.unchanged = set()
+        self.stats = {"fetched": 0, "resumed": 0, "retries": 0, "failed": 0, "requests": 0,
+                      "not_modified": 0, "parses_skipped": 0, "bytes_downloaded": 0, "bytes_saved": 0}
+
+    def _limiter(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = HostLimiter(self.per_host, self.rate)
+        return self._hosts[host]
+
+    def _backoff(self, attempt):
+        return self.base_delay * 2 ** (attempt - 1) * (1 + random.random() / 4)
+
+    async def get(self, client, url):
+        """GET ``url`` with retries; raises ``httpx.HTTPError`` once they run out."""
+        limiter = self._limiter(url)
+        conditional = self.cache.validators(url) if self.cache else {}
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with limiter:
+                    response = await client.get(url, headers=conditional)
+                self.stats["requests"] += 1
+                if response.status_code == 304 and conditional:
+                    cached = self.cache.not_modified(url, response)
+                    if cached is not None:
+                        self.stats["not_modified"] += 1
+                        self.stats["bytes_saved"] += len(cached.content)
+                        return cached
+                    # Evicted since the request went out: fetch it unconditionally
+                    conditional = {}
+                    attempt -= 1
+                    continue
+                if response.status_code not in RETRY_STATUSES or attempt > self.max_retries:
+                    response.raise_for_status()
+                    self.stats["bytes_downloaded"] += len(response.content)
+                    if self.cache:
+                        self.cache.store(url, response)
+                    return response
+                delay = retry_after(response) or self._backoff(attempt)
+                if response.status_code == 429:
+                    limiter.pause(delay)
+            except httpx.TransportError:
+                if attempt > self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    async def run(self, urls, parse, checkpoint=None, desc="Fetching"):
+        """Fetch ``urls`` and return ``{url: parse(url, response)}``.
+
+        Pages already in ``checkpoint`` are not fetched again; new results are
+        added to it as they finish. Failed pages are reported and left out of
+        the result (and the checkpoint), so a rerun retries only those.
+        """
+        parser = f"{parse.__module__}.{parse.__qualname__}"
+        urls = list(dict.fromkeys(urls))
+        done = checkpoint.results if checkpoint else {}
+        results = {url: done[url] for url in urls if url in done}
+        self.stats["resumed"] += len(results)
+        # Limiters hold asyncio primitives, which belong to this run's event loop
+        self._hosts = {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+
+        async with httpx.AsyncClient(headers=self.headers, timeout=self.timeout, limits=limits,
+                                     follow_redirects=True, transport=self.transport) as client:
+            async def fetch(url):
+                async with semaphore:
+                    try:
+                        response = await self.get(client, url)
+                        found, result = False, None
+                        if response.extensions.get("from_cache"):
+                            self.unchanged.add(url)
+                            if not self.reparse:
+                                found, result = self.cache.parsed(url, parser)
+                        if found:
+                            self.stats["parses_skipped"] += 1
+                        else:
+                            result = await asyncio.to_thread(parse, url, response)
+                            if self.cache:
+                                self.cache.store_parsed(url, parser, result)
+                    except Exception as e:
+                        self.stats["failed"] += 1
+                        tqdm.write(f"⚠️ Failed: {url} ({e.__class__.__name__}: {e})")
+                        return
+                self.stats["fetched"] += 1
+                results[url] = result
+                if checkpoint:
+                    checkpoint.record(url, result)
+
+            tasks = [asyncio.create_task(fetch(url)) for url in urls if url not in results]
+            try:
+                with tqdm(total=len(urls), initial=len(urls) - len(tasks), desc=desc) as bar:
+                    for next_done in asyncio.as_completed(tasks):
+                        await next_done
+                        bar.update()
+            finally:
+                for task in tasks:
+                    task.cancel()
+        return results
+
+    def run_sync(self, urls, parse, checkpoint=None, desc="Fetching"):
+        return asyncio.run(self.run(urls, parse, checkpoint, desc))
+
+    def finish(self, checkpoint):
+        """Drop the checkpoint after a clean run; keep it if pages failed so a rerun retries them."""
+        if self.cache:
+            self.cache.record_run(self.stats)
+            requests = self.stats["requests"] or 1
+            print(f"📦 HTTP cache: {self.stats['not_modified']}/{self.stats['requests']} pages not modified "
+                  f"({self.stats['not_modified'] / requests:.0%}), {self.stats['bytes_saved'] / 2 ** 20:.1f} MB "
+                  f"not re-downloaded, {self.stats['parses_skipped']} parses skipped")
+        if self.stats["failed"]:
+            checkpoint.close()
+            print(f"⚠️ {self.stats['failed']} pages failed; rerun to retry them (progress kept in {checkpoint.path})")
+        else:
+            checkpoint.discard()
+
+
+# ------------------------------------------
+# CLI helpers
+# ------------------------------------------
+def add_engine_arguments(parser):
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight overall")
+    parser.add_argument("--per-host", type=int, default=4, help="requests in flight per host")
+    parser.add_argument("--rate", type=float, default=5.0, help="request starts per second per host (0 = unlimited)")
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--fresh", action="store_true", help="ignore the checkpoint of an interrupted run")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="conditional-GET response cache")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / 2 ** 20)
+    parser.add_argument("--no-cache", action="store_true", help="always download full pages")
+    parser.add_argument("--reparse", action="store_true", help="re-parse pages even when they are unchanged")
+
+
+def engine_from_args(args):
+    cache = None if args.no_cache else HttpCache(args.cache_dir, max_bytes=int(args.cache_max_mb * 2 ** 20))
+    return FetchEngine(concurrency=args.concurrency, per_host=args.per_host, rate=args.rate or None,
+                       max_retries=args.max_retries, cache=cache, reparse=args.reparse)
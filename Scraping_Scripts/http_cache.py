@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import argparse
+
+import httpx
+
+CACHE_DIR = "data/.http_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class HttpCache:
+    """On-disk cache of page bodies for conditional GETs.
+
+    Responses with an ETag or Last-Modified header are stored zlib-compressed
+    in SQLite. The next request for the URL sends If-None-Match /
+    If-Modified-Since, and a 304 is answered from the stored body. Each entry
+    can also keep the parsed result of the page, so unchanged pages don't
+    need re-parsing. When the compressed bodies and parsed results exceed
+    ``max_bytes``, the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(os.path.join(directory, "responses.db"), isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                parser TEXT,
+                parsed TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access);
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        """)
+        self._bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.evictions = 0
+
+    def validators(self, url):
+        """Conditional request headers for ``url``, or ``{}`` if it isn't cached."""
+        row = self.conn.execute("SELECT etag, last_modified FROM responses WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return {}
+        headers = {}
+        if row[0]:
+            headers["If-None-Match"] = row[0]
+        if row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def store(self, url, response):
+        """Keep a 200 response if it carries validators; replaces any parsed result."""
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+        body = zlib.compress(response.content, 6)
+        now = time.time()
+        old = self.conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL, ?, ?)",
+            (url, etag, last_modified, response.headers.get("content-type"), body, len(body),
+             len(response.content), now, now),
+        )
+        self._bytes += len(body) - (old[0] if old else 0)
+        self._evict()
+
+    def not_modified(self, url, response):
+        """Turn a 304 for ``url`` into the cached 200, flagged ``from_cache``; None if not cached."""
+        row = self.conn.execute("SELECT content_type, body, etag, last_modified FROM responses WHERE url = ?",
+                                (url,)).fetchone()
+        if row is None:
+            return None
+        # A 304 may carry fresher validators
+        etag = response.headers.get("etag") or row[2]
+        last_modified = response.headers.get("last-modified") or row[3]
+        self.conn.execute("UPDATE responses SET etag = ?, last_modified = ?, last_access = ? WHERE url = ?",
+                          (etag, last_modified, time.time(), url))
+        headers = {name: value for name, value in
+                   (("content-type", row[0]), ("etag", etag), ("last-modified", last_modified)) if value}
+        return httpx.Response(200, headers=headers, content=zlib.decompress(row[1]), request=response.request,
+                              extensions={"from_cache": True})
+
+    def parsed(self, url, parser):
+        """``(True, result)`` if ``parser`` already parsed the cached body of ``url``."""
+        row = self.conn.execute("SELECT parsed FROM responses WHERE url = ? AND parser = ?", (url, parser)).fetchone()
+        return (True, json.loads(row[0])) if row else (False, None)
+
+    def store_parsed(self, url, parser, result):
+        parsed = json.dumps(result, ensure_ascii=False)
+        # size covers the stored body and the parsed result, as they both take up the database
+        row = self.conn.execute("SELECT size, length(body) FROM responses WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return
+        size = row[1] + len(parsed.encode("utf-8"))
+        self.conn.execute("UPDATE responses SET parser = ?, parsed = ?, size = ? WHERE url = ?",
+                          (parser, parsed, size, url))
+        self._bytes += size - row[0]
+        self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes:
+            rows = self.conn.execute("SELECT url, size FROM responses ORDER BY last_access LIMIT 64").fetchall()
+            if not rows:
+                break
+            for url, size in rows:
+                if self._bytes <= self.max_bytes:
+                    break
+                self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._bytes -= size
+                self.evictions += 1
+
+    # ------------------------------------------
+    # Stats
+    # ------------------------------------------
+    def record_run(self, stats):
+        """Add a run's request counts to the lifetime counters."""
+        for name in ("requests", "not_modified", "bytes_downloaded", "bytes_saved"):
+            self.conn.execute(
+                "INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, stats.get(name, 0)),
+            )
+
+    def stats(self):
+        entries, raw = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(raw_size), 0) FROM responses").fetchone()
+        counters = dict(self.conn.execute("SELECT name, value FROM counters"))
+        requests = counters.get("requests", 0)
+        return {
+            "entries": entries,
+            "bytes": self._bytes,
+            "raw_bytes": raw,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            **{name: counters.get(name, 0) for name in ("requests", "not_modified", "bytes_downloaded", "bytes_saved")},
+            "not_modified_ratio": round(counters.get("not_modified", 0) / requests, 4) if requests else 0.0,
+        }
+
+    def clear(self):
+        self.conn.execute("DELETE FROM responses")
+        self.conn.execute("DELETE FROM counters")
+        self._bytes = 0
+
+    def close(self):
+        self.conn.close()
+
+
+# ------------------------------------------
+# CLI entry point
+# ------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or clear the scrapers' HTTP cache")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+
+    cache = HttpCache(args.cache_dir)
+    if args.clear:
+        cache.clear()
+        cache.conn.execute("VACUUM")
+        print(f"🧹 Cleared {args.cache_dir}")
+    print(json.dumps(cache.stats(), indent=2))
@@ -1,14 +1,13 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
 import json
 import os
-from tqdm import tqdm
 
-headers = {
-    "User-Agent": "Mozilla/5.0"
-}
+from fetch_engine import Checkpoint, FetchEngine, add_engine_arguments, engine_from_args
+from wiki_extract import parse_wiki_response
+from corpus_writer import write_corpus
 
-base_url = "https://genshin-impact.fandom.com/wiki"
+# WIKI_BASE_URL points the scraper at a mirror or a local test server
+base_url = os.getenv("WIKI_BASE_URL", "https://genshin-impact.fandom.com/wiki")
 
 # Replace with actual character list from Fandom
 characters = [
@@ -25,46 +24,44 @@ characters = [
     "Chasca","Citlali","Iansan","Kachina","Kinich","Mavuika","Mualani","Ororon","Varesa","Xilonen","Ifa"
 ]
 
-def get_wiki_content(url):
-    try:
-        r = requests.get(url, headers=headers)
-        if r.status_code != 200:
-            print(f"⚠️ Failed: {url}")
-            return ""
-        soup = BeautifulSoup(r.content, "html.parser")
-        content = soup.select_one("div.mw-parser-output")
-        if not content:
-            return ""
-        paragraphs = content.find_all("p", recursive=False)
-        text = "\n".join(p.get_text().strip() for p in paragraphs if p.get_text().strip())
-        return text
-    except Exception as e:
-        print(f"Error scraping {url}: {e}")
-        return ""
-
-def scrape_all_characters():
+def scrape_all_characters(engine=None, fresh=False):
     os.makedirs("data", exist_ok=True)
-    character_lore_data = {}
+    engine = engine or FetchEngine()
+    checkpoint = Checkpoint("character_lore", fresh=fresh)
 
-    for name in tqdm(characters, desc="Scraping Characters"):
+    urls = []
+    for name in characters:
+        urls += [f"{base_url}/{name}", f"{base_url}/{name}/Lore"]
+    pages = engine.run_sync(urls, parse_wiki_response, checkpoint, desc="Scraping Characters")
+
+    character_lore_data = {}
+    for name in characters:
         char_name = name.replace("_", " ")
         overview_url = f"{base_url}/{name}"
         lore_url = f"{base_url}/{name}/Lore"
 
-        overview = get_wiki_content(overview_url)
-        lore = get_wiki_content(lore_url)
+        overview = pages.get(overview_url, {})
+        lore = pages.get(lore_url, {})
 
         character_lore_data[char_name] = {
             "overview_url": overview_url,
             "lore_url": lore_url,
-            "overview": overview,
-            "lore": lore
+            "overview": overview.get("text", ""),
+            "lore": lore.get("text", ""),
+            "infobox": overview.get("infobox", {}),
+            "overview_sections": overview.get("sections", []),
+            "lore_sections": lore.get("sections", [])
         }
 
     with open("data/character_lore.json", "w", encoding="utf-8") as f:
         json.dump(character_lore_data, f, indent=2, ensure_ascii=False)
+    write_corpus("character_lore", character_lore_data.items())
 
+    engine.finish(checkpoint)
     print("✅ Character lore and overviews saved to data/character_lore.json")
 
 if __name__ == "__main__":
-    scrape_all_characters()
+    parser = argparse.ArgumentParser(description="Scrape character overviews and lore from the Fandom wiki")
+    add_engine_arguments(parser)
+    args = parser.parse_args()
+    scrape_all_characters(engine_from_args(args), fresh=args.fresh)
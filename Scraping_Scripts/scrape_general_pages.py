@@ -1,112 +1,104 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
 import json
 import os
-from tqdm import tqdm
 
-headers = {
-    "User-Agent": "Mozilla/5.0"
-}
+from fetch_engine import Checkpoint, FetchEngine, add_engine_arguments, engine_from_args
+from wiki_extract import parse_wiki_response
+from corpus_writer import write_corpus
+
+# WIKI_BASE_URL points the scraper at a mirror or a local test server
+base_url = os.getenv("WIKI_BASE_URL", "https://genshin-impact.fandom.com/wiki")
 
 # Paste all the links from your file that are NOT character-specific
 wiki_pages = [
     # Factions
-    "https://genshin-impact.fandom.com/wiki/The_Seven",
-    "https://genshin-impact.fandom.com/wiki/Adventurers%27_Guild",
-    "https://genshin-impact.fandom.com/wiki/Knights_of_Favonius",
-    "https://genshin-impact.fandom.com/wiki/Liyue_Qixing",
-    "https://genshin-impact.fandom.com/wiki/Inazuma_Shogunate",
-    "https://genshin-impact.fandom.com/wiki/Sumeru_Akademiya",
-    "https://genshin-impact.fandom.com/wiki/Palais_Mermonia",
-    "https://genshin-impact.fandom.com/wiki/Speaker%27s_Chamber",
-    "https://genshin-impact.fandom.com/wiki/Fatui",
+    f"{base_url}/The_Seven",
+    f"{base_url}/Adventurers%27_Guild",
+    f"{base_url}/Knights_of_Favonius",
+    f"{base_url}/Liyue_Qixing",
+    f"{base_url}/Inazuma_Shogunate",
+    f"{base_url}/Sumeru_Akademiya",
+    f"{base_url}/Palais_Mermonia",
+    f"{base_url}/Speaker%27s_Chamber",
+    f"{base_url}/Fatui",
 
     # Regions
-    "https://genshin-impact.fandom.com/wiki/Mondstadt",
-    "https://genshin-impact.fandom.com/wiki/Liyue",
-    "https://genshin-impact.fandom.com/wiki/Inazuma",
-    "https://genshin-impact.fandom.com/wiki/Sumeru",
-    "https://genshin-impact.fandom.com/wiki/Fontaine",
-    "https://genshin-impact.fandom.com/wiki/Natlan",
-    "https://genshin-impact.fandom.com/wiki/Snezhnaya",
-    "https://genshin-impact.fandom.com/wiki/Khaenri%27ah",
+    f"{base_url}/Mondstadt",
+    f"{base_url}/Liyue",
+    f"{base_url}/Inazuma",
+    f"{base_url}/Sumeru",
+    f"{base_url}/Fontaine",
+    f"{base_url}/Natlan",
+    f"{base_url}/Snezhnaya",
+    f"{base_url}/Khaenri%27ah",
 
     # Lore
-    "https://genshin-impact.fandom.com/wiki/Timeline",
-    "https://genshin-impact.fandom.com/wiki/Manga",
-    "https://genshin-impact.fandom.com/wiki/Book",
-    "https://genshin-impact.fandom.com/wiki/Comics",
-    "https://genshin-impact.fandom.com/wiki/Archon_War",
-    "https://genshin-impact.fandom.com/wiki/Cataclysm",
-    "https://genshin-impact.fandom.com/wiki/Celestia",
-    "https://genshin-impact.fandom.com/wiki/Khaenri%27ah"
-    "https://genshin-impact.fandom.com/wiki/Delusion",
-    "https://genshin-impact.fandom.com/wiki/Seven_Sovereigns",
-    "https://genshin-impact.fandom.com/wiki/Heavenly_Principles",
-    "https://genshin-impact.fandom.com/wiki/Dragon",
-    "https://genshin-impact.fandom.com/wiki/Lore#World_History",
+    f"{base_url}/Timeline",
+    f"{base_url}/Manga",
+    f"{base_url}/Book",
+    f"{base_url}/Comics",
+    f"{base_url}/Archon_War",
+    f"{base_url}/Cataclysm",
+    f"{base_url}/Celestia",
+    f"{base_url}/Khaenri%27ah",
+    f"{base_url}/Delusion",
+    f"{base_url}/Seven_Sovereigns",
+    f"{base_url}/Heavenly_Principles",
+    f"{base_url}/Dragon",
+    f"{base_url}/Lore#World_History",
 
 
     # Quests
-    "https://genshin-impact.fandom.com/wiki/Archon_Quest",
-    "https://genshin-impact.fandom.com/wiki/Story_Quest",
-    "https://genshin-impact.fandom.com/wiki/World_Quest",
-    "https://genshin-impact.fandom.com/wiki/Event_Quest",
+    f"{base_url}/Archon_Quest",
+    f"{base_url}/Story_Quest",
+    f"{base_url}/World_Quest",
+    f"{base_url}/Event_Quest",
 
     # Enemies
-    "https://genshin-impact.fandom.com/wiki/Common_Enemy",
-    "https://genshin-impact.fandom.com/wiki/Elite_Enemy",
-    "https://genshin-impact.fandom.com/wiki/Weekly_Boss",
+    f"{base_url}/Common_Enemy",
+    f"{base_url}/Elite_Enemy",
+    f"{base_url}/Weekly_Boss",
 
     # Weapons
-    "https://genshin-impact.fandom.com/wiki/Bow",
-    "https://genshin-impact.fandom.com/wiki/Claymore",
-    "https://genshin-impact.fandom.com/wiki/Catalyst",
-    "https://genshin-impact.fandom.com/wiki/Polearm",
-    "https://genshin-impact.fandom.com/wiki/Sword",
+    f"{base_url}/Bow",
+    f"{base_url}/Claymore",
+    f"{base_url}/Catalyst",
+    f"{base_url}/Polearm",
+    f"{base_url}/Sword",
 
     # Artifacts
-    "https://genshin-impact.fandom.com/wiki/Artifact/Sets",
-    "https://genshin-impact.fandom.com/wiki/Artifact_EXP",
+    f"{base_url}/Artifact/Sets",
+    f"{base_url}/Artifact_EXP",
 
   
 ]
 
-def extract_summary_from_url(url):
-    try:
-        res = requests.get(url, headers=headers)
-        if res.status_code != 200:
-            print(f"⚠️ Failed: {url}")
-            return ""
-
-        soup = BeautifulSoup(res.content, "html.parser")
-        content = soup.select_one("div.mw-parser-output")
-        if not content:
-            return ""
-
-        paragraphs = content.find_all("p", recursive=False)
-        summary = "\n".join(p.get_text().strip() for p in paragraphs if p.get_text().strip())
-        return summary
-    except Exception as e:
-        print(f"❌ Error scraping {url}: {e}")
-        return ""
-
-def scrape_and_save():
+def scrape_and_save(engine=None, fresh=False):
     os.makedirs("data", exist_ok=True)
-    wiki_data = {}
+    engine = engine or FetchEngine()
+    checkpoint = Checkpoint("wiki_sections", fresh=fresh)
+    pages = engine.run_sync(wiki_pages, parse_wiki_response, checkpoint, desc="Scraping Wiki Pages")
 
-    for url in tqdm(wiki_pages, desc="Scraping Wiki Pages"):
+    wiki_data = {}
+    for url in wiki_pages:
         title = url.split("/")[-1].replace("_", " ")
-        summary = extract_summary_from_url(url)
+        page = pages.get(url, {})
         wiki_data[title] = {
             "url": url,
-            "summary": summary
+            "summary": page.get("summary", ""),
+            "infobox": page.get("infobox", {}),
+            "sections": page.get("sections", [])
         }
 
     with open("data/wiki_sections.json", "w", encoding="utf-8") as f:
         json.dump(wiki_data, f, indent=2, ensure_ascii=False)
+    write_corpus("wiki_sections", wiki_data.items())
 
+    engine.finish(checkpoint)
     print("✅ General wiki data saved to data/wiki_sections.json")
 
 if __name__ == "__main__":
-    scrape_and_save()
+    parser = argparse.ArgumentParser(description="Scrape general (non-character) Fandom wiki pages")
+    add_engine_arguments(parser)
+    args = parser.parse_args()
+    scrape_and_save(engine_from_args(args), fresh=args.fresh)
@@ -1,19 +1,18 @@
-import requests
 from bs4 import BeautifulSoup
+import argparse
 import json
-from tqdm import tqdm
 import os
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0"
-}
+from fetch_engine import Checkpoint, add_engine_arguments, engine_from_args
+from wiki_extract import parse_wiki_response
+from corpus_writer import write_corpus
 
-BASE_HONEY = "https://genshin.honeyhunterworld.com"
-BASE_WIKI = "https://genshin-impact.fandom.com/wiki"
+# HONEY_BASE_URL / WIKI_BASE_URL point the scraper at mirrors or a local test server
+BASE_HONEY = os.getenv("HONEY_BASE_URL", "https://genshin.honeyhunterworld.com")
+BASE_WIKI = os.getenv("WIKI_BASE_URL", "https://genshin-impact.fandom.com/wiki")
 
-def fetch_honey_characters():
-    url = f"{BASE_HONEY}/db/char/"
-    soup = BeautifulSoup(requests.get(url, headers=HEADERS).content, "html.parser")
+def parse_honey_characters(url, response):
+    soup = BeautifulSoup(response.content, "html.parser")
     characters = []
 
     for link in soup.select("a.char_sea_cont"):
@@ -24,11 +23,12 @@ def fetch_honey_characters():
     
     return characters
 
-def scrape_character_details(character):
-    res = requests.get(character['url'], headers=HEADERS)
-    soup = BeautifulSoup(res.content, "html.parser")
+def fetch_honey_characters(engine, checkpoint):
+    url = f"{BASE_HONEY}/db/char/"
+    return engine.run_sync([url], parse_honey_characters, checkpoint, desc="Fetching character list").get(url, [])
 
-    char_data = {"name": character["name"], "url": character["url"]}
+def scrape_character_details(url, response):
+    soup = BeautifulSoup(response.content, "html.parser")
     details = {}
 
     for row in soup.select("div.char_profile_stat_main div.sea_char_box"):
@@ -38,42 +38,39 @@ def scrape_character_details(character):
             if v:
                 details[k] = v.text.strip()
     
-    char_data["details"] = details
-    return char_data
+    return details
 
-def fetch_and_save_characters():
-    characters = fetch_honey_characters()
-    result = []
-
-    for char in tqdm(characters, desc="Scraping characters"):
-        try:
-            data = scrape_character_details(char)
-            result.append(data)
-        except Exception as e:
-            print(f"Error with {char['name']}: {e}")
+def fetch_and_save_characters(engine, checkpoint):
+    characters = fetch_honey_characters(engine, checkpoint)
+    details = engine.run_sync([char["url"] for char in characters], scrape_character_details, checkpoint,
+                              desc="Scraping characters")
+    result = [{"name": char["name"], "url": char["url"], "details": details[char["url"]]}
+              for char in characters if char["url"] in details]
 
     with open("data/characters.json", "w", encoding="utf-8") as f:
         json.dump(result, f, indent=2, ensure_ascii=False)
+    write_corpus("characters", enumerate(result))
 
-def fetch_fandom_summary(page):
-    url = f"{BASE_WIKI}/{page.replace(' ', '_')}"
-    res = requests.get(url, headers=HEADERS)
-    soup = BeautifulSoup(res.content, "html.parser")
-
-    content = soup.select_one("div.mw-parser-output")
-    paragraphs = content.find_all("p", recursive=False)
-    lore = "\n".join([p.get_text().strip() for p in paragraphs if p.text.strip()])
-    
-    return {"title": page, "url": url, "summary": lore}
-
-def fetch_example_lore_pages():
+def fetch_example_lore_pages(engine, checkpoint):
     lore_pages = ["Teyvat", "Archons", "Fatui", "Khaenri'ah", "Abyss_Order"]
-    summaries = [fetch_fandom_summary(p) for p in tqdm(lore_pages, desc="Fetching lore pages")]
+    urls = [f"{BASE_WIKI}/{page.replace(' ', '_')}" for page in lore_pages]
+    pages = engine.run_sync(urls, parse_wiki_response, checkpoint, desc="Fetching lore pages")
+    summaries = [{"title": page, "url": url, "summary": pages[url].get("summary", ""), "infobox": pages[url]["infobox"],
+                  "sections": pages[url]["sections"]}
+                 for page, url in zip(lore_pages, urls) if url in pages]
     
     with open("data/lore.json", "w", encoding="utf-8") as f:
         json.dump(summaries, f, indent=2, ensure_ascii=False)
+    write_corpus("lore", enumerate(summaries))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Honey Hunter character stats and example Fandom lore pages")
+    add_engine_arguments(parser)
+    args = parser.parse_args()
+
     os.makedirs("data", exist_ok=True)
-    fetch_and_save_characters()
-    fetch_example_lore_pages()
+    engine = engine_from_args(args)
+    checkpoint = Checkpoint("honey_scraper", fresh=args.fresh)
+    fetch_and_save_characters(engine, checkpoint)
+    fetch_example_lore_pages(engine, checkpoint)
+    engine.finish(checkpoint)
@@ -0,0 +1,351 @@
+import os
+import re
+import json
+import argparse
+from html.parser import HTMLParser
+
+# Fast parsers are optional; "stream" (the standard library's tokenizer) always works
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+try:
+    import lxml.html
+    import lxml.etree
+except ImportError:
+    lxml = None
+
+BACKENDS = ("selectolax", "lxml", "stream")
+DEFAULT_BACKEND = os.getenv("HTML_BACKEND", "auto")
+
+HEADINGS = {"h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+TEXT_BLOCKS = {"p", "dd", "dt", "blockquote"}
+LISTS = {"ul", "ol"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+             "source", "track", "wbr"}
+
+# Page furniture that isn't article text: tables of contents, navboxes,
+# footnotes, edit links, images, stat tables...
+SKIP_TAGS = {"script", "style", "noscript", "table", "figure", "nav", "math", "audio", "video", "gallery"}
+SKIP_CLASSES = {"toc", "navbox", "mw-editsection", "reference", "references", "mw-references-wrap", "reflist",
+                "thumb", "gallery", "wikia-gallery", "mw-empty-elt", "noprint", "printfooter", "hatnote",
+                "dablink", "audio-button"}
+SKIP_SECTIONS = {"References", "Navigation", "Other Languages", "Change History", "Gallery", "See also"}
+
+# Elements whose text is collected into one block
+CAPTURE_ROLES = {"heading", "text", "item"}
+INFOBOX_ROLES = {"pi-title", "pi-label", "pi-value"}
+
+_CLASS_SPLIT = re.compile(r"\s+")
+
+
+def normalize(text):
+    return " ".join(text.split())
+
+
+class SectionExtractor:
+    """Turns the element events of a Fandom article into structured sections.
+
+    Backends feed it ``start`` / ``data`` / ``end`` calls for everything inside
+    ``div.mw-parser-output``. Headings open sections, whose ``path`` is the
+    heading trail (e.g. ``["Story", "Early Life"]``). Paragraphs and list
+    items are collected per section, separately and in reading order as
+    ``text``; the portable infobox becomes ``infobox`` key/values. Tree
+    backends may skip the children of an element that leaves ``skipping`` set.
+    """
+
+    def __init__(self):
+        self.infobox = {}
+        self._path = []
+        self._sections = []
+        self._section = self._new_section()
+        self._stack = []
+        self._skip = 0
+        self._infobox = 0
+        self._lists = 0
+        self._capture = 0
+        self._infobox_capture = 0
+        self._buffer = []
+        self._label = None
+
+    @property
+    def skipping(self):
+        return self._skip > 0
+
+    def _new_section(self):
+        section = {"path": list(self._path), "paragraphs": [], "lists": [], "blocks": []}
+        self._sections.append(section)
+        return section
+
+    def _role(self, tag, classes, element_id):
+        if self._skip or tag in SKIP_TAGS or element_id == "toc" or not SKIP_CLASSES.isdisjoint(classes):
+            return "skip"
+        if self._infobox:
+            if "pi-title" in classes and "title" not in self.infobox:
+                return "pi-title"
+            if "pi-data-label" in classes:
+                return "pi-label"
+            if "pi-data-value" in classes:
+                return "pi-value"
+            return None
+        if "portable-infobox" in classes:
+            return "infobox"
+        if tag in HEADINGS:
+            return "heading"
+        if tag in LISTS:
+            return "list"
+        if tag == "li" and self._lists:
+            return "item"
+        if tag in TEXT_BLOCKS and not self._lists:
+            return "text"
+        return None
+
+    def start(self, tag, classes="", element_id=""):
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self.data(" ")
+            return
+        role = self._role(tag, _CLASS_SPLIT.split(classes) if classes else (), element_id)
+        if role == "skip":
+            self._skip += 1
+        elif role == "infobox":
+            # Fandom wraps the infobox in the first <p>; keep the two apart
+            self._flush(self._capture_role())
+            self._infobox += 1
+        elif role in INFOBOX_ROLES:
+            self._flush(None)
+            self._infobox_capture += 1
+        elif role == "list":
+            if not self._lists:
+                self._section["lists"].append([])
+            self._lists += 1
+        elif role in CAPTURE_ROLES:
+            # Blocks don't nest in the output: text before a nested block is its own block
+            self._flush(self._capture_role())
+            self._capture += 1
+        self._stack.append((tag, role))
+
+    def end(self, tag):
+        # The stream backend can see unclosed or stray end tags: close back to the matching start
+        if tag in VOID_TAGS or not any(open_tag == tag for open_tag, _ in self._stack):
+            return
+        while self._stack:
+            open_tag, role = self._stack.pop()
+            self._close(open_tag, role)
+            if open_tag == tag:
+                break
+
+    def data(self, text):
+        if self._skip:
+            return
+        if self._infobox_capture if self._infobox else self._capture:
+            self._buffer.append(text)
+
+    def _capture_role(self):
+        for _, role in reversed(self._stack):
+            if role in CAPTURE_ROLES:
+                return role
+        return None
+
+    def _close(self, tag, role):
+        if role == "skip":
+            self._skip -= 1
+        elif role == "infobox":
+            self._infobox -= 1
+        elif role in INFOBOX_ROLES:
+            self._infobox_capture -= 1
+            self._flush(role)
+        elif role == "list":
+            self._lists -= 1
+            if not self._lists and not self._section["lists"][-1]:
+                self._section["lists"].pop()
+        elif role == "heading":
+            self._capture -= 1
+            text = normalize("".join(self._buffer))
+            self._buffer = []
+            if text:
+                self._path = self._path[:HEADINGS[tag] - 2] + [text]
+                self._section = self._new_section()
+        elif role in CAPTURE_ROLES:
+            self._capture -= 1
+            self._flush(role)
+
+    def _flush(self, role):
+        text = normalize("".join(self._buffer))
+        self._buffer = []
+        if not text or role is None:
+            return
+        if role == "pi-title":
+            self.infobox["title"] = text
+        elif role == "pi-label":
+            self._label = text
+        elif role == "pi-value":
+            self.infobox[self._label or f"field {len(self.infobox)}"] = text
+            self._label = None
+        elif role == "item":
+            self._section["lists"][-1].append(text)
+            self._section["blocks"].append(f"- {text}")
+        elif role == "text":
+            self._section["paragraphs"].append(text)
+            self._section["blocks"].append(text)
+
+    def result(self):
+        sections = []
+        for section in self._sections:
+            blocks = section.pop("blocks")
+            if blocks and not (section["path"] and section["path"][0] in SKIP_SECTIONS):
+                sections.append({**section, "text": "\n".join(blocks)})
+        return {"infobox": self.infobox, "sections": sections}
+
+
+# ------------------------------------------
+# Backends
+# ------------------------------------------
+def _is_content_root(classes):
+    return "mw-parser-output" in _CLASS_SPLIT.split(classes or "")
+
+
+class _StreamParser(HTMLParser):
+    # Event-driven: no tree is built, and everything outside the article is ignored
+    def __init__(self, sink):
+        super().__init__(convert_charrefs=True)
+        self.sink = sink
+        self.depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self.depth:
+            if tag not in VOID_TAGS:
+                self.depth += 1
+            attrs = dict(attrs)
+            self.sink.start(tag, attrs.get("class") or "", attrs.get("id") or "")
+        elif tag == "div" and _is_content_root(dict(attrs).get("class")):
+            self.depth = 1
+
+    def handle_startendtag(self, tag, attrs):
+        if self.depth:
+            attrs = dict(attrs)
+            self.sink.start(tag, attrs.get("class") or "", attrs.get("id") or "")
+            self.sink.end(tag)
+
+    def handle_endtag(self, tag):
+        if self.depth and tag not in VOID_TAGS:
+            self.depth -= 1
+            if self.depth:
+                self.sink.end(tag)
+
+    def handle_data(self, data):
+        if self.depth:
+            self.sink.data(data)
+
+
+def _extract_stream(html, sink):
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    parser = _StreamParser(sink)
+    parser.feed(html)
+    parser.close()
+
+
+def _walk_lxml(element, sink):
+    for child in element:
+        tag = child.tag
+        if isinstance(tag, str):
+            sink.start(tag, child.get("class") or "", child.get("id") or "")
+            if not sink.skipping:
+                if child.text:
+                    sink.data(child.text)
+                _walk_lxml(child, sink)
+            sink.end(tag)
+        if child.tail:
+            sink.data(child.tail)
+
+
+def _extract_lxml(html, sink):
+    tree = lxml.html.fromstring(html)
+    roots = tree.xpath("//div[contains(concat(' ', normalize-space(@class), ' '), ' mw-parser-output ')]")
+    if roots:
+        if roots[0].text:
+            sink.data(roots[0].text)
+        _walk_lxml(roots[0], sink)
+
+
+def _walk_selectolax(node, sink):
+    for child in node.iter(include_text=True):
+        tag = child.tag
+        if tag == "-text":
+            sink.data(child.text(deep=False))
+        elif not tag.startswith("-") and not tag.startswith("_"):
+            attrs = child.attributes
+            sink.start(tag, attrs.get("class") or "", attrs.get("id") or "")
+            if not sink.skipping:
+                _walk_selectolax(child, sink)
+            sink.end(tag)
+
+
+def _extract_selectolax(html, sink):
+    root = LexborHTMLParser(html).css_first("div.mw-parser-output")
+    if root is not None:
+        _walk_selectolax(root, sink)
+
+
+_EXTRACTORS = {"selectolax": _extract_selectolax, "lxml": _extract_lxml, "stream": _extract_stream}
+
+
+def available_backends():
+    installed = {"selectolax": LexborHTMLParser is not None, "lxml": lxml is not None, "stream": True}
+    return [name for name in BACKENDS if installed[name]]
+
+
+def extract_page(html, backend=DEFAULT_BACKEND):
+    """Structured content of a Fandom article: ``{"infobox": {...}, "sections": [...]}``.
+
+    Each section has ``path`` (heading trail), ``paragraphs``, ``lists`` (each
+    a list of item strings) and ``text`` (paragraphs and ``- item`` lines in
+    page order). ``backend="auto"`` uses the fastest parser installed.
+    """
+    if backend == "auto":
+        backend = available_backends()[0]
+    if backend not in available_backends():
+        raise ValueError(f"HTML backend {backend!r} is not available; installed: {', '.join(available_backends())}")
+    sink = SectionExtractor()
+    _EXTRACTORS[backend](html, sink)
+    return sink.result()
+
+
+def page_text(page):
+    """Plain text of an extracted page: each section's heading line, then its text."""
+    lines = []
+    for section in page["sections"]:
+        if section["path"]:
+            lines.append(section["path"][-1])
+        lines.append(section["text"])
+    return "\n".join(lines)
+
+
+def lead_text(page):
+    """Text of the lead section, before the first heading ("" when the page opens with one)."""
+    for section in page["sections"]:
+        if not section["path"]:
+            return section["text"]
+    return ""
+
+
+def parse_wiki_response(url, response):
+    """FetchEngine parse callback shared by the scrapers: the extracted page, its plain text and its lead."""
+    page = extract_page(response.content)
+    return {"text": page_text(page), "summary": lead_text(page), **page}
+
+
+# ------------------------------------------
+# CLI entry point
+# ------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the sections extracted from saved wiki HTML")
+    parser.add_argument("html_file")
+    parser.add_argument("--backend", choices=("auto",) + BACKENDS, default="auto")
+    parser.add_argument("--text", action="store_true", help="print plain text instead of JSON")
+    args = parser.parse_args()
+
+    with open(args.html_file, "rb") as f:
+        page = extract_page(f.read(), args.backend)
+    print(page_text(page) if args.text else json.dumps(page, indent=2, ensure_ascii=False))
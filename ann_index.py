@@ -0,0 +1,142 @@
+import os
+import json
+import math
+import argparse
+
+import faiss
+import numpy as np
+
+# "flat" is exact search; the others trade a little recall for memory and speed:
+#   sq8       int8 scalar-quantized vectors (4x smaller, still exhaustive)
+#   ivf_flat  inverted lists over k-means cells, searching ``nprobe`` of ``nlist`` cells
+#   ivf_pq    IVF with product-quantized residuals (``pq_m`` bytes per vector)
+#   hnsw      graph search, ``ef_search`` candidates per query
+INDEX_TYPES = ("flat", "sq8", "ivf_flat", "ivf_pq", "hnsw")
+
+# FAISS remove_ids compacts row ids for these, so incremental updates can
+# edit them in place; IVF keeps stale labels and HNSW can't remove at all
+EDITABLE_TYPES = ("flat", "sq8")
+
+# Search-time knobs that can be changed without rebuilding
+SEARCH_PARAMS = ("nprobe", "ef_search")
+
+PARAMS_FILE = "index_params.json"
+
+
+def _pq_m(dim):
+    # Largest divisor of dim giving >= 8 dimensions per sub-quantizer (48 for MiniLM's 384)
+    return next(m for m in range(max(1, dim // 8), 0, -1) if dim % m == 0)
+
+
+def default_params(index_type, count, dim):
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {', '.join(INDEX_TYPES)}")
+    params = {"type": index_type}
+    if index_type in ("ivf_flat", "ivf_pq"):
+        # ~4 * sqrt(n) cells, but at least 39 training points per cell as k-means wants
+        nlist = max(1, min(int(4 * math.sqrt(count)), count // 39))
+        params.update(nlist=nlist, nprobe=min(nlist, 16))
+    if index_type == "ivf_pq":
+        # 8-bit codebooks need ~10k training points; small corpora get fewer centroids
+        params.update(pq_m=_pq_m(dim), pq_nbits=max(1, min(8, int(math.log2(max(2, count // 39))))))
+    if index_type == "hnsw":
+        params.update(hnsw_m=32, ef_construction=80, ef_search=64)
+    return params
+
+
+def factory_string(params):
+    index_type = params["type"]
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "sq8":
+        return "SQ8"
+    if index_type == "ivf_flat":
+        return f"IVF{params['nlist']},Flat"
+    if index_type == "ivf_pq":
+        return f"IVF{params['nlist']},PQ{params['pq_m']}x{params['pq_nbits']}"
+    return f"HNSW{params['hnsw_m']},Flat"
+
+
+def apply_search_params(index, params):
+    if "nprobe" in params:
+        faiss.extract_index_ivf(index).nprobe = params["nprobe"]
+    if "ef_search" in params:
+        index.hnsw.efSearch = params["ef_search"]
+    return index
+
+
+def search_parameters(index, selector):
+    """SearchParameters of the right type for ``index``, restricted to ``selector``.
+
+    IVF and HNSW indexes reject plain SearchParameters, and typed ones replace
+    the index's own nprobe / efSearch, so those are copied over.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    if hasattr(index, "hnsw"):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def build_faiss_index(vectors, index_type="flat", overrides=None, train_size=None, block=8192, seed=0):
+    """Build an index of ``index_type`` over ``vectors`` (an array or memmap).
+
+    Training uses a random sample, so a memmapped corpus is never loaded
+    whole. Returns ``(index, params)``; save ``params`` next to the index.
+    """
+    count, dim = vectors.shape
+    params = {**default_params(index_type, count, dim), **(overrides or {})}
+    index = faiss.index_factory(dim, factory_string(params), faiss.METRIC_L2)
+    if "ef_construction" in params:
+        index.hnsw.efConstruction = params["ef_construction"]
+
+    if not index.is_trained:
+        if train_size is None:
+            cells = max(params.get("nlist", 1), 2 ** params.get("pq_nbits", 0))
+            train_size = max(64 * cells, 10000)
+        rows = np.sort(np.random.default_rng(seed).choice(count, size=min(count, train_size), replace=False))
+        index.train(np.ascontiguousarray(vectors[rows], dtype=np.float32))
+
+    for i in range(0, count, block):
+        index.add(np.ascontiguousarray(vectors[i:i + block], dtype=np.float32))
+    return apply_search_params(index, params), params
+
+
+# ------------------------------------------
+# Persisted parameters
+# ------------------------------------------
+def load_index_params(index_dir):
+    # Indexes built before index types existed are flat
+    path = os.path.join(index_dir, PARAMS_FILE)
+    if not os.path.exists(path):
+        return {"type": "flat"}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_index_params(index_dir, params):
+    with open(os.path.join(index_dir, PARAMS_FILE), "w", encoding="utf-8") as f:
+        json.dump(params, f, indent=2)
+
+
+# ------------------------------------------
+# CLI entry point
+# ------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or tune the search parameters of a built index")
+    parser.add_argument("--index-dir", default="genshin_vector_db")
+    parser.add_argument("--nprobe", type=int, help="IVF cells searched per query")
+    parser.add_argument("--ef-search", type=int, help="HNSW candidates per query")
+    args = parser.parse_args()
+
+    params = load_index_params(args.index_dir)
+    updates = {name: getattr(args, name) for name in SEARCH_PARAMS if getattr(args, name) is not None}
+    for name in updates:
+        if name not in params:
+            parser.error(f"{name} does not apply to a {params['type']} index")
+    if updates:
+        params.update(updates)
+        write_index_params(args.index_dir, params)
+        print(f"✅ Updated {args.index_dir}; running servers pick this up on POST /api/index/reload")
+    print(json.dumps(params, indent=2))
@@ -1,20 +1,39 @@
+import time
+# The startup profile counts module imports from here
+IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import Optional
 import os
 import json
+import asyncio
+import weakref
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-import gc
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_groq import ChatGroq
-from langchain.docstore.document import Document
+from operator import itemgetter
 from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from dotenv import load_dotenv
+from response_cache import SemanticResponseCache
+from reranker import create_reranker
+from query_embeddings import (WARM_UP_QUERIES, DEFAULT_ONNX_FILE, CachedEmbeddings, default_torch_threads,
+                              load_query_embedder, set_torch_threads)
+from session_store import create_session_store, new_session_id
+from preferences_store import PreferencesStore
+# The retrieval stack (FAISS, langchain_community), sentence-transformers and
+# the Groq client are imported where they are first used, during the
+# background initialization, so the server can accept connections sooner
+from batch_chat import BatchRunner, DEFAULT_CONCURRENCY
+from conversation_context import ConversationContextManager, count_tokens, pack_documents
+from metrics import (REGISTRY, CONTENT_TYPE, Counter, Gauge, LLMMetricsHandler, MetricsMiddleware,
+                     current_trace_id, record_startup_phase, stage, startup_phase, startup_summary)
+
+IMPORTS_DONE = time.perf_counter()
 
 # Load environment variables
 load_dotenv()
@@ -30,129 +49,300 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request latency and trace ids; requests slower than SLOW_REQUEST_MS are
+# logged with their per-stage breakdown. Metrics are served at /metrics
+TRACING = os.getenv("TRACING", "1") == "1"
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "2000"))
+app.add_middleware(MetricsMiddleware, tracing=TRACING, slow_ms=SLOW_REQUEST_MS)
+
 # Initialize global variables
 groq_llm = None
+# Same model without client-side retries: BatchRunner does its own backoff and
+# honours Retry-After, and the client's retries would stack on top of it
+batch_llm = None
+embedder = None
 vectorstore = None
+bm25_index = None
+entity_router = None
+reranker = None
+personalizer = None
 rag_chain = None
+attribute_store = None
+# Set once the embedder and index have been warmed up; /api/health waits for it
+warmed_up = False
+# "starting" until the background initialization finishes, then "healthy" or "failed"
+startup_state = "starting"
+startup_error = None
+init_task = None
+
+# The model and index load in a background task, so the server accepts
+# connections (and /api/health answers "starting") right away.
+# BACKGROUND_INIT=0 loads everything before the first request is accepted
+BACKGROUND_INIT = os.getenv("BACKGROUND_INIT", "1") == "1"
+# "onnx" encodes queries with a quantized ONNX export of MiniLM (see query_embeddings.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", DEFAULT_ONNX_FILE)
+
+# "hybrid" fuses FAISS and BM25 results; "dense" or "lexical" use a single leg
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+LEXICAL_BUDGET_MS = float(os.getenv("LEXICAL_BUDGET_MS", "20"))
+# Restrict search to the chunks of characters/places named in the question
+ENTITY_ROUTING = os.getenv("ENTITY_ROUTING", "1") == "1"
+# Answer factual character questions from data/characters.json without the LLM
+FAST_PATH = os.getenv("FAST_PATH", "1") == "1"
+# Optional re-ranking of the top RERANK_K candidates: "cross-encoder", "lexical",
+# "auto" (cross-encoder if it loads) or "off". Past RERANK_BUDGET_MS the
+# retriever's own order is kept
+RERANKER = os.getenv("RERANKER", "off")
+RERANK_K = int(os.getenv("RERANK_K", "30"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
+# Boost chunks about a user's saved characters, region and element when a
+# chat request carries their user_id
+PERSONALIZATION = os.getenv("PERSONALIZATION", "1") == "1"
+
+# Answers to standalone questions, keyed on their MiniLM query embedding
+response_cache = SemanticResponseCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+    ttl=int(os.getenv("SEMANTIC_CACHE_TTL", "3600")),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("SEMANTIC_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+)
+
+# Conversation histories, evicted least-recently-used first once idle for
+# SESSION_TTL seconds or over SESSION_MAX_BYTES of history. The "sqlite"
+# backend shares sessions across uvicorn workers and survives restarts.
+# Request handlers call it through asyncio.to_thread: a SQLite get is also a
+# write, and a locked database can hold it for the whole busy timeout.
+session_store = create_session_store(
+    os.getenv("SESSION_BACKEND", "memory"),
+    path=os.getenv("SESSION_DB_PATH", "data/sessions.db"),
+    ttl=int(os.getenv("SESSION_TTL", str(6 * 3600))),
+    max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+
+# The whole prompt (system + retrieved chunks + conversation) is kept under
+# PROMPT_TOKEN_BUDGET; older turns are folded into a rolling summary written
+# by the smaller CONTEXT_MODEL, which also rewrites follow-ups for retrieval
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+ANSWER_MODEL = "llama-3.3-70b-versatile"
+CONTEXT_MODEL = os.getenv("CONTEXT_MODEL", "llama-3.1-8b-instant")
+context_manager = ConversationContextManager(
+    history_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "1000")),
+)
 
-# Use a more memory-efficient data structure
-conversation_histories: Dict[str, List[tuple]] = {}
+# Per-session locks keep each session's history updates in request order;
+# a lock disappears once no request holds it
+session_locks = weakref.WeakValueDictionary()
+
+# Query embeddings are cached by normalized text; TORCH_THREADS caps the
+# encoder's intra-op threads (default: cores split across WEB_CONCURRENCY workers)
+QUERY_EMBEDDING_CACHE_BYTES = int(os.getenv("QUERY_EMBEDDING_CACHE_BYTES", str(8 * 1024 * 1024)))
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", "0")) or default_torch_threads()
+
+# Upper bound on questions per /api/chat/batch request and on its LLM concurrency
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "1000"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+
+# Embedding + FAISS search are CPU-bound and synchronous, so they run on a
+# small bounded pool instead of blocking the event loop
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+
+# Request-path counters; everything else is read from the components' own
+# stats when /metrics is scraped, so it costs nothing per request
+CHAT_REQUESTS = Counter("akasha_chat_requests_total", "Answered chat requests by endpoint and route "
+                        "(fast_path, cache or rag)", ("endpoint", "route"))
+CHAT_ERRORS = Counter("akasha_chat_errors_total", "Chat requests that failed", ("endpoint",))
+
+def cache_stats_by_name(key):
+    caches = {
+        "response": response_cache,
+        "query_embedding": embedder if isinstance(embedder, CachedEmbeddings) else None,
+        "preferences": preferences_store,
+        "personalization": personalizer,
+    }
+    return {(name,): cache.stats()[key] for name, cache in caches.items() if cache is not None}
+
+Counter("akasha_cache_hits_total", "Cache hits", ("cache",), function=lambda: cache_stats_by_name("hits"))
+Counter("akasha_cache_misses_total", "Cache misses", ("cache",), function=lambda: cache_stats_by_name("misses"))
+Gauge("akasha_sessions", "Conversation sessions in the session store",
+      function=lambda: session_store.stats()["sessions"])
+Gauge("akasha_session_bytes", "Bytes of conversation history held", function=lambda: session_store.stats()["bytes"])
+Gauge("akasha_index_documents", "Chunks in the vector index",
+      function=lambda: vectorstore.index.ntotal if vectorstore is not None else None)
+Gauge("akasha_response_cache_entries", "Answers in the semantic response cache",
+      function=lambda: response_cache.stats()["entries"])
+Gauge("akasha_ready", "1 once startup and warm-up have finished", function=lambda: int(warmed_up))
 
 class ChatMessage(BaseModel):
     message: str
     session_id: Optional[str] = None
+    # Saved preferences of this user bias retrieval (see personalization.py)
+    user_id: Optional[str] = None
+
+class BatchChatRequest(BaseModel):
+    questions: list[str]
+    concurrency: Optional[int] = None
 
 class ChatResponse(BaseModel):
     response: str
     session_id: str
+    # Estimated tokens sent to the LLM; None when no LLM call was made
+    prompt_tokens: Optional[int] = None
 
 # ------------------------------------------
 # Startup event to initialize components
 # ------------------------------------------
 @app.on_event("startup")
 async def startup_event():
-    global groq_llm, vectorstore, rag_chain
+    global init_task
+    record_startup_phase("imports", IMPORTS_DONE - IMPORT_STARTED)
     
     # Initialize LLM
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
     if not GROQ_API_KEY:
         raise Exception("❌ Please set your GROQ_API_KEY in a .env file!")
     
-    groq_llm = ChatGroq(
-        groq_api_key=GROQ_API_KEY,
-        model_name="llama-3.3-70b-versatile"
-    )
+    with startup_phase("preferences"):
+        get_preferences_store()
     
-    # Initialize embeddings once and reuse
-    embedder = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    
-    # Load or create vector store
-    if not os.path.exists("genshin_vector_db"):
-        print("📦 Vector DB not found. Creating it from JSON data...")
-        documents = load_documents()
-        vectorstore = create_vector_store(documents, embedder)
-        # Force garbage collection after creating vector store
-        del documents
-        gc.collect()
+    if BACKGROUND_INIT:
+        init_task = asyncio.create_task(initialize(GROQ_API_KEY))
     else:
-        print("✅ Vector DB found. Loading from disk...")
-        vectorstore = FAISS.load_local("genshin_vector_db", embeddings=embedder, allow_dangerous_deserialization=True)
+        await initialize(GROQ_API_KEY)
+
+async def initialize(api_key):
+    global warmed_up, startup_state, startup_error
+    try:
+        # Model and index loading is blocking; keep the event loop free for health checks
+        await asyncio.to_thread(load_components, api_key)
+        with startup_phase("warm_up"):
+            await asyncio.get_running_loop().run_in_executor(retrieval_executor, warm_up)
+    except Exception as e:
+        startup_state = "failed"
+        startup_error = f"{e.__class__.__name__}: {e}"
+        print(f"❌ Startup failed: {startup_error}")
+        if not BACKGROUND_INIT:
+            raise
+        return
+    warmed_up = True
+    startup_state = "healthy"
+    print(f"🚀 Healthy {(time.perf_counter() - IMPORT_STARTED) * 1000:.0f} ms after import. "
+          f"Startup phases: {startup_summary()}")
+
+def load_components(api_key):
+    global groq_llm, batch_llm, embedder, vectorstore, bm25_index, entity_router, reranker, personalizer, rag_chain
+    global attribute_store
+    
+    # Each phase is exported as akasha_startup_phase_seconds{phase=...}
+    with startup_phase("llm_clients"):
+        groq_llm, context_manager.llm, batch_llm = create_llms(api_key)
+    
+    # Initialize embeddings once and reuse
+    with startup_phase("embedder"):
+        embedder = create_embedder()
+    
+    # The API never embeds the corpus itself; build the index offline with
+    # `python build_index.py` (or `python incremental_index.py`) first
+    with startup_phase("vectorstore"):
+        index_dir = current_index_dir()
+        vectorstore = load_vector_store(embedder, index_dir)
+    with startup_phase("bm25"):
+        bm25_index = load_bm25_index(index_dir)
+    with startup_phase("entity_router"):
+        entity_router = load_entity_router(vectorstore)
+    with startup_phase("fast_path"):
+        attribute_store = load_attribute_store()
+    with startup_phase("reranker"):
+        reranker = create_reranker(RERANKER, budget_ms=RERANK_BUDGET_MS)
+    with startup_phase("personalizer"):
+        personalizer = load_personalizer(vectorstore, entity_router)
     
     # Setup RAG chain
-    rag_chain = setup_modern_rag_chain(vectorstore, groq_llm)
+    with startup_phase("chain"):
+        rag_chain = setup_modern_rag_chain(vectorstore, groq_llm, bm25_index, entity_router, personalizer)
 
 # ------------------------------------------
 # Helper Functions
 # ------------------------------------------
-def load_documents():
-    files = [
-        "data/character_lore.json",
-        "data/wiki_sections.json",
-        "data/characters.json",
-        "data/lore.json"
-    ]
-    docs = []
-
-    for file in files:
-        try:
-            with open(file, encoding="utf-8") as f:
-                data = json.load(f)
-            
-            # Process files individually to avoid loading all data at once
-            if isinstance(data, list):
-                # Process list in chunks to reduce memory pressure
-                for i in range(0, len(data), 10):
-                    chunk = data[i:i+10]
-                    content = json.dumps(chunk, ensure_ascii=False)
-                    docs.append(Document(page_content=content, metadata={"file": file, "chunk": i}))
-                    del chunk
-            elif isinstance(data, dict):
-                # For dictionaries, process key by key for large files
-                if len(data) > 20:  # Arbitrary threshold for "large" dictionary
-                    keys = list(data.keys())
-                    for i in range(0, len(keys), 10):
-                        chunk_keys = keys[i:i+10]
-                        chunk = {k: data[k] for k in chunk_keys}
-                        content = json.dumps(chunk, ensure_ascii=False)
-                        docs.append(Document(page_content=content, metadata={"file": file, "chunk": i}))
-                        del chunk
-                else:
-                    content = json.dumps(data, ensure_ascii=False)
-                    docs.append(Document(page_content=content, metadata={"file": file}))
-            else:
-                # Handle primitive values
-                docs.append(Document(page_content=str(data), metadata={"file": file}))
-            
-            # Force garbage collection after processing each file
-            gc.collect()
-                
-        except Exception as e:
-            print(f"Error loading {file}: {e}")
-    
-    return docs
-
-def create_vector_store(docs, embedder):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)  # Reduced chunk size
-    chunks = []
-    
-    # Process documents in batches to reduce memory pressure
-    batch_size = 5
-    for i in range(0, len(docs), batch_size):
-        batch_docs = docs[i:i+batch_size]
-        batch_chunks = splitter.split_documents(batch_docs)
-        chunks.extend(batch_chunks)
-        del batch_docs
-        del batch_chunks
-        gc.collect()
-
-    vectordb = FAISS.from_documents(chunks, embedder)
-    vectordb.save_local("genshin_vector_db")
-    
-    # Clean up to free memory
-    del chunks
-    gc.collect()
-    
-    return vectordb
+def create_llms(api_key):
+    # Imported here so the server starts accepting connections sooner
+    from langchain_groq import ChatGroq
+    answer_llm = ChatGroq(
+        groq_api_key=api_key,
+        model_name=ANSWER_MODEL,
+        callbacks=[LLMMetricsHandler("llm", ANSWER_MODEL)],
+    )
+    context_llm = ChatGroq(
+        groq_api_key=api_key,
+        model_name=CONTEXT_MODEL,
+        callbacks=[LLMMetricsHandler("context_llm", CONTEXT_MODEL)],
+    )
+    batch_llm = ChatGroq(
+        groq_api_key=api_key,
+        model_name=ANSWER_MODEL,
+        max_retries=0,
+        callbacks=[LLMMetricsHandler("llm", ANSWER_MODEL)],
+    )
+    return answer_llm, context_llm, batch_llm
+
+def create_embedder():
+    from incremental_index import EMBEDDING_MODEL
+    threads = set_torch_threads(TORCH_THREADS)
+    print(f"🧵 torch intra-op threads: {threads}")
+    return CachedEmbeddings(
+        load_query_embedder(EMBEDDING_MODEL, EMBEDDING_BACKEND, EMBEDDING_ONNX_FILE),
+        max_bytes=QUERY_EMBEDDING_CACHE_BYTES,
+    )
+
+def current_index_dir():
+    # The index directory is a symlink swapped on every rebuild; resolve it
+    # once so the FAISS index and BM25 come from the same version
+    from incremental_index import INDEX_DIR, resolve_index_dir
+    return resolve_index_dir(INDEX_DIR)
+
+def load_vector_store(embedder, index_dir=None):
+    from docstore import has_mmap_docstore, load_vectorstore
+    index_dir = index_dir or current_index_dir()
+    if not os.path.exists(os.path.join(index_dir, "index.faiss")):
+        raise Exception(f"❌ Vector DB not found in {index_dir}. Build it with `python build_index.py`")
+    if not has_mmap_docstore(index_dir):
+        raise Exception(f"❌ {index_dir} still uses a pickled docstore. Migrate it with `python docstore.py`")
+    print("✅ Vector DB found. Mapping it from disk...")
+    # Documents stay on disk (shared across workers) and are only built when retrieved
+    return load_vectorstore(index_dir, embedder)
+
+def warm_up():
+    # Model, tokenizer and index pages are initialized lazily; pay for that
+    # here instead of in the first user's request
+    embedder.warm_up()
+    make_retriever(vectorstore, bm25_index, entity_router).invoke(WARM_UP_QUERIES[-1])
+
+def load_bm25_index(index_dir=None):
+    from hybrid_retrieval import BM25Index, has_bm25_index
+    index_dir = index_dir or current_index_dir()
+    if not has_bm25_index(index_dir):
+        print(f"⚠️ No BM25 index in {index_dir}; using dense retrieval only")
+        return None
+    return BM25Index.load(index_dir)
+
+def load_entity_router(vectorstore):
+    if not ENTITY_ROUTING:
+        return None
+    from entity_router import EntityRouter
+    return EntityRouter.from_vectorstore(vectorstore)
+
+def load_attribute_store():
+    if not FAST_PATH:
+        return None
+    from fast_path import CharacterAttributeStore
+    return CharacterAttributeStore.from_file()
+
+def load_personalizer(vectorstore, router):
+    if not PERSONALIZATION:
+        return None
+    from personalization import Personalizer, PreferenceIndex
+    return Personalizer(PreferenceIndex.from_vectorstore(vectorstore), get_preferences_store(), router)
 
 @lru_cache(maxsize=5)  # Cache frequent system prompts
 def get_system_template():
@@ -172,12 +362,26 @@ Here is the context information to help you answer:
 {context}
 """
 
-def setup_modern_rag_chain(vectorstore, groq_llm):
-    # Create a retriever with fewer results to reduce processing
-    retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 3})
-    
-    # Get system template
+def make_retriever(vectorstore, bm25=None, router=None):
+    from hybrid_retrieval import HybridRetriever
+    # Create a retriever with fewer results to reduce processing; BM25 catches
+    # exact proper nouns that MiniLM embeds poorly
+    return HybridRetriever(
+        vectorstore=vectorstore,
+        bm25=bm25,
+        router=router,
+        k=3,
+        mode=RETRIEVAL_MODE,
+        lexical_budget_ms=LEXICAL_BUDGET_MS,
+        reranker=reranker,
+        rerank_k=RERANK_K,
+    )
+
+def setup_answer_chain(groq_llm):
+    # Takes {"question", "docs"} and generates the answer; shared by the chat
+    # chain and batch answering, which retrieves for all questions up front
     system_template = get_system_template()
+    system_tokens = count_tokens(system_template.replace("{context}", ""))
     
     # Create a chat prompt template
     prompt = ChatPromptTemplate.from_messages([
@@ -185,89 +389,208 @@ def setup_modern_rag_chain(vectorstore, groq_llm):
         HumanMessagePromptTemplate.from_template("{question}")
     ])
     
-    # Create a formatting function for the retrieved documents
-    def format_docs(docs):
-        return "\n\n".join([doc.page_content for doc in docs])
-    
-    # Create the RAG chain using the modern pattern
-    chain = (
-        {"context": retriever | format_docs, "question": RunnablePassthrough()}
-        | prompt
-        | groq_llm
-        | StrOutputParser()
-    )
+    # Retrieved chunks get whatever the conversation leaves of the prompt budget
+    def format_docs(inputs):
+        question = inputs["question"]
+        with stage("prompt"):
+            context = pack_documents(inputs["docs"], PROMPT_TOKEN_BUDGET - system_tokens - count_tokens(question))
+        usage = inputs.get("usage")
+        if usage is not None:
+            usage["prompt_tokens"] = system_tokens + count_tokens(context) + count_tokens(question)
+        return {"context": context, "question": question}
     
-    return chain
+    return RunnableLambda(format_docs) | prompt | groq_llm | StrOutputParser()
 
-# Cap conversation history to prevent memory growth
-def add_to_history(session_id: str, role: str, message: str):
-    if session_id not in conversation_histories:
-        conversation_histories[session_id] = []
+def setup_modern_rag_chain(vectorstore, groq_llm, bm25=None, router=None, personalizer=None):
+    retriever = make_retriever(vectorstore, bm25, router)
     
-    history = conversation_histories[session_id]
-    history.append((role, message))
+    # Requests with a user_id are boosted towards that user's preferences
+    def retrieve_docs(inputs):
+        if personalizer is None:
+            return retriever.invoke(inputs["query"])
+        return personalizer.retrieve(retriever, inputs["query"], inputs.get("user_id"))
     
-    # Limit history to last 10 exchanges (20 entries)
-    if len(history) > 20:
-        conversation_histories[session_id] = history[-20:]
-
-def chat_with_context(session_id, user_input):
-    global rag_chain
+    # Run the synchronous embed + search on the bounded retrieval pool when
+    # the chain is driven asynchronously; the copied context carries the
+    # request's trace into the worker thread
+    async def aretrieve(inputs):
+        loop = asyncio.get_running_loop()
+        with stage("retrieve"):
+            return await loop.run_in_executor(retrieval_executor, contextvars.copy_context().run,
+                                              retrieve_docs, inputs)
     
-    # Get or create conversation history
-    if session_id not in conversation_histories:
-        conversation_histories[session_id] = []
+    retrieve = RunnableLambda(retrieve_docs, afunc=aretrieve)
     
-    conversation_history = conversation_histories[session_id]
+    # Create the RAG chain using the modern pattern; retrieval searches the
+    # standalone query, the LLM sees the conversation-aware question
+    chain = (
+        RunnablePassthrough.assign(docs=retrieve)
+        | setup_answer_chain(groq_llm)
+    )
     
-    # Only include the most recent exchanges in the context
-    recent_history = conversation_history[-6:] if len(conversation_history) > 6 else conversation_history
+    return chain
+
+async def build_context_input(session_id, user_input, usage=None, user_id=None):
+    history = await asyncio.to_thread(session_store.get, session_id) or []
+    with stage("context"):
+        context_input = await context_manager.build(session_id, history, user_input)
+    context_input["usage"] = usage
+    context_input["user_id"] = user_id
+    if usage is not None:
+        usage["history_tokens"] = context_input["history_tokens"]
+        usage["summarized_turns"] = context_input["summarized_turns"]
+        usage["query_tokens"] = count_tokens(context_input["query"])
+    return context_input
+
+def get_session_lock(session_id):
+    lock = session_locks.get(session_id)
+    if lock is None:
+        lock = session_locks[session_id] = asyncio.Lock()
+    return lock
+
+async def embed_query(text):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(retrieval_executor, embedder.embed_query, text)
+
+def require_ready():
+    if groq_llm and vectorstore and rag_chain:
+        return
+    if startup_state == "starting":
+        raise HTTPException(status_code=503, detail="Akasha is still starting up", headers={"Retry-After": "5"})
+    raise HTTPException(status_code=500, detail="System not initialized properly")
+
+def is_personalized(user_id):
+    return bool(user_id) and personalizer is not None and get_preferences_store().get(user_id) is not None
+
+def is_cacheable(session_id, user_id):
+    # Only standalone questions are cacheable; follow-ups depend on the history,
+    # and personalized answers on the user
+    return not session_store.get(session_id) and not is_personalized(user_id)
+
+async def lookup_cached_response(session_id, user_input, user_id=None):
+    if not embedder or not await asyncio.to_thread(is_cacheable, session_id, user_id):
+        return None, None
+    with stage("embed"):
+        query_vector = await embed_query(user_input)
+    with stage("cache_lookup"):
+        return query_vector, response_cache.lookup(query_vector)
+
+def answer_from_fast_path(user_input):
+    if attribute_store is None:
+        return None
+    from fast_path import answer
+    with stage("fast_path"):
+        return answer(user_input, attribute_store)
+
+async def chat_with_context(session_id, user_input, usage=None, user_id=None):
+    global rag_chain
     
-    # Format the conversation history for context (more efficiently)
-    context_input = user_input
-    if recent_history:
-        context_parts = ["Previous conversation:"]
-        for role, message in recent_history:
-            context_parts.append(f"{role}: {message}")
-        context_parts.append(f"Current question: {user_input}")
-        context_input = "\n".join(context_parts)
+    # Factual lookups skip the cache, retrieval and the LLM entirely
+    response = answer_from_fast_path(user_input)
+    route = "fast_path" if response is not None else "cache"
+    query_vector = None
+    if response is None:
+        query_vector, response = await lookup_cached_response(session_id, user_input, user_id)
     
-    # Invoke the chain with the contextual input
-    response = rag_chain.invoke(context_input)
+    if response is None:
+        route = "rag"
+        context_input = await build_context_input(session_id, user_input, usage, user_id)
+        
+        # Invoke the chain with the contextual input without blocking the event loop
+        response = await rag_chain.ainvoke(context_input)
+        
+        if query_vector is not None:
+            response_cache.put(query_vector, user_input, response)
+    CHAT_REQUESTS.labels("chat", route).inc()
     
     # Update the conversation history
-    add_to_history(session_id, "User", user_input)
-    add_to_history(session_id, "Akasha", response)
+    await asyncio.to_thread(session_store.append, session_id, ("User", user_input), ("Akasha", response))
     
     return response
 
-# Periodically clean up old sessions
-def cleanup_old_sessions():
-    # For a production app, implement session timeout logic
-    # This is a simple placeholder - in reality, you'd track timestamps
-    if len(conversation_histories) > 50:  # If we have too many sessions
-        # Remove oldest sessions (this is simplified)
-        oldest_sessions = list(conversation_histories.keys())[:10]
-        for session_id in oldest_sessions:
-            del conversation_histories[session_id]
-        gc.collect()
+def sse_event(data, event=None):
+    # JSON-encode the payload so newlines in tokens can't break SSE framing
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+async def stream_chat_with_context(session_id, user_input, user_id=None):
+    async with get_session_lock(session_id):
+        async for event in _stream_chat_with_context(session_id, user_input, user_id):
+            yield event
+
+async def _stream_chat_with_context(session_id, user_input, user_id=None):
+    start = time.perf_counter()
+    first_token_at = None
+    tokens = []
+    route = "rag"
+    query_vector, cached = None, None
+    usage = {}
+    
+    try:
+        direct = answer_from_fast_path(user_input)
+        if direct is None:
+            query_vector, cached = await lookup_cached_response(session_id, user_input, user_id)
+        ready = direct if direct is not None else cached
+        if ready is not None:
+            route = "fast_path" if direct is not None else "cache"
+            first_token_at = time.perf_counter()
+            tokens.append(ready)
+            yield sse_event({"token": ready})
+        else:
+            context_input = await build_context_input(session_id, user_input, usage, user_id)
+            async for token in rag_chain.astream(context_input):
+                if not token:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                tokens.append(token)
+                yield sse_event({"token": token})
+    except Exception as e:
+        CHAT_ERRORS.labels("stream").inc()
+        print(f"❌ Streaming error for {session_id}: {e}")
+        yield sse_event({"detail": "Failed to generate a response"}, event="error")
+        return
+    
+    total_ms = (time.perf_counter() - start) * 1000
+    ttft_ms = (first_token_at - start) * 1000 if first_token_at is not None else total_ms
+    
+    # Only record the exchange once the full answer has been streamed
+    response = "".join(tokens)
+    if route == "rag" and query_vector is not None:
+        response_cache.put(query_vector, user_input, response)
+    await asyncio.to_thread(session_store.append, session_id, ("User", user_input), ("Akasha", response))
+    CHAT_REQUESTS.labels("stream", route).inc()
+    
+    print(f"⏱️ {session_id} ({route}): first token {ttft_ms:.0f} ms, total {total_ms:.0f} ms, "
+          f"prompt {usage.get('prompt_tokens', 0)} tokens")
+    yield sse_event({
+        "session_id": session_id,
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "cached": cached is not None,
+        "route": route,
+        "ttft_ms": round(ttft_ms, 1),
+        "total_ms": round(total_ms, 1),
+        "trace_id": current_trace_id(),
+    }, event="done")
 
 # ------------------------------------------
 # User Preferences API Endpoints
 # ------------------------------------------
-import threading
-user_prefs_lock = threading.Lock()
+# One SQLite row per user, shared by all uvicorn workers; the old JSON file
+# is imported into it once on first start. Opened at startup, not on import,
+# so importing app (benchmarks, batch_chat.py) doesn't create the database
 USER_PREFS_PATH = 'data/user_preferences.json'
+preferences_store = None
 
-def load_user_prefs():
-    if not os.path.exists(USER_PREFS_PATH):
-        return {}
-    with open(USER_PREFS_PATH, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def save_user_prefs(prefs):
-    with open(USER_PREFS_PATH, 'w', encoding='utf-8') as f:
-        json.dump(prefs, f, indent=2, ensure_ascii=False)
+def get_preferences_store():
+    global preferences_store
+    if preferences_store is None:
+        store = PreferencesStore(os.getenv("PREFERENCES_DB_PATH", "data/user_preferences.db"))
+        store.migrate_json(USER_PREFS_PATH)
+        preferences_store = store
+    return preferences_store
 
 class UserPreferences(BaseModel):
     userId: str
@@ -277,22 +600,27 @@ class UserPreferences(BaseModel):
     mainTeam: list[str]
     preferredElement: str
 
+# Declared before the {user_id} route so "stats" isn't taken for a user id
+@app.get("/api/user/preferences/stats")
+async def preferences_stats():
+    return get_preferences_store().stats()
+
 @app.get("/api/user/preferences/{user_id}")
 async def get_user_preferences(user_id: str):
-    with user_prefs_lock:
-        prefs = load_user_prefs()
-    user = prefs.get(user_id)
+    # Usually a cache hit; a miss is one indexed SQLite read, kept off the event loop
+    user = await asyncio.to_thread(get_preferences_store().get, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User preferences not found")
     return user
 
 @app.post("/api/user/preferences")
 async def save_user_preferences(preferences: UserPreferences):
-    with user_prefs_lock:
-        prefs = load_user_prefs()
-        prefs[preferences.userId] = preferences.dict()
-        save_user_prefs(prefs)
-    return prefs[preferences.userId]
+    prefs = preferences.dict()
+    await asyncio.to_thread(get_preferences_store().put, preferences.userId, prefs)
+    if personalizer is not None and vectorstore is not None:
+        # Build the new version's profile now so the user's next question doesn't pay for it
+        await asyncio.to_thread(personalizer.profile, preferences.userId, vectorstore)
+    return prefs
 
 # ------------------------------------------
 # API Endpoints
@@ -303,44 +631,150 @@ async def root():
 
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(chat_message: ChatMessage):
-    if not groq_llm or not vectorstore or not rag_chain:
-        raise HTTPException(status_code=500, detail="System not initialized properly")
+    require_ready()
+    
+    # Use provided session_id or generate a new one
+    session_id = chat_message.session_id or new_session_id()
+    
+    # Process the message and get a response; requests for the same session
+    # are serialized so history stays ordered
+    usage = {}
+    async with get_session_lock(session_id):
+        try:
+            response = await chat_with_context(session_id, chat_message.message, usage, chat_message.user_id)
+        except Exception:
+            CHAT_ERRORS.labels("chat").inc()
+            raise
     
-    # Clean up old sessions occasionally
-    if len(conversation_histories) % 10 == 0:
-        cleanup_old_sessions()
+    return ChatResponse(response=response, session_id=session_id, prompt_tokens=usage.get("prompt_tokens"))
+
+@app.post("/api/chat/stream")
+async def chat_stream(chat_message: ChatMessage):
+    require_ready()
     
     # Use provided session_id or generate a new one
-    session_id = chat_message.session_id or f"session_{len(conversation_histories) + 1}"
+    session_id = chat_message.session_id or new_session_id()
     
-    # Process the message and get a response
-    response = chat_with_context(session_id, chat_message.message)
+    # Tokens are flushed as Server-Sent Events; the final "done" event carries
+    # the session id and latency metrics
+    return StreamingResponse(
+        stream_chat_with_context(session_id, chat_message.message, chat_message.user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/api/chat/batch")
+async def chat_batch(batch: BatchChatRequest):
+    require_ready()
+    if not batch.questions or len(batch.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {BATCH_MAX_QUESTIONS} questions")
     
-    return ChatResponse(response=response, session_id=session_id)
+    # Questions are answered independently (no session history); one embedding
+    # pass and one FAISS search cover the whole batch
+    runner = BatchRunner(
+        make_retriever(vectorstore, bm25_index, entity_router),
+        # Benchmarks swap in only groq_llm
+        setup_answer_chain(batch_llm or groq_llm),
+        embedder,
+        concurrency=min(batch.concurrency or DEFAULT_CONCURRENCY, BATCH_MAX_CONCURRENCY),
+        executor=retrieval_executor,
+        direct_answer=answer_from_fast_path,
+    )
+    
+    async def lines():
+        async for result in runner.run(batch.questions):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+    
+    # One JSON object per line, in the order answers complete
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 @app.get("/api/sessions/{session_id}/history")
 async def get_conversation_history(session_id: str):
-    if session_id not in conversation_histories:
+    history = await asyncio.to_thread(session_store.get, session_id)
+    if history is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    history = conversation_histories[session_id]
     formatted_history = [{"role": role, "message": message} for role, message in history]
     
     return {"session_id": session_id, "history": formatted_history}
 
 @app.delete("/api/sessions/{session_id}")
 async def delete_session(session_id: str):
-    if session_id not in conversation_histories:
+    if not await asyncio.to_thread(session_store.delete, session_id):
         raise HTTPException(status_code=404, detail="Session not found")
+    context_manager.forget(session_id)
     
-    del conversation_histories[session_id]
-    gc.collect()  # Force garbage collection after deleting session
     return {"message": f"Session {session_id} deleted successfully"}
 
+@app.get("/api/sessions/stats")
+async def session_stats():
+    return await asyncio.to_thread(session_store.stats)
+
+@app.get("/api/embeddings/stats")
+async def embedding_stats():
+    return embedder.stats() if isinstance(embedder, CachedEmbeddings) else {}
+
+@app.get("/api/personalization/stats")
+async def personalization_stats():
+    return personalizer.stats() if personalizer is not None else {}
+
+@app.get("/api/rerank/stats")
+async def rerank_stats():
+    return reranker.stats() if reranker is not None else {}
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return response_cache.stats()
+
+@app.delete("/api/cache")
+async def clear_cache():
+    response_cache.invalidate()
+    return {"message": "Response cache cleared"}
+
+@app.post("/api/index/reload")
+async def reload_index():
+    global vectorstore, bm25_index, entity_router, personalizer, rag_chain
+    if not embedder or not groq_llm:
+        require_ready()
+        raise HTTPException(status_code=500, detail="System not initialized properly")
+    
+    # Pick up an index rebuilt offline without restarting the server
+    try:
+        index_dir = current_index_dir()
+        new_vectorstore = await asyncio.get_running_loop().run_in_executor(
+            retrieval_executor, load_vector_store, embedder, index_dir
+        )
+        new_bm25 = await asyncio.get_running_loop().run_in_executor(retrieval_executor, load_bm25_index, index_dir)
+        new_router = await asyncio.get_running_loop().run_in_executor(
+            retrieval_executor, load_entity_router, new_vectorstore
+        )
+        new_personalizer = await asyncio.get_running_loop().run_in_executor(
+            retrieval_executor, load_personalizer, new_vectorstore, new_router
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    vectorstore, bm25_index, entity_router = new_vectorstore, new_bm25, new_router
+    personalizer = new_personalizer
+    rag_chain = setup_modern_rag_chain(vectorstore, groq_llm, bm25_index, entity_router, personalizer)
+    
+    # Cached answers were generated from the old index
+    response_cache.invalidate()
+    return {"message": "Vector DB reloaded", "documents": vectorstore.index.ntotal}
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text exposition format
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/api/health")
 async def health_check():
-    status = "healthy" if groq_llm and vectorstore and rag_chain else "unhealthy"
-    return {"status": status}
+    # 503 until ready, so load balancers hold traffic while the model and index load
+    if groq_llm and vectorstore and rag_chain and warmed_up:
+        return {"status": "healthy"}
+    if startup_state == "starting":
+        return JSONResponse({"status": "starting"}, status_code=503)
+    return JSONResponse({"status": "unhealthy", "error": startup_error}, status_code=503)
 
 # ------------------------------------------
 # Entry point for running the API server
@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import contextlib
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 4
+
+
+# ------------------------------------------
+# Rate limits and retries
+# ------------------------------------------
+def is_rate_limited(error):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or "rate limit" in str(error).lower()
+
+
+def retry_after(error):
+    # Groq sends Retry-After (seconds) with its 429s
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class BatchRunner:
+    """Answers many standalone questions at once.
+
+    All questions are embedded in one vectorized call and retrieved with a
+    single batched FAISS search (see ``HybridRetriever.search_rows_batch``).
+    LLM calls then run with at most ``concurrency`` in flight. A rate-limit
+    error pauses every worker until Retry-After (or the backoff) has passed,
+    instead of each one hammering the API again; other errors are retried
+    with jittered exponential backoff up to ``max_retries`` times.
+
+    ``answer_chain`` takes ``{"question", "docs"}``; ``direct_answer`` is an
+    optional ``question -> answer or None`` tried before retrieval.
+    """
+
+    def __init__(self, retriever, answer_chain, embedder, concurrency=DEFAULT_CONCURRENCY,
+                 max_retries=DEFAULT_MAX_RETRIES, base_delay=1.0, executor=None, direct_answer=None):
+        self.retriever = retriever
+        self.answer_chain = answer_chain
+        self.embedder = embedder
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.executor = executor
+        self.direct_answer = direct_answer
+        self._resume_at = 0.0
+        self.rate_limited = 0
+
+    def retrieve(self, questions):
+        vectors = [None] * len(questions)
+        if self.retriever.uses_dense:
+            # One forward pass over the whole batch instead of one per question
+            vectors = self.embedder.embed_documents(questions)
+        return self.retriever.documents_batch(questions, vectors)
+
+    async def _generate(self, question, docs):
+        attempt = 0
+        while True:
+            delay = self._resume_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            attempt += 1
+            try:
+                return await self.answer_chain.ainvoke({"question": question, "docs": docs}), attempt
+            except Exception as e:
+                if attempt > self.max_retries:
+                    raise
+                backoff = self.base_delay * 2 ** (attempt - 1) * (1 + random.random() / 4)
+                if is_rate_limited(e):
+                    self.rate_limited += 1
+                    # Shared cooldown: every worker waits before its next call
+                    self._resume_at = max(self._resume_at, time.monotonic() + (retry_after(e) or backoff))
+                else:
+                    await asyncio.sleep(backoff)
+
+    async def run(self, questions):
+        """Yield one result per question, in completion order."""
+        todo = []
+        for i, question in enumerate(questions):
+            answer = self.direct_answer(question) if self.direct_answer else None
+            if answer is None:
+                todo.append(i)
+            else:
+                yield {"index": i, "question": question, "answer": answer, "route": "fast_path",
+                       "sources": [], "attempts": 0, "latency_ms": 0.0}
+        if not todo:
+            return
+
+        loop = asyncio.get_running_loop()
+        all_docs = await loop.run_in_executor(self.executor, self.retrieve, [questions[i] for i in todo])
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def answer(i, docs):
+            async with semaphore:
+                start = time.perf_counter()
+                result = {"index": i, "question": questions[i], "route": "rag",
+                          "sources": list(dict.fromkeys(d.metadata.get("url") for d in docs if d.metadata.get("url")))}
+                try:
+                    result["answer"], result["attempts"] = await self._generate(questions[i], docs)
+                except Exception as e:
+                    result["answer"], result["attempts"] = None, self.max_retries + 1
+                    result["error"] = f"{e.__class__.__name__}: {e}"
+                result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                return result
+
+        tasks = [asyncio.create_task(answer(i, docs)) for i, docs in zip(todo, all_docs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Stop outstanding LLM calls if the consumer (e.g. an HTTP client) goes away
+            for task in tasks:
+                task.cancel()
+
+
+def read_questions(path):
+    """Questions from a .txt (one per line), .json (list) or .jsonl file; ``-`` reads stdin."""
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with f:
+        if path.endswith(".json"):
+            items = json.load(f)
+        else:
+            items = [json.loads(line) if path.endswith(".jsonl") else line.strip() for line in f if line.strip()]
+    return [item["question"] if isinstance(item, dict) else item for item in items]
+
+
+# ------------------------------------------
+# CLI entry point
+# ------------------------------------------
+async def main(args):
+    from dotenv import load_dotenv
+    from langchain_groq import ChatGroq
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    import app
+
+    load_dotenv()
+    questions = read_questions(args.questions)
+    print(f"📦 Answering {len(questions)} questions with concurrency {args.concurrency}...", file=sys.stderr)
+
+    embedder = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    index_dir = app.current_index_dir()
+    vectorstore = app.load_vector_store(embedder, index_dir)
+    # Retries are handled by BatchRunner so rate limits are shared across workers
+    llm = ChatGroq(groq_api_key=os.getenv("GROQ_API_KEY"), model_name="llama-3.3-70b-versatile", max_retries=0)
+    runner = BatchRunner(
+        app.make_retriever(vectorstore, app.load_bm25_index(index_dir), app.load_entity_router(vectorstore)),
+        app.setup_answer_chain(llm),
+        embedder,
+        concurrency=args.concurrency,
+        max_retries=args.max_retries,
+    )
+
+    start = time.perf_counter()
+    failed = 0
+    # Only a file opened here gets closed; a closed stdout breaks every later print
+    output = open(args.out, "w", encoding="utf-8") if args.out else contextlib.nullcontext(sys.stdout)
+    with output as out:
+        async for result in runner.run(questions):
+            failed += "error" in result
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(questions) - failed}/{len(questions)} answered in {elapsed:.1f}s "
+          f"({len(questions) / elapsed:.2f} questions/sec, {runner.rate_limited} rate-limited calls)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a file of questions in bulk, writing NDJSON")
+    parser.add_argument("questions", help=".txt (one per line), .json or .jsonl file, or - for stdin")
+    parser.add_argument("--out", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="LLM calls in flight")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES)
+    asyncio.run(main(parser.parse_args()))
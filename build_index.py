@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import resource
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import faiss
+import numpy as np
+
+from ann_index import INDEX_TYPES, build_faiss_index, write_index_params
+from document_builder import iter_documents
+from docstore import write_docstore
+from hybrid_retrieval import write_bm25_index
+from incremental_index import INDEX_DIR, EMBEDDING_MODEL, chunk_hash, save_atomically
+
+DEFAULT_BATCH_SIZE = 64
+
+# Set in each worker process by _init_worker
+_worker_embedder = None
+
+
+def minilm_embedder():
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+
+def _init_worker(embedder_factory, threads):
+    global _worker_embedder
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_embedder = embedder_factory()
+
+
+def _embed_batch(offset, texts):
+    vectors = np.asarray(_worker_embedder.embed_documents(texts), dtype=np.float32)
+    return offset, vectors
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux; children covers the worker processes
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / 1024, children / 1024
+
+
+# ------------------------------------------
+# Chunk spool
+# ------------------------------------------
+def spool_chunks(path, documents):
+    """Stream documents to a JSONL spool, dropping duplicate content. Returns the count."""
+    seen = set()
+    with open(path, "w", encoding="utf-8") as f:
+        for doc in documents:
+            chunk_id = chunk_hash(doc)
+            if chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+            f.write(json.dumps({"id": chunk_id, "text": doc.page_content, "metadata": doc.metadata},
+                               ensure_ascii=False) + "\n")
+    return len(seen)
+
+
+def iter_spool(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def iter_batches(path, batch_size):
+    texts = []
+    offset = 0
+    for record in iter_spool(path):
+        texts.append(record["text"])
+        if len(texts) == batch_size:
+            yield offset, texts
+            offset += len(texts)
+            texts = []
+    if texts:
+        yield offset, texts
+
+
+# ------------------------------------------
+# Build
+# ------------------------------------------
+def embed_to_memmap(spool_path, vectors_path, count, embedder_factory, workers, batch_size, threads_per_worker):
+    """Embed spooled chunks into a float32 memmap of shape (count, dim).
+
+    At most ``2 * workers`` batches are in flight, so memory stays bounded
+    regardless of corpus size. ``workers=0`` embeds in-process.
+    """
+    vectors = None
+
+    def write(offset, batch):
+        nonlocal vectors
+        if vectors is None:
+            vectors = np.memmap(vectors_path, dtype=np.float32, mode="w+", shape=(count, batch.shape[1]))
+        vectors[offset:offset + len(batch)] = batch
+
+    if workers == 0:
+        _init_worker(embedder_factory, threads_per_worker)
+        for offset, texts in iter_batches(spool_path, batch_size):
+            write(*_embed_batch(offset, texts))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(embedder_factory, threads_per_worker)) as pool:
+            pending = set()
+            for offset, texts in iter_batches(spool_path, batch_size):
+                pending.add(pool.submit(_embed_batch, offset, texts))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        write(*future.result())
+            for future in pending:
+                write(*future.result())
+
+    vectors.flush()
+    return vectors
+
+
+def build_index(index_dir=INDEX_DIR, documents=None, embedder_factory=minilm_embedder, workers=None,
+                batch_size=DEFAULT_BATCH_SIZE, threads_per_worker=1, embedding_model=EMBEDDING_MODEL,
+                index_type="flat", index_params=None):
+    """Build the FAISS index offline and atomically replace ``index_dir``.
+
+    The result uses content-hash docstore ids and writes the same manifest as
+    incremental_index, so later refreshes can be incremental. ``index_type``
+    and ``index_params`` select an ANN or quantized index (see ann_index.py);
+    those are trained on a sample of the memmapped vectors. Returns stats.
+    """
+    workers = os.cpu_count() if workers is None else workers
+    start = time.perf_counter()
+    parent = os.path.dirname(os.path.abspath(index_dir))
+
+    with tempfile.TemporaryDirectory(dir=parent, prefix=".build-") as work:
+        spool_path = os.path.join(work, "chunks.jsonl")
+        count = spool_chunks(spool_path, documents if documents is not None else iter_documents())
+        if not count:
+            raise ValueError("No documents to index")
+
+        embed_start = time.perf_counter()
+        vectors = embed_to_memmap(spool_path, os.path.join(work, "vectors.f32"), count,
+                                  embedder_factory, workers, batch_size, threads_per_worker)
+        embed_seconds = time.perf_counter() - embed_start
+
+        # Train on a sample, then add in blocks straight from the memmap
+        index_start = time.perf_counter()
+        index, params = build_faiss_index(vectors, index_type, index_params)
+        index_seconds = time.perf_counter() - index_start
+
+        ids = [record["id"] for record in iter_spool(spool_path)]
+
+        def write(path):
+            os.makedirs(path, exist_ok=True)
+            faiss.write_index(index, os.path.join(path, "index.faiss"))
+            write_index_params(path, params)
+            # Stream the docstore straight from the spool; documents are never all in memory
+            write_docstore(path, ((r["id"], r["text"], r["metadata"]) for r in iter_spool(spool_path)))
+            write_bm25_index(path)
+
+        save_atomically(write, index_dir, ids, embedding_model)
+        del vectors
+
+    own_rss, worker_rss = peak_rss_mb()
+    return {
+        "chunks": count,
+        "workers": workers,
+        "batch_size": batch_size,
+        "index_type": index_type,
+        "embed_seconds": round(embed_seconds, 3),
+        "index_seconds": round(index_seconds, 3),
+        "total_seconds": round(time.perf_counter() - start, 3),
+        "chunks_per_sec": round(count / embed_seconds, 1) if embed_seconds else 0.0,
+        "peak_rss_mb": round(own_rss, 1),
+        "peak_worker_rss_mb": round(worker_rss, 1),
+    }
+
+
+# ------------------------------------------
+# CLI entry point
+# ------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the Genshin FAISS index offline")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="embedding processes (default: CPU count, 0 = in-process)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="torch intra-op threads per worker")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat")
+    parser.add_argument("--nlist", type=int, help="IVF cells (default ~4*sqrt(chunks))")
+    parser.add_argument("--nprobe", type=int, help="IVF cells searched per query (default 16)")
+    parser.add_argument("--pq-m", type=int, help="IVF-PQ bytes per vector (default 48)")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW neighbours per node (default 32)")
+    parser.add_argument("--ef-search", type=int, help="HNSW candidates per query (default 64)")
+    args = parser.parse_args()
+    index_params = {name: getattr(args, name) for name in ("nlist", "nprobe", "pq_m", "hnsw_m", "ef_search")
+                    if getattr(args, name) is not None}
+
+    print(f"📦 Building {args.index_dir} from JSON data...")
+    stats = build_index(args.index_dir, workers=args.workers, batch_size=args.batch_size,
+                        threads_per_worker=args.threads_per_worker, index_type=args.index_type,
+                        index_params=index_params)
+    print(f"✅ Indexed {stats['chunks']} chunks into a {stats['index_type']} index in {stats['total_seconds']}s "
+          f"({stats['chunks_per_sec']} chunks/sec with {stats['workers']} workers, batch {stats['batch_size']})")
+    print(f"📈 Peak RSS: {stats['peak_rss_mb']} MB (parent), {stats['peak_worker_rss_mb']} MB (largest worker)")
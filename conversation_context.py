@@ -0,0 +1,208 @@
+import re
+import asyncio
+import hashlib
+from collections import OrderedDict
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You keep a running summary of a conversation between a user and Akasha, an assistant for "
+               "Genshin Impact lore. Merge the new turns into the current summary. Keep the characters, places "
+               "and topics discussed and what the user wanted to know. Reply with the updated summary only, "
+               "in at most {max_words} words."),
+    ("human", "Current summary:\n{summary}\n\nNew turns:\n{turns}"),
+])
+
+REWRITE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "Rewrite the user's latest question so it can be understood without the conversation. Replace "
+               "pronouns and vague references with the names they refer to. Reply with the rewritten question "
+               "only."),
+    ("human", "Conversation summary:\n{summary}\n\nRecent turns:\n{turns}\n\nLatest question: {question}"),
+])
+
+# Questions without any of these read as standalone and skip the rewrite call
+FOLLOW_UP_WORDS = re.compile(
+    r"\b(he|she|him|her|his|hers|they|them|their|it|its|this|that|these|those|there|then|one|ones|"
+    r"else|more|also|too|other|same|previous|above|earlier|again)\b|^(and|but|so|what about|how about)\b",
+    re.IGNORECASE,
+)
+
+
+# Number of trailing folded messages that identify where a summary ends
+ANCHOR_MESSAGES = 4
+
+
+def count_tokens(text):
+    # ~4 characters per token for English prose; Groq doesn't expose the Llama tokenizer
+    return (len(text) + 3) // 4
+
+
+def clip_tokens(text, max_tokens):
+    if count_tokens(text) <= max_tokens:
+        return text
+    return text[:max(0, max_tokens * 4 - 1)].rstrip() + "…"
+
+
+def format_turns(turns):
+    return "\n".join(f"{role}: {message}" for role, message in turns)
+
+
+def fingerprint(messages):
+    digest = hashlib.sha1()
+    for role, text in messages:
+        digest.update(f"{role}\x00{text}\x00".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def pack_documents(docs, max_tokens):
+    """Join retrieved chunks in rank order until ``max_tokens`` is used up."""
+    parts = []
+    remaining = max_tokens
+    for doc in docs:
+        if remaining <= 0:
+            break
+        text = clip_tokens(doc.page_content, remaining)
+        parts.append(text)
+        # Account for the blank line between chunks
+        remaining -= count_tokens(text) + 1
+    return "\n\n".join(parts)
+
+
+class ConversationContextManager:
+    """Builds the conversation part of each prompt within a token budget.
+
+    The most recent turns that fit in ``history_budget`` are kept verbatim,
+    each clipped to ``max_message_tokens``. Older turns are folded into a
+    rolling summary per session. Each update only folds in the turns that
+    left the window since the last request, so the summarization prompt
+    stays small however long the conversation gets. Follow-up questions
+    are rewritten into standalone queries so retrieval embeds the question,
+    not the transcript.
+
+    ``llm`` is a small chat model used for summaries and rewrites. Without
+    one, older turns are simply dropped and retrieval uses the raw question.
+    """
+
+    def __init__(self, llm=None, history_budget=1000, max_message_tokens=250, summary_words=120,
+                 max_sessions=4096):
+        self.llm = llm
+        self.history_budget = history_budget
+        self.max_message_tokens = max_message_tokens
+        self.summary_words = summary_words
+        self.max_sessions = max_sessions
+        # session_id -> (summary, fingerprint of the last messages folded into it), in LRU order
+        self._summaries = OrderedDict()
+        self.summary_calls = 0
+        self.rewrite_calls = 0
+
+    @property
+    def summary_budget(self):
+        return self.history_budget // 4
+
+    def window(self, history, question):
+        """Split ``history`` into (older turns, clipped recent turns that fit the budget)."""
+        budget = self.history_budget - self.summary_budget - count_tokens(question)
+        recent = []
+        start = len(history)
+        for role, message in reversed(history):
+            message = clip_tokens(message, self.max_message_tokens)
+            cost = count_tokens(f"{role}: {message}") + 1
+            if cost > budget:
+                break
+            budget -= cost
+            recent.append((role, message))
+            start -= 1
+        return history[:start], recent[::-1]
+
+    def _cached_summary(self, session_id):
+        entry = self._summaries.get(session_id)
+        if entry is None:
+            return "", None
+        self._summaries.move_to_end(session_id)
+        return entry
+
+    def _remember(self, session_id, summary, anchor):
+        self._summaries[session_id] = (summary, anchor)
+        self._summaries.move_to_end(session_id)
+        while len(self._summaries) > self.max_sessions:
+            self._summaries.popitem(last=False)
+
+    def _unsummarized(self, history, older, anchor):
+        # Turns that left the window since the summary was last updated. The
+        # anchor covers the last few folded messages so a repeated answer
+        # can't match the wrong place, and it may sit inside the window when
+        # short turns let the window grow back.
+        for i in range(len(history) - 1, -1, -1):
+            if fingerprint(history[max(0, i + 1 - ANCHOR_MESSAGES):i + 1]) == anchor:
+                return older[i + 1:]
+        return older
+
+    async def _summarize(self, summary, turns):
+        self.summary_calls += 1
+        text = await (SUMMARY_PROMPT | self.llm | StrOutputParser()).ainvoke({
+            "summary": summary or "(empty)",
+            "turns": format_turns((role, clip_tokens(message, self.max_message_tokens)) for role, message in turns),
+            "max_words": self.summary_words,
+        })
+        return clip_tokens(text.strip(), self.summary_budget)
+
+    async def _rewrite(self, summary, turns, question):
+        self.rewrite_calls += 1
+        text = await (REWRITE_PROMPT | self.llm | StrOutputParser()).ainvoke({
+            "summary": summary or "(none)",
+            "turns": format_turns((role, clip_tokens(message, self.max_message_tokens)) for role, message in turns),
+            "question": question,
+        })
+        return text.strip() or question
+
+    async def build(self, session_id, history, question):
+        """Return ``{"question", "query", ...}`` for the RAG chain.
+
+        ``question`` is the conversation-aware prompt text and ``query`` the
+        standalone question used for retrieval.
+        """
+        older, recent = self.window(history, question)
+        summary, anchor = self._cached_summary(session_id)
+        pending = self._unsummarized(history, older, anchor) if older else []
+        query = question
+        summarized = 0
+
+        if self.llm is not None:
+            tasks = {}
+            if pending:
+                tasks["summary"] = self._summarize(summary, pending)
+            if history and FOLLOW_UP_WORDS.search(question):
+                # Runs alongside the summary update, so the turns that just left the
+                # window are passed too; otherwise they'd be in neither
+                tasks["query"] = self._rewrite(summary, pending + recent, question)
+            results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+            for name, result in zip(tasks, results):
+                if isinstance(result, Exception):
+                    # Fall back to the previous summary / raw question rather than failing the request
+                    print(f"⚠️ Context {name} failed for {session_id}: {result}")
+                elif name == "summary":
+                    summary = result
+                    summarized = len(pending)
+                    self._remember(session_id, summary, fingerprint(older[-ANCHOR_MESSAGES:]))
+                else:
+                    query = result
+
+        parts = []
+        if summary:
+            parts.append(f"Summary of the earlier conversation: {summary}")
+        if recent:
+            parts.append("Previous conversation:\n" + format_turns(recent))
+        prompt_question = question
+        if parts:
+            prompt_question = "\n\n".join(parts + [f"Current question: {question}"])
+
+        return {
+            "question": prompt_question,
+            "query": query,
+            "history_tokens": count_tokens(prompt_question) - count_tokens(question),
+            "summarized_turns": summarized,
+        }
+
+    def forget(self, session_id):
+        self._summaries.pop(session_id, None)
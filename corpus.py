@@ -0,0 +1,79 @@
+import os
+import json
+import hashlib
+import argparse
+
+# One JSONL file per source, each line one entity section:
+#   {"id", "type", "title", "section", "text", "metadata", "hash"}
+CORPUS_DIR = "data/corpus"
+
+# Read order; matches the order the builders have always produced documents in
+SOURCES = ("character_lore", "wiki_sections", "characters", "lore")
+
+
+def record_hash(text, metadata):
+    payload = json.dumps({"text": text, "metadata": metadata}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def make_record(record_type, title, section, text, metadata):
+    """One normalized corpus record; ``id`` is stable across scrapes, ``hash`` changes with the content."""
+    return {
+        "id": f"{record_type}:{title}:{section}",
+        "type": record_type,
+        "title": title,
+        "section": section,
+        "text": text,
+        "metadata": metadata,
+        "hash": record_hash(text, metadata),
+    }
+
+
+def source_path(source, directory=CORPUS_DIR):
+    return os.path.join(directory, f"{source}.jsonl")
+
+
+def has_corpus(directory=CORPUS_DIR):
+    return any(os.path.exists(source_path(source, directory)) for source in SOURCES)
+
+
+def write_source(source, records, directory=CORPUS_DIR):
+    """Stream ``records`` into ``<directory>/<source>.jsonl``, replacing it atomically. Returns the count."""
+    os.makedirs(directory, exist_ok=True)
+    path = source_path(source, directory)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def iter_corpus(directory=CORPUS_DIR, sources=SOURCES):
+    """Yield records one line at a time, so memory stays flat however large the corpus is."""
+    for source in sources:
+        path = source_path(source, directory)
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# ------------------------------------------
+# CLI entry point
+# ------------------------------------------
+if __name__ == "__main__":
+    from document_builder import legacy_records
+
+    parser = argparse.ArgumentParser(description="Convert the scraped JSON files in data/ into the JSONL corpus")
+    parser.add_argument("--corpus-dir", default=CORPUS_DIR)
+    parser.add_argument("--sources", default=",".join(SOURCES), help="comma-separated subset of sources")
+    args = parser.parse_args()
+
+    for source in args.sources.split(","):
+        count = write_source(source, legacy_records(source), args.corpus_dir)
+        print(f"✅ {source}: {count} records -> {source_path(source, args.corpus_dir)}")
@@ -0,0 +1,215 @@
+import os
+import mmap
+import json
+import pickle
+import argparse
+from bisect import bisect_left
+from collections.abc import Mapping
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from ann_index import apply_search_params, load_index_params
+
+# On-disk layout, next to index.faiss:
+#   docstore.blob        UTF-8 JSON records [text, metadata], one after another
+#   docstore.offsets.npy uint64 byte offsets into the blob, one per row plus an end marker
+#   docstore.ids.npy     fixed-width ASCII docstore id per FAISS row
+#   docstore.order.npy   uint32 rows sorted by id, for binary-search lookups
+BLOB_FILE = "docstore.blob"
+OFFSETS_FILE = "docstore.offsets.npy"
+IDS_FILE = "docstore.ids.npy"
+ORDER_FILE = "docstore.order.npy"
+
+
+def has_mmap_docstore(index_dir):
+    return os.path.exists(os.path.join(index_dir, BLOB_FILE))
+
+
+# ------------------------------------------
+# Writing
+# ------------------------------------------
+def write_docstore(index_dir, records):
+    """Write ``(id, text, metadata)`` records, in FAISS row order, to ``index_dir``.
+
+    Records are streamed straight to the blob; only the ids and offsets are
+    kept in memory while writing.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    ids = []
+    offsets = [0]
+    with open(os.path.join(index_dir, BLOB_FILE), "wb") as blob:
+        for doc_id, text, metadata in records:
+            data = json.dumps([text, metadata], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            blob.write(data)
+            offsets.append(offsets[-1] + len(data))
+            ids.append(doc_id.encode("ascii"))
+
+    ids = np.array(ids, dtype=f"S{max((len(i) for i in ids), default=1)}")
+    np.save(os.path.join(index_dir, OFFSETS_FILE), np.array(offsets, dtype=np.uint64))
+    np.save(os.path.join(index_dir, IDS_FILE), ids)
+    np.save(os.path.join(index_dir, ORDER_FILE), np.argsort(ids, kind="stable").astype(np.uint32))
+
+
+def save_vectorstore(vectorstore, index_dir):
+    """Save an in-memory FAISS vectorstore as index.faiss plus the mmap docstore."""
+    os.makedirs(index_dir, exist_ok=True)
+    faiss.write_index(vectorstore.index, os.path.join(index_dir, "index.faiss"))
+
+    def records():
+        for row in range(vectorstore.index.ntotal):
+            doc_id = vectorstore.index_to_docstore_id[row]
+            doc = vectorstore.docstore.search(doc_id)
+            yield doc_id, doc.page_content, doc.metadata
+
+    write_docstore(index_dir, records())
+
+
+# ------------------------------------------
+# Reading
+# ------------------------------------------
+class MmapDocstore(Docstore):
+    """Read-only docstore backed by memory-mapped files.
+
+    Nothing is deserialized up front: the blob, offsets and id tables are
+    mapped from disk, so pages are shared between processes through the OS
+    page cache and only documents that are actually looked up are built.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self._offsets = np.load(os.path.join(index_dir, OFFSETS_FILE), mmap_mode="r")
+        self.ids = np.load(os.path.join(index_dir, IDS_FILE), mmap_mode="r")
+        self._order = np.load(os.path.join(index_dir, ORDER_FILE), mmap_mode="r")
+        with open(os.path.join(index_dir, BLOB_FILE), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _row_for_id(self, doc_id):
+        key = doc_id.encode("ascii") if isinstance(doc_id, str) else doc_id
+        # Binary search over the mapped id table via the sorted row order
+        pos = bisect_left(_SortedIds(self.ids, self._order), key)
+        if pos < len(self._order):
+            row = int(self._order[pos])
+            if self.ids[row] == key:
+                return row
+        return None
+
+    def document(self, row):
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        text, metadata = json.loads(self._blob[start:end].decode("utf-8"))
+        return Document(id=self.ids[row].decode("ascii"), page_content=text, metadata=metadata)
+
+    def search(self, search):
+        row = self._row_for_id(search)
+        if row is None:
+            return f"ID {search} not found."
+        return self.document(row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            doc = self.document(row)
+            yield doc.id, doc.page_content, doc.metadata
+
+
+class _SortedIds:
+    # Sequence view of ids in sorted order, so bisect can search the memmap in place
+    def __init__(self, ids, order):
+        self._ids = ids
+        self._order = order
+
+    def __len__(self):
+        return len(self._order)
+
+    def __getitem__(self, i):
+        return self._ids[self._order[i]]
+
+
+class RowIds(Mapping):
+    """Lazy ``index_to_docstore_id`` mapping backed by the mapped id table."""
+
+    def __init__(self, ids):
+        self._ids = ids
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self._ids):
+            raise KeyError(row)
+        return self._ids[row].decode("ascii")
+
+    def __iter__(self):
+        return iter(range(len(self._ids)))
+
+    def __len__(self):
+        return len(self._ids)
+
+
+def read_index(path):
+    # Map the vectors too when this FAISS build supports it, so they are shared across workers
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except (RuntimeError, AttributeError):
+        return faiss.read_index(path)
+
+
+def load_vectorstore(index_dir, embedder):
+    """Load a read-only FAISS vectorstore without unpickling anything."""
+    docstore = MmapDocstore(index_dir)
+    index = read_index(os.path.join(index_dir, "index.faiss"))
+    # nprobe / efSearch aren't stored in index.faiss
+    apply_search_params(index, load_index_params(index_dir))
+    return FAISS(embedder, index, docstore, RowIds(docstore.ids))
+
+
+def load_editable_vectorstore(index_dir, embedder):
+    """Materialize the mmap docstore into a regular FAISS store for offline edits."""
+    docstore = MmapDocstore(index_dir)
+    index = faiss.read_index(os.path.join(index_dir, "index.faiss"))
+    apply_search_params(index, load_index_params(index_dir))
+    in_memory = InMemoryDocstore()
+    index_to_docstore_id = {}
+    for row, (doc_id, text, metadata) in enumerate(docstore):
+        in_memory.add({doc_id: Document(id=doc_id, page_content=text, metadata=metadata)})
+        index_to_docstore_id[row] = doc_id
+    return FAISS(embedder, index, in_memory, index_to_docstore_id)
+
+
+# ------------------------------------------
+# Migration from index.pkl
+# ------------------------------------------
+def migrate_pickle(index_dir, keep_pickle=False):
+    """Convert a LangChain ``index.pkl`` docstore into the mmap format.
+
+    This is the only place that unpickles, and it should only be run on an
+    index you built yourself.
+    """
+    pkl_path = os.path.join(index_dir, "index.pkl")
+    with open(pkl_path, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    def records():
+        for row in range(len(index_to_docstore_id)):
+            doc_id = index_to_docstore_id[row]
+            doc = docstore.search(doc_id)
+            yield doc_id, doc.page_content, doc.metadata
+
+    write_docstore(index_dir, records())
+    if not keep_pickle:
+        os.remove(pkl_path)
+    return len(index_to_docstore_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate a pickled FAISS docstore to the mmap format")
+    parser.add_argument("--index-dir", default="genshin_vector_db")
+    parser.add_argument("--keep-pickle", action="store_true", help="leave index.pkl in place")
+    args = parser.parse_args()
+
+    count = migrate_pickle(args.index_dir, keep_pickle=args.keep_pickle)
+    print(f"✅ Migrated {count} documents in {args.index_dir} to the mmap docstore")
@@ -0,0 +1,381 @@
+import os
+import re
+import json
+from urllib.parse import unquote
+
+from langchain.docstore.document import Document
+
+from corpus import CORPUS_DIR, SOURCES, iter_corpus, make_record, source_path, write_source
+
+CHARACTER_LORE_FILE = "data/character_lore.json"
+CHARACTERS_FILE = "data/characters.json"
+WIKI_SECTIONS_FILE = "data/wiki_sections.json"
+LORE_FILE = "data/lore.json"
+
+# Upper bound on the text of one document; paragraphs are packed up to this
+# size and never split mid-sentence unless a single sentence is longer
+DEFAULT_MAX_CHARS = 800
+
+_FOOTNOTE_RE = re.compile(r"\[\d+\]")
+_SPACES_RE = re.compile(r"[ \t\xa0]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+# ------------------------------------------
+# Streaming JSON reader
+# ------------------------------------------
+def iter_json_entries(path, chunk_size=1 << 20):
+    """Yield ``(key, value)`` pairs from a top-level JSON object or array.
+
+    The file is read ``chunk_size`` characters at a time and entries are
+    decoded one at a time with ``raw_decode``, so memory holds one entity
+    plus a chunk of raw text, never the whole file. Array entries are yielded
+    with their index as the key. An empty file yields nothing.
+    """
+    with open(path, encoding="utf-8") as f:
+        stream = _JSONStream(f, chunk_size)
+        opener = stream.peek()
+        if not opener:
+            return
+        if opener not in "[{":
+            yield None, stream.decode()
+            return
+
+        closer = "]" if opener == "[" else "}"
+        stream.advance()
+        index = 0
+        while True:
+            char = stream.peek()
+            if char == closer:
+                return
+            if not char:
+                raise ValueError(f"{path}: unexpected end of JSON")
+            if opener == "{":
+                key = stream.decode()
+                stream.peek()
+                stream.advance()  # ':'
+            else:
+                key = index
+            yield key, stream.decode()
+            index += 1
+            if stream.peek() == ",":
+                stream.advance()
+
+
+class _JSONStream:
+    """A read buffer over a text file that ``raw_decode`` can decode from."""
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        # Reads grow with the pending text so a large entity is re-decoded
+        # only a logarithmic number of times
+        chunk = self.f.read(max(self.chunk_size, len(self.buffer) - self.pos))
+        if not chunk:
+            self.eof = True
+            return
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """The next non-whitespace character, or "" at the end of the file."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self._fill()
+
+    def advance(self):
+        self.pos += 1
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+                # A value that ends the buffer may be cut short ("12" of "123")
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+# ------------------------------------------
+# Text helpers
+# ------------------------------------------
+def clean_text(text):
+    # Scraped pages keep infobox layout whitespace, soft hyphens and footnote
+    # markers; collapse them into plain lines of prose
+    text = (text or "").replace("\xad", "")
+    text = _FOOTNOTE_RE.sub("", text)
+    lines = (_SPACES_RE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def pack_paragraphs(text, max_chars=DEFAULT_MAX_CHARS):
+    """Group lines into chunks of at most ``max_chars`` characters."""
+    chunks = []
+    current = []
+    size = 0
+
+    for paragraph in text.split("\n"):
+        pieces = [paragraph] if len(paragraph) <= max_chars else _split_long(paragraph, max_chars)
+        for piece in pieces:
+            if current and size + len(piece) + 1 > max_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _split_long(paragraph, max_chars):
+    pieces = []
+    current = ""
+    for sentence in _SENTENCE_RE.split(paragraph):
+        while len(sentence) > max_chars:
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _join(value):
+    if isinstance(value, list):
+        return ", ".join(str(v) for v in value)
+    return str(value) if value is not None else ""
+
+
+def chunk_documents(name, section, text, metadata, max_chars=DEFAULT_MAX_CHARS):
+    # Every chunk is prefixed with its entity and section so it reads on its own
+    header = f"{name} — {section}" if section else name
+    budget = max(max_chars - len(header) - 1, 100)
+    for i, chunk in enumerate(pack_paragraphs(text, budget)):
+        yield Document(
+            page_content=f"{header}\n{chunk}",
+            metadata={**metadata, "name": name, "section": section, "chunk": i},
+        )
+
+
+def section_documents(name, section, text, metadata, max_chars=DEFAULT_MAX_CHARS):
+    yield from chunk_documents(name, section, clean_text(text), metadata, max_chars)
+
+
+# ------------------------------------------
+# Per-source converters: scraped entries -> corpus records
+# ------------------------------------------
+def load_character_profiles(path=CHARACTERS_FILE):
+    profiles = {}
+    if not os.path.exists(path):
+        return profiles
+    for _, entry in iter_json_entries(path):
+        profile = entry.get("result", entry)
+        if profile.get("name"):
+            profiles[profile["name"]] = profile
+    return profiles
+
+
+def match_profile(name, profiles):
+    # characters.json uses short names ("Kazuha", "Kuki") where the wiki uses
+    # full ones ("Kaedehara Kazuha", "Kuki Shinobu")
+    if name in profiles:
+        return profiles[name]
+    words = set(name.split())
+    for profile_name, profile in profiles.items():
+        if set(profile_name.split()) <= words:
+            return profile
+    return None
+
+
+def profile_metadata(profile):
+    if not profile:
+        return {}
+    return {
+        "region": _join(profile.get("region")),
+        "vision": profile.get("vision", ""),
+        "weapon": profile.get("weapon", ""),
+        "affiliation": _join(profile.get("affiliation")),
+    }
+
+
+def _record(record_type, title, section, text, metadata):
+    text = clean_text(text)
+    return make_record(record_type, title, section, text, metadata) if text else None
+
+
+def page_records(record_type, title, section, entry, text_key, sections_key, metadata, prefix=None):
+    """Records for one scraped page: one per heading section when the scraper
+    kept them (see Scraping_Scripts/wiki_extract.py), else the flat text as ``section``."""
+    sections = entry.get(sections_key) or []
+    if not sections:
+        record = _record(record_type, title, section, entry.get(text_key), metadata)
+        return [record] if record else []
+    records = []
+    for page_section in sections:
+        path = ([prefix] if prefix else []) + page_section["path"]
+        records.append(_record(record_type, title, " / ".join(path) or section, page_section["text"], metadata))
+    return [record for record in records if record]
+
+
+def infobox_record(record_type, title, infobox, metadata):
+    lines = [f"{label}: {value}" for label, value in (infobox or {}).items() if label != "title"]
+    return _record(record_type, title, "Infobox", "\n".join(lines), metadata)
+
+
+def character_lore_records(entries, profiles=None, path=CHARACTER_LORE_FILE):
+    profiles = profiles if profiles is not None else load_character_profiles()
+    for name, entry in entries:
+        base = {"file": path, "type": "character", **profile_metadata(match_profile(name, profiles))}
+        overview = {**base, "url": entry.get("overview_url", "")}
+        yield from page_records("character", name, "Overview", entry, "overview", "overview_sections",
+                                overview, prefix="Overview")
+        record = infobox_record("character", name, entry.get("infobox"), overview)
+        if record:
+            yield record
+        yield from page_records("character", name, "Lore", entry, "lore", "lore_sections",
+                                {**base, "url": entry.get("lore_url", "")}, prefix="Lore")
+
+
+def render_profile(profile):
+    fields = [
+        ("Title", "title"), ("Real name", "real_name"), ("Rarity", "rarity"), ("Vision", "vision"),
+        ("Weapon", "weapon"), ("Region", "region"), ("Affiliation", "affiliation"),
+        ("Birthday", "birthday"), ("Constellation", "constellation"), ("Special dish", "special_dish"),
+        ("Model type", "model_type"), ("How to obtain", "how_to_obtain"),
+        ("Release version", "release_version"),
+    ]
+    lines = [f"{label}: {_join(profile[key])}" for label, key in fields if profile.get(key)]
+    for actors in profile.get("voice_actors") or []:
+        lines.append("Voice actors: " + ", ".join(f"{lang} {actor}" for lang, actor in actors.items()))
+    return "\n".join(lines)
+
+
+def character_profile_records(entries, path=CHARACTERS_FILE):
+    for _, entry in entries:
+        profile = entry.get("result", entry)
+        name = profile.get("name")
+        if not name:
+            continue
+        metadata = {
+            "file": path,
+            "type": "character",
+            "url": profile.get("wiki_url", ""),
+            "rarity": profile.get("rarity", ""),
+            **profile_metadata(profile),
+        }
+        record = _record("character", name, "Profile", render_profile(profile), metadata)
+        if record:
+            yield record
+
+
+def page_title(title):
+    return unquote(title).replace("_", " ").split("#")[0].strip()
+
+
+def _wiki_page_records(record_type, title, entry, metadata):
+    yield from page_records(record_type, title, "Summary", entry, "summary", "sections", metadata)
+    record = infobox_record(record_type, title, entry.get("infobox"), metadata)
+    if record:
+        yield record
+
+
+def wiki_section_records(entries, path=WIKI_SECTIONS_FILE):
+    for title, entry in entries:
+        metadata = {"file": path, "type": "wiki", "url": entry.get("url", "")}
+        yield from _wiki_page_records("wiki", page_title(title), entry, metadata)
+
+
+def lore_records(entries, path=LORE_FILE):
+    for _, entry in entries:
+        metadata = {"file": path, "type": "lore", "url": entry.get("url", "")}
+        yield from _wiki_page_records("lore", page_title(entry.get("title", "")), entry, metadata)
+
+
+# Corpus source -> (converter, scraped files it is built from)
+SOURCE_CONVERTERS = {
+    "character_lore": (character_lore_records, (CHARACTER_LORE_FILE, CHARACTERS_FILE)),
+    "wiki_sections": (wiki_section_records, (WIKI_SECTIONS_FILE,)),
+    "characters": (character_profile_records, (CHARACTERS_FILE,)),
+    "lore": (lore_records, (LORE_FILE,)),
+}
+
+
+def legacy_records(source):
+    """Convert the scraped JSON file of ``source`` to corpus records on the fly."""
+    converter, files = SOURCE_CONVERTERS[source]
+    return converter(iter_json_entries(files[0]))
+
+
+def export_source(source, entries, directory=CORPUS_DIR):
+    """Write freshly scraped ``(key, entry)`` pairs of ``source`` straight to the corpus."""
+    converter, _ = SOURCE_CONVERTERS[source]
+    return write_source(source, converter(entries), directory)
+
+
+def corpus_is_fresh(source, directory=CORPUS_DIR):
+    # A hand-edited or re-scraped JSON file newer than the corpus wins
+    path = source_path(source, directory)
+    if not os.path.exists(path):
+        return False
+    _, files = SOURCE_CONVERTERS[source]
+    newest = max((os.path.getmtime(f) for f in files if os.path.exists(f)), default=0)
+    return os.path.getmtime(path) >= newest
+
+
+def iter_records(directory=CORPUS_DIR):
+    """Yield every corpus record, reading data/corpus/ where it is up to date
+    and converting the scraped JSON for the sources where it isn't."""
+    for source in SOURCES:
+        if corpus_is_fresh(source, directory):
+            yield from iter_corpus(directory, (source,))
+        else:
+            yield from legacy_records(source)
+
+
+def record_documents(records, max_chars=DEFAULT_MAX_CHARS):
+    for record in records:
+        yield from chunk_documents(record["title"], record["section"], record["text"], record["metadata"], max_chars)
+
+
+# ------------------------------------------
+# Per-source document builders
+# ------------------------------------------
+def build_character_lore_docs(path=CHARACTER_LORE_FILE, profiles=None, max_chars=DEFAULT_MAX_CHARS):
+    return record_documents(character_lore_records(iter_json_entries(path), profiles, path), max_chars)
+
+
+def build_character_profile_docs(path=CHARACTERS_FILE, max_chars=DEFAULT_MAX_CHARS):
+    return record_documents(character_profile_records(iter_json_entries(path), path), max_chars)
+
+
+def build_wiki_section_docs(path=WIKI_SECTIONS_FILE, max_chars=DEFAULT_MAX_CHARS):
+    return record_documents(wiki_section_records(iter_json_entries(path), path), max_chars)
+
+
+def build_lore_docs(path=LORE_FILE, max_chars=DEFAULT_MAX_CHARS):
+    return record_documents(lore_records(iter_json_entries(path), path), max_chars)
+
+
+def iter_documents(max_chars=DEFAULT_MAX_CHARS, directory=CORPUS_DIR):
+    """Lazily yield one clean-text Document per chunk of every entity section."""
+    return record_documents(iter_records(directory), max_chars)
@@ -0,0 +1,175 @@
+import re
+from collections import deque, defaultdict
+
+from hybrid_retrieval import document_for_row
+from document_builder import (
+    CHARACTER_LORE_FILE, CHARACTERS_FILE, LORE_FILE, WIKI_SECTIONS_FILE, iter_json_entries, page_title,
+)
+
+# Single words that are too generic to identify an entity on their own
+ALIAS_STOPWORDS = {
+    "the", "of", "and", "a", "an", "in", "to", "list", "order", "quest", "story", "world", "event",
+    "common", "elite", "weekly", "boss", "enemy", "sets", "exp", "book", "manga", "comics", "timeline",
+    "male", "female", "girl", "boy", "traveller", "lore", "war",
+}
+
+# Metadata fields whose (comma-separated) values also identify an entity's chunks
+ROW_FIELDS = ("name", "region", "affiliation")
+
+_WORD_CHAR = re.compile(r"\w")
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every pattern in a text in one pass.
+
+    Patterns are matched case-insensitively and only on word boundaries, so
+    "Xiao" doesn't fire inside "Xiaojing".
+    """
+
+    def __init__(self, patterns):
+        # patterns: {pattern: payload}
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern, payload in patterns.items():
+            self._add(pattern.lower(), payload)
+        self._build_fail_links()
+
+    def _add(self, pattern, payload):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), payload))
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                if state == 0:
+                    continue
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """Yield ``(start, end, payload)`` for every word-bounded match."""
+        text = text.lower()
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length, payload in self._out[state]:
+                start = i - length + 1
+                before_ok = start == 0 or not _WORD_CHAR.match(text[start - 1])
+                after_ok = i + 1 == len(text) or not _WORD_CHAR.match(text[i + 1])
+                if before_ok and after_ok:
+                    yield start, i + 1, payload
+
+
+# ------------------------------------------
+# Entity vocabulary
+# ------------------------------------------
+def entity_aliases():
+    """Map lowercase alias -> set of canonical entity names from the data files."""
+    aliases = defaultdict(set)
+    # Single words of multi-word character names, added at the end if unambiguous
+    name_words = set()
+
+    def add(alias, entity):
+        alias = (alias or "").strip().lower()
+        if len(alias) >= 3 and alias not in ALIAS_STOPWORDS:
+            aliases[alias].add(entity)
+
+    def add_name(name):
+        add(name, name)
+        if len(name.split()) > 1:
+            name_words.add(name)
+
+    full_names = [name for name, _ in iter_json_entries(CHARACTER_LORE_FILE)]
+    for name in full_names:
+        add_name(name)
+
+    for _, entry in iter_json_entries(CHARACTERS_FILE):
+        profile = entry.get("result", entry)
+        short = profile.get("name", "")
+        # Resolve short names ("Kazuha") to the full wiki name when there is one
+        name = next((f for f in full_names if set(short.split()) <= set(f.split())), short)
+        add_name(name)
+        for title in profile.get("title") or []:
+            add(title, name)
+        add(profile.get("real_name"), name)
+
+    for title, _ in iter_json_entries(WIKI_SECTIONS_FILE):
+        add(page_title(title), page_title(title))
+    for _, entry in iter_json_entries(LORE_FILE):
+        add(page_title(entry.get("title", "")), page_title(entry.get("title", "")))
+
+    # "Kaedehara Kazuha" is usually just "Kazuha", but "Kamisato" is both Ayaka
+    # and Ayato: a word becomes an alias only if no other entity's name has it
+    # and it isn't already an alias of its own
+    word_entities = defaultdict(set)
+    for entity in {e for entities in aliases.values() for e in entities}:
+        for word in entity.lower().split():
+            word_entities[word].add(entity)
+    for name in name_words:
+        for word in name.lower().split():
+            if word_entities[word] == {name} and word not in aliases:
+                add(word, name)
+
+    return aliases
+
+
+class EntityRouter:
+    """Tags queries with known entities and maps them to FAISS rows.
+
+    ``route(query)`` returns the sorted rows of chunks about the mentioned
+    entities, or ``None`` when nothing matches so callers fall back to a
+    global search.
+    """
+
+    def __init__(self, aliases, entity_rows):
+        self.entity_rows = entity_rows
+        self.matcher = AhoCorasick({alias: frozenset(entities) for alias, entities in aliases.items()})
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, aliases=None):
+        aliases = aliases if aliases is not None else entity_aliases()
+        entity_rows = defaultdict(list)
+        for row in range(vectorstore.index.ntotal):
+            metadata = document_for_row(vectorstore, row).metadata
+            for field in ROW_FIELDS:
+                for value in str(metadata.get(field) or "").split(", "):
+                    if value:
+                        entity_rows[value].append(row)
+        return cls(aliases, dict(entity_rows))
+
+    def tag(self, query):
+        """Return the canonical entities mentioned in ``query``, longest matches first."""
+        matches = sorted(self.matcher.find(query), key=lambda m: (m[0], -(m[1] - m[0])))
+        entities = []
+        covered_until = -1
+        for start, end, payload in matches:
+            # Skip aliases nested inside a longer match ("Shogun" in "Raiden Shogun")
+            if start < covered_until:
+                continue
+            covered_until = end
+            entities.extend(e for e in sorted(payload) if e not in entities)
+        return entities
+
+    def route(self, query):
+        rows = set()
+        for entity in self.tag(query):
+            rows.update(self.entity_rows.get(entity, ()))
+        return sorted(rows) if rows else None
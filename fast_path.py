@@ -0,0 +1,195 @@
+import re
+from collections import defaultdict
+
+from document_builder import CHARACTERS_FILE, iter_json_entries
+from entity_router import AhoCorasick
+
+ELEMENTS = ["Anemo", "Geo", "Electro", "Dendro", "Hydro", "Pyro", "Cryo"]
+WEAPONS = ["Sword", "Claymore", "Polearm", "Bow", "Catalyst"]
+# Every nation of Teyvat, including those with no characters in characters.json yet
+REGIONS = ["Mondstadt", "Liyue", "Inazuma", "Sumeru", "Fontaine", "Natlan", "Snezhnaya", "Khaenri'ah", "Celestia"]
+
+# Attribute questions: (column, keyword patterns that ask for it, label used in the answer).
+# Patterns are matched on word boundaries, so "born" doesn't match "stubborn"
+ATTRIBUTES = [
+    ("birthday", ("birthday", "born", "birth ?date"), "birthday"),
+    ("weapon", ("weapons?", "wields?"), "weapon"),
+    ("vision", ("vision", "element"), "Vision"),
+    ("rarity", ("rarity", "how many stars", "star rating", "[45][ -]star"), "rarity"),
+    ("constellation", ("constellation",), "constellation"),
+    # "from" alone also appears in "the Knights from Mondstadt"
+    ("region", ("region", "where is", "where does", r"where (?:is|are|does|do|was) .+ from"), "region"),
+    ("affiliation", ("affiliation", "affiliated", "works? for", "member of"), "affiliation"),
+    ("special_dish", ("special dish", "signature dish", "dish"), "special dish"),
+    ("title", ("titles?",), "titles"),
+    ("release_version", ("released", "release", "version"), "release version"),
+    ("voice_actors", ("voice actors?", "voiced", "voice"), "voice actors"),
+]
+ATTRIBUTE_PATTERNS = [(column, re.compile(r"\b(?:" + "|".join(keywords) + r")\b")) for column, keywords, _ in ATTRIBUTES]
+
+# Questions like these need narrative context, not a table lookup
+NARRATIVE_WORDS = re.compile(r"\b(why|how(?! many)|story|lore|explain|describe|tell me about|relationship|history|who is)\b")
+# Opinions and build advice; a table lookup answers them with a confident wrong fact
+OPINION_WORDS = re.compile(r"\b(best|better|should|recommend\w*|builds?|strongest|think\w*|good)\b")
+LIST_WORDS = re.compile(r"\b(list|which|all|who are|show|every|characters?|users?)\b")
+# A region alone ("Which region is Liyue?") asks about the place; a roster needs one of these
+ROSTER_WORDS = re.compile(r"\b(who|characters?|users?|people|members?)\b")
+MAX_QUERY_WORDS = 14
+
+
+def _display(value):
+    if isinstance(value, list):
+        if value and isinstance(value[0], dict):
+            return "; ".join(", ".join(f"{lang}: {actor.strip()}" for lang, actor in v.items()) for v in value)
+        return ", ".join(str(v) for v in value)
+    if isinstance(value, str) and value.endswith("_star"):
+        return value.replace("_star", "★")
+    return str(value)
+
+
+class CharacterAttributeStore:
+    """In-memory, column-indexed view of data/characters.json.
+
+    Each row is one character. ``columns`` holds the raw values per column
+    and ``index[column][value]`` the set of rows with that (lowercased) value,
+    so filters like "Pyro bow users" are set intersections.
+    """
+
+    INDEXED = ("vision", "weapon", "rarity", "region")
+
+    def __init__(self, profiles):
+        self.names = [p["name"] for p in profiles]
+        self.columns = defaultdict(list)
+        self.index = {column: defaultdict(set) for column in self.INDEXED}
+        for row, profile in enumerate(profiles):
+            for column, _, _ in ATTRIBUTES:
+                self.columns[column].append(profile.get(column))
+            self.columns["wiki_url"].append(profile.get("wiki_url"))
+            for column in self.INDEXED:
+                values = profile.get(column)
+                for value in values if isinstance(values, list) else [values]:
+                    if value:
+                        self.index[column][str(value).lower()].add(row)
+
+        # Full names and each word of multi-word names ("Raiden", "Hu Tao"); a word shared
+        # by several rows (both "Traveller" rows) names none of them
+        aliases = {name.lower(): row for row, name in enumerate(self.names)}
+        word_rows = defaultdict(set)
+        for row, name in enumerate(self.names):
+            for word in name.split():
+                if len(word) >= 3 and not word.startswith("("):
+                    word_rows[word.lower()].add(row)
+        for word, rows in word_rows.items():
+            if len(rows) == 1 and word not in aliases:
+                aliases[word] = next(iter(rows))
+        self._names = AhoCorasick(aliases)
+        self._regions = AhoCorasick({r.lower(): r.lower() for r in REGIONS})
+
+        self._filters = AhoCorasick({
+            **{e.lower(): ("vision", e.lower()) for e in ELEMENTS},
+            **{w.lower(): ("weapon", w.lower()) for w in WEAPONS},
+            **{w.lower() + "s": ("weapon", w.lower()) for w in WEAPONS},
+            **{r: ("region", r) for r in self.index["region"]},
+            "5 star": ("rarity", "5_star"), "5-star": ("rarity", "5_star"), "five star": ("rarity", "5_star"),
+            "4 star": ("rarity", "4_star"), "4-star": ("rarity", "4_star"), "four star": ("rarity", "4_star"),
+        })
+
+    @classmethod
+    def from_file(cls, path=CHARACTERS_FILE):
+        return cls([entry.get("result", entry) for _, entry in iter_json_entries(path)])
+
+    def find_characters(self, text):
+        rows = []
+        for _, _, row in self._names.find(text):
+            if row not in rows:
+                rows.append(row)
+        return rows
+
+    def unknown_regions(self, text):
+        """Nations named in ``text`` that no character row belongs to."""
+        return {region for _, _, region in self._regions.find(text) if region not in self.index["region"]}
+
+    def find_filters(self, text):
+        filters = defaultdict(set)
+        for _, _, (column, value) in self._filters.find(text):
+            filters[column].add(value)
+        return filters
+
+    def filter_rows(self, filters):
+        rows = set(range(len(self.names)))
+        for column, values in filters.items():
+            matching = set()
+            for value in values:
+                matching |= self.index[column].get(value, set())
+            rows &= matching
+        return sorted(rows, key=lambda r: self.names[r])
+
+
+# ------------------------------------------
+# Query classification and answers
+# ------------------------------------------
+def classify(query, store):
+    """Return ``("attribute", rows, columns)``, ``("list", filters)`` or ``None``."""
+    text = query.lower().strip()
+    if len(text.split()) > MAX_QUERY_WORDS or NARRATIVE_WORDS.search(text) or OPINION_WORDS.search(text):
+        return None
+    # A filter or answer that skips "Sumeru" would confidently answer a different question
+    if store.unknown_regions(text):
+        return None
+
+    rows = store.find_characters(text)
+    if rows:
+        columns = [column for column, pattern in ATTRIBUTE_PATTERNS if pattern.search(text)]
+        if columns and len(rows) <= 3:
+            return ("attribute", rows, columns)
+        return None
+
+    filters = store.find_filters(text)
+    if not filters or not LIST_WORDS.search(text):
+        return None
+    if set(filters) == {"region"} and not ROSTER_WORDS.search(text):
+        return None
+    return ("list", filters)
+
+
+def answer_attribute(store, rows, columns):
+    lines = []
+    for row in rows:
+        name = store.names[row]
+        facts = []
+        for column in columns:
+            label = next(label for c, _, label in ATTRIBUTES if c == column)
+            value = store.columns[column][row]
+            if value and value != "None":
+                facts.append(f"- **{label.capitalize()}:** {_display(value)}")
+        if not facts:
+            return None
+        lines.append(f"### {name}\n" + "\n".join(facts))
+    return "\n\n".join(lines)
+
+
+def answer_list(store, filters):
+    rows = store.filter_rows(filters)
+    if not rows:
+        # characters.json lags behind the wiki; let the RAG chain try instead
+        return None
+    described = " ".join(
+        ", ".join(_display(v).title() if c != "rarity" else _display(v) for v in sorted(values))
+        for c, values in sorted(filters.items(), key=lambda item: ("rarity", "region", "vision", "weapon").index(item[0]))
+    )
+    items = "\n".join(
+        f"- **{store.names[r]}** — {_display(store.columns['vision'][r])}, {_display(store.columns['weapon'][r])}, "
+        f"{_display(store.columns['rarity'][r])}"
+        for r in rows
+    )
+    return f"## {described} characters\n{items}"
+
+
+def answer(query, store):
+    """Answer a factual character question directly, or return ``None`` to use the RAG chain."""
+    route = classify(query, store)
+    if route is None:
+        return None
+    if route[0] == "attribute":
+        return answer_attribute(store, route[1], route[2])
+    return answer_list(store, route[1])
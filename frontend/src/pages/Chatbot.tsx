@@ -1,8 +1,10 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { Send } from 'lucide-react';
 import ReactMarkdown from 'react-markdown';
+import { useUser } from '@clerk/clerk-react';
 
 export default function Chatbot() {
+  const { user } = useUser();
   const [message, setMessage] = useState('');
   const [chat, setChat] = useState<{ type: 'user' | 'bot'; content: string }[]>([]);
   const [sessionId, setSessionId] = useState<string | null>(null);
@@ -44,7 +46,8 @@ export default function Chatbot() {
         },
         body: JSON.stringify({
           message: userInput,
-          session_id: sessionId
+          session_id: sessionId,
+          user_id: user?.id
         }),
       });
       
@@ -0,0 +1,325 @@
+import os
+import re
+import json
+import time
+import argparse
+from collections import Counter
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from ann_index import search_parameters
+from docstore import MmapDocstore
+from metrics import stage
+
+BM25_FILE = "bm25.npz"
+BM25_VOCAB_FILE = "bm25_vocab.json"
+
+# Rank constant from the original RRF paper; higher values flatten the fusion
+RRF_K = 60
+
+# Postings scored between two checks of the lexical time budget, so a very
+# common term can't run far past it
+POSTINGS_BLOCK = 16384
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+# ------------------------------------------
+# BM25 inverted index
+# ------------------------------------------
+class BM25Index:
+    """Okapi BM25 over the same rows as the FAISS index.
+
+    Postings are stored CSR-style: for term ``t`` the matching rows and term
+    frequencies are ``rows[starts[t]:starts[t + 1]]`` and ``tfs[...]``. Each
+    term's rows are in ascending order.
+    """
+
+    def __init__(self, vocab, starts, rows, tfs, doc_lengths, k1=1.5, b=0.75):
+        self.vocab = vocab
+        self.starts = starts
+        self.rows = rows
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.num_docs = len(doc_lengths)
+        self.avg_length = float(doc_lengths.mean()) if self.num_docs else 0.0
+        doc_freq = np.diff(starts).astype(np.float64)
+        self.idf = np.log(1 + (self.num_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        # Precomputed per-row length normalization term of the BM25 denominator
+        self._norm = (k1 * (1 - b + b * doc_lengths / max(self.avg_length, 1e-9))).astype(np.float32)
+
+    @classmethod
+    def build(cls, texts):
+        vocab = {}
+        postings = []
+        doc_lengths = []
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_id = vocab.setdefault(term, len(vocab))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((row, tf))
+
+        starts = np.zeros(len(vocab) + 1, dtype=np.uint32)
+        starts[1:] = np.cumsum([len(p) for p in postings])
+        rows = np.fromiter((row for p in postings for row, _ in p), dtype=np.uint32, count=int(starts[-1]))
+        tfs = np.fromiter((tf for p in postings for _, tf in p), dtype=np.float32, count=int(starts[-1]))
+        return cls(vocab, starts, rows, tfs, np.asarray(doc_lengths, dtype=np.float32))
+
+    def save(self, index_dir):
+        np.savez(os.path.join(index_dir, BM25_FILE), starts=self.starts, rows=self.rows,
+                 tfs=self.tfs, doc_lengths=self.doc_lengths)
+        with open(os.path.join(index_dir, BM25_VOCAB_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.vocab, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, index_dir):
+        arrays = np.load(os.path.join(index_dir, BM25_FILE))
+        with open(os.path.join(index_dir, BM25_VOCAB_FILE), encoding="utf-8") as f:
+            vocab = json.load(f)
+        return cls(vocab, arrays["starts"], arrays["rows"], arrays["tfs"], arrays["doc_lengths"])
+
+    def search(self, query, k=10, budget_ms=None, allowed_rows=None):
+        """Return ``[(row, score), ...]`` for the top ``k`` rows.
+
+        Query terms are scored rarest first, in blocks of ``POSTINGS_BLOCK``
+        postings; once ``budget_ms`` is spent the rest (the most common,
+        least informative terms) is skipped. With ``allowed_rows`` only
+        those rows' postings are looked up and scored.
+        """
+        start = time.perf_counter()
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids:
+            return []
+        if allowed_rows is not None:
+            allowed_rows = np.unique(np.asarray(allowed_rows, dtype=self.rows.dtype))
+
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term_id in sorted(term_ids, key=lambda t: -self.idf[t]):
+            lo, hi = int(self.starts[term_id]), int(self.starts[term_id + 1])
+            rows = self.rows[lo:hi]
+            tf = self.tfs[lo:hi]
+            if allowed_rows is not None:
+                # Binary search the allowed rows in the sorted postings, so a routed
+                # query costs O(allowed * log postings) however common the term
+                positions = np.searchsorted(rows, allowed_rows)
+                found = positions < len(rows)
+                positions = positions[found]
+                positions = positions[rows[positions] == allowed_rows[found]]
+                rows, tf = rows[positions], tf[positions]
+            over_budget = False
+            for block in range(0, len(rows), POSTINGS_BLOCK):
+                block_rows = rows[block:block + POSTINGS_BLOCK]
+                block_tf = tf[block:block + POSTINGS_BLOCK]
+                scores[block_rows] += self.idf[term_id] * block_tf * (self.k1 + 1) / (block_tf + self._norm[block_rows])
+                over_budget = budget_ms is not None and (time.perf_counter() - start) * 1000 > budget_ms
+                if over_budget:
+                    break
+            if over_budget:
+                break
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top]
+
+
+def has_bm25_index(index_dir):
+    return os.path.exists(os.path.join(index_dir, BM25_FILE))
+
+
+def write_bm25_index(index_dir):
+    """Build the BM25 index from the mmap docstore already written to ``index_dir``."""
+    docstore = MmapDocstore(index_dir)
+    bm25 = BM25Index.build(text for _, text, _ in docstore)
+    bm25.save(index_dir)
+    return bm25
+
+
+# ------------------------------------------
+# Dense search and fusion
+# ------------------------------------------
+def dense_search(vectorstore, query_vector, k=10, allowed_rows=None):
+    """FAISS search returning ``[(row, distance), ...]``, optionally restricted to ``allowed_rows``."""
+    import faiss
+
+    query = np.asarray([query_vector], dtype=np.float32)
+    params = None
+    if allowed_rows is not None:
+        params = search_parameters(vectorstore.index, faiss.IDSelectorBatch(np.asarray(allowed_rows, dtype=np.int64)))
+    distances, rows = vectorstore.index.search(query, k, params=params)
+    return [(int(row), float(dist)) for row, dist in zip(rows[0], distances[0]) if row != -1]
+
+
+def dense_search_batch(vectorstore, query_vectors, k=10):
+    """One FAISS search for a whole matrix of queries; returns a ranked row list per query."""
+    _, rows = vectorstore.index.search(np.asarray(query_vectors, dtype=np.float32), k)
+    return [[int(row) for row in ranking if row != -1] for ranking in rows]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K, boosts=None):
+    """Fuse ranked row lists: score(row) = sum over lists of 1 / (k + rank).
+
+    ``boosts`` maps rows to an amount added to their fused score (see
+    personalization.py); rows absent from every list are never added.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            scores[row] = scores.get(row, 0.0) + 1.0 / (k + rank)
+    if boosts:
+        for row in scores:
+            scores[row] += boosts.get(row, 0.0)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def document_for_row(vectorstore, row):
+    if isinstance(vectorstore.docstore, MmapDocstore):
+        return vectorstore.docstore.document(row)
+    return vectorstore.docstore.search(vectorstore.index_to_docstore_id[row])
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense + BM25 retrieval fused with reciprocal rank fusion.
+
+    ``mode`` selects "dense", "lexical" or "hybrid". Each leg fetches
+    ``fetch_k`` candidates; the lexical leg gives up after
+    ``lexical_budget_ms`` so it can never dominate request latency. With a
+    ``router`` (see entity_router.py), queries naming known entities only
+    search those entities' chunks, unless that finds fewer than ``k``. With a ``reranker`` (see reranker.py),
+    the top ``rerank_k`` fused candidates are re-scored and the best ``k`` kept.
+    """
+
+    vectorstore: Any
+    bm25: Any = None
+    router: Any = None
+    k: int = 3
+    fetch_k: int = 20
+    mode: str = "hybrid"
+    lexical_budget_ms: Optional[float] = 20.0
+    reranker: Any = None
+    rerank_k: int = 30
+
+    @property
+    def uses_dense(self):
+        return self.mode in ("dense", "hybrid") or self.bm25 is None
+
+    @property
+    def candidates_k(self):
+        # Candidates per leg; the re-ranker needs at least rerank_k of them
+        return max(self.fetch_k, self.rerank_k) if self.reranker is not None else self.fetch_k
+
+    @property
+    def search_k(self):
+        return max(self.k, self.rerank_k) if self.reranker is not None else self.k
+
+    def _dense_ranking(self, query, query_vector, allowed_rows):
+        if query_vector is None:
+            with stage("embed"):
+                query_vector = self.vectorstore.embedding_function.embed_query(query)
+        with stage("dense_search"):
+            return [row for row, _ in dense_search(self.vectorstore, query_vector, self.candidates_k, allowed_rows)]
+
+    def _lexical_ranking(self, query, allowed_rows):
+        if self.mode not in ("lexical", "hybrid") or self.bm25 is None:
+            return None
+        with stage("lexical_search"):
+            return [row for row, _ in self.bm25.search(query, self.candidates_k, self.lexical_budget_ms, allowed_rows)]
+
+    def _fuse(self, dense_ranking, lexical_ranking, k, boosts=None):
+        rankings = [ranking for ranking in (dense_ranking, lexical_ranking) if ranking is not None]
+        if len(rankings) == 1 and not boosts:
+            return rankings[0][:k]
+        return reciprocal_rank_fusion(rankings, boosts=boosts)[:k]
+
+    def search_rows(self, query, query_vector=None, k=None, allowed_rows=None, boosts=None):
+        dense_ranking = self._dense_ranking(query, query_vector, allowed_rows) if self.uses_dense else None
+        lexical_ranking = self._lexical_ranking(query, allowed_rows)
+        if not lexical_ranking and dense_ranking is None:
+            # Lexical mode, but no query term is in the BM25 vocabulary
+            dense_ranking = self._dense_ranking(query, query_vector, allowed_rows)
+        return self._fuse(dense_ranking, lexical_ranking, k or self.k, boosts)
+
+    def search_rows_batch(self, queries, query_vectors, k=None):
+        """``search_rows`` for many queries at once, with routing applied.
+
+        Unrouted queries share a single FAISS search over the whole query
+        matrix; routed ones each need their own ID selector, so they are
+        searched one by one.
+        """
+        allowed = [self.router.route(q) if self.router is not None else None for q in queries]
+        dense = [None] * len(queries)
+        if self.uses_dense:
+            unrouted = [i for i, rows in enumerate(allowed) if rows is None]
+            if unrouted:
+                rankings = dense_search_batch(self.vectorstore, [query_vectors[i] for i in unrouted], self.candidates_k)
+                for i, ranking in zip(unrouted, rankings):
+                    dense[i] = ranking
+            for i, rows in enumerate(allowed):
+                if rows is not None:
+                    dense[i] = [row for row, _ in dense_search(self.vectorstore, query_vectors[i], self.candidates_k,
+                                                               rows)]
+        results = []
+        for i, query in enumerate(queries):
+            lexical = self._lexical_ranking(query, allowed[i])
+            if not lexical and dense[i] is None:
+                dense[i] = self._dense_ranking(query, query_vectors[i], allowed[i])
+            rows = self._fuse(dense[i], lexical, k or self.k)
+            if allowed[i] is not None and len(rows) < (k or self.k):
+                rows = self.search_rows(query, query_vectors[i], k)
+            results.append(rows)
+        return results
+
+    def _documents(self, query, rows, k, prefetched=None):
+        with stage("docstore"):
+            docs = [prefetched[row] if prefetched and row in prefetched else document_for_row(self.vectorstore, row)
+                    for row in rows]
+        if self.reranker is not None:
+            with stage("rerank"):
+                docs = self.reranker.rerank(query, docs, k or self.k)
+        return docs
+
+    def documents_batch(self, queries, query_vectors, k=None):
+        search_k = max(k or self.k, self.rerank_k) if self.reranker is not None else k
+        return [self._documents(query, rows, k)
+                for query, rows in zip(queries, self.search_rows_batch(queries, query_vectors, search_k))]
+
+    def retrieve(self, query, boosts=None, prefetched=None):
+        """The retriever's documents for ``query``, with ``boosts`` added to the
+        fused scores and rows in ``prefetched`` (row -> Document) served from
+        memory instead of the docstore."""
+        allowed_rows = self.router.route(query) if self.router is not None else None
+        rows = self.search_rows(query, k=self.search_k, allowed_rows=allowed_rows, boosts=boosts)
+        if allowed_rows is not None and len(rows) < self.search_k:
+            # Routing is a hard filter; a wrong or too narrow tag must not starve the answer
+            rows = self.search_rows(query, k=self.search_k, boosts=boosts)
+        return self._documents(query, rows, self.k, prefetched)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.retrieve(query)
+
+
+# ------------------------------------------
+# CLI entry point
+# ------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the BM25 index for an existing vector DB")
+    parser.add_argument("--index-dir", default="genshin_vector_db")
+    args = parser.parse_args()
+
+    bm25 = write_bm25_index(args.index_dir)
+    print(f"✅ BM25 index over {bm25.num_docs} documents ({len(bm25.vocab)} terms) written to {args.index_dir}")
@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from ann_index import (
+    EDITABLE_TYPES, INDEX_TYPES, SEARCH_PARAMS, build_faiss_index, load_index_params, write_index_params,
+)
+
+from document_builder import iter_documents
+from docstore import has_mmap_docstore, load_editable_vectorstore, save_vectorstore
+from hybrid_retrieval import write_bm25_index
+
+INDEX_DIR = "genshin_vector_db"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def chunk_hash(doc):
+    # Text and metadata both feed the hash, so a metadata fix re-embeds the chunk too
+    payload = json.dumps({"text": doc.page_content, "metadata": doc.metadata}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def load_manifest(index_dir=INDEX_DIR):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(index_dir, chunk_ids, embedding_model):
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "embedding_model": embedding_model,
+        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "chunks": sorted(chunk_ids),
+    }
+    with open(os.path.join(index_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+def resolve_index_dir(index_dir=INDEX_DIR):
+    """The version directory ``index_dir`` currently points to.
+
+    Resolve once and load every file from the result, so a swap in between
+    can't mix files of two versions.
+    """
+    return os.path.realpath(index_dir)
+
+
+def save_atomically(write, index_dir, chunk_ids, embedding_model):
+    """Write the index and manifest to a new version directory, then point ``index_dir`` at it.
+
+    ``write(path)`` writes index.faiss and the docstore into ``path``.
+    ``index_dir`` is a symlink to a sibling ``.<name>.v<timestamp>``
+    directory, and a new version is swapped in by renaming a fresh link over
+    it, which is atomic: a reader resolving ``index_dir`` always finds a
+    complete set. The previous version is kept for readers that resolved the
+    link just before the swap; older ones are removed.
+
+    A plain ``index_dir`` directory (an index built before versioning) is
+    moved aside on its first update, which leaves it missing for that one
+    rename. Where symlinks can't be created (Windows without developer mode)
+    the directory itself is swapped with two renames, and a reader in between
+    finds no index and has to retry.
+    """
+    parent = os.path.dirname(os.path.abspath(index_dir))
+    name = os.path.basename(os.path.normpath(index_dir))
+    version_dir = os.path.join(parent, f".{name}.v{time.time_ns()}")
+    link_tmp = os.path.join(parent, f".{name}.link-{os.getpid()}")
+
+    write(version_dir)
+    write_manifest(version_dir, chunk_ids, embedding_model)
+
+    if os.path.lexists(link_tmp):
+        os.remove(link_tmp)
+    try:
+        os.symlink(os.path.basename(version_dir), link_tmp, target_is_directory=True)
+    except OSError:
+        _swap_directories(version_dir, index_dir, parent, name)
+        return
+
+    previous = None
+    if os.path.islink(index_dir):
+        previous = os.path.realpath(index_dir)
+    elif os.path.isdir(index_dir):
+        previous = os.path.join(parent, f".{name}.v0")
+        shutil.rmtree(previous, ignore_errors=True)
+        os.replace(index_dir, previous)
+    os.replace(link_tmp, index_dir)
+
+    keep = {os.path.realpath(version_dir), previous}
+    for entry in os.listdir(parent):
+        path = os.path.join(parent, entry)
+        if entry.startswith(f".{name}.v") and os.path.realpath(path) not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _swap_directories(new_dir, index_dir, parent, name):
+    old_dir = os.path.join(parent, f".{name}.old-{os.getpid()}")
+    if os.path.exists(index_dir):
+        os.replace(index_dir, old_dir)
+    os.replace(new_dir, index_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def save_index_files(vectorstore, index_dir, params):
+    save_vectorstore(vectorstore, index_dir)
+    write_index_params(index_dir, params)
+    # The lexical index is rebuilt from the docstore so its rows match FAISS
+    write_bm25_index(index_dir)
+
+
+def dedupe_by_hash(documents):
+    chunks = {}
+    for doc in documents:
+        chunks.setdefault(chunk_hash(doc), doc)
+    return chunks
+
+
+def build_vectorstore(embedder, chunks, ids, index_type, overrides=None):
+    vectors = np.asarray(embedder.embed_documents([chunks[i].page_content for i in ids]), dtype=np.float32)
+    index, params = build_faiss_index(vectors, index_type, overrides)
+    docstore = InMemoryDocstore({i: chunks[i] for i in ids})
+    return FAISS(embedder, index, docstore, dict(enumerate(ids))), params
+
+
+def update_index(embedder, documents=None, index_dir=INDEX_DIR, embedding_model=EMBEDDING_MODEL, full=False,
+                 index_type=None, index_params=None):
+    """Bring the FAISS index in ``index_dir`` up to date with ``documents``.
+
+    Chunks are identified by their content hash, which is also used as the
+    docstore id. Only chunks missing from the manifest are embedded and
+    chunks that disappeared are deleted; a full rebuild happens when there is
+    no manifest, the embedding model or index type changed, the index type
+    can't be edited in place (IVF, HNSW) or ``full`` is set.
+
+    ``index_type`` defaults to the type already on disk (see ann_index.py);
+    ``index_params`` overrides its defaults, e.g. ``{"nlist": 256}``.
+
+    Returns ``(vectorstore, stats)``.
+    """
+    start = time.perf_counter()
+    chunks = dedupe_by_hash(documents if documents is not None else iter_documents())
+    manifest = load_manifest(index_dir)
+    stored_params = load_index_params(index_dir)
+    index_type = index_type or stored_params["type"]
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}")
+    overrides = dict(index_params or {})
+    if index_type == stored_params["type"]:
+        # Keep search-time tuning (nprobe, ef_search) across rebuilds
+        for name in SEARCH_PARAMS:
+            if name in stored_params:
+                overrides.setdefault(name, stored_params[name])
+
+    rebuild = (
+        full
+        or manifest is None
+        or manifest.get("version") != MANIFEST_VERSION
+        or manifest.get("embedding_model") != embedding_model
+        or not os.path.exists(os.path.join(index_dir, "index.faiss"))
+        or not has_mmap_docstore(index_dir)
+        or index_type != stored_params["type"]
+        or index_type not in EDITABLE_TYPES
+        or bool(index_params)
+    )
+
+    if rebuild:
+        ids = list(chunks)
+        vectorstore, params = build_vectorstore(embedder, chunks, ids, index_type, overrides)
+        stats = {"mode": "full", "added": len(ids), "removed": 0, "unchanged": 0}
+        save_atomically(lambda path: save_index_files(vectorstore, path, params), index_dir, ids, embedding_model)
+    else:
+        params = {**stored_params, **overrides}
+        vectorstore = load_editable_vectorstore(index_dir, embedder)
+        indexed = set(manifest["chunks"])
+        added = [i for i in chunks if i not in indexed]
+        removed = [i for i in indexed if i not in chunks]
+
+        if removed:
+            vectorstore.delete(removed)
+        if added:
+            vectorstore.add_documents([chunks[i] for i in added], ids=added)
+
+        stats = {
+            "mode": "incremental",
+            "added": len(added),
+            "removed": len(removed),
+            "unchanged": len(chunks) - len(added),
+        }
+        if added or removed:
+            save_atomically(lambda path: save_index_files(vectorstore, path, params), index_dir, list(chunks),
+                            embedding_model)
+
+    stats["index_type"] = index_type
+    stats["chunks"] = len(chunks)
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return vectorstore, stats
+
+
+# ------------------------------------------
+# CLI entry point
+# ------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally update the Genshin FAISS index")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--full", action="store_true", help="re-embed every chunk")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, help="default: the type already on disk, else flat")
+    args = parser.parse_args()
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    embedder = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    _, stats = update_index(embedder, index_dir=args.index_dir, full=args.full, index_type=args.index_type)
+    print(f"✅ {stats['mode'].title()} update of {args.index_dir}: "
+          f"+{stats['added']} / -{stats['removed']} / ={stats['unchanged']} chunks in {stats['seconds']}s")
@@ -1,14 +1,15 @@
 import os
-import json
-from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_groq import ChatGroq
-from langchain.docstore.document import Document
 from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from dotenv import load_dotenv
+from document_builder import iter_documents
+from incremental_index import update_index
+from hybrid_retrieval import BM25Index, HybridRetriever, has_bm25_index
+from entity_router import EntityRouter
+from reranker import create_reranker
 
 load_dotenv()
 
@@ -29,50 +30,31 @@ groq_llm = ChatGroq(
 
 
 def load_documents():
-    files = [
-        "data/character_lore.json",
-        "data/wiki_sections.json",
-        "data/characters.json",
-        "data/lore.json"
-    ]
-    docs = []
-
-    for file in files:
-        try:
-            with open(file, encoding="utf-8") as f:
-                data = json.load(f)
-            
-            # Convert the JSON data to a string representation
-            if isinstance(data, dict) or isinstance(data, list):
-                # Process dictionary or list
-                content = json.dumps(data, ensure_ascii=False, indent=2)
-                docs.append(Document(page_content=content, metadata={}))
-            else:
-                # Handle primitive values
-                docs.append(Document(page_content=str(data), metadata={}))
-                
-        except Exception as e:
-            print(f"Error loading {file}: {e}")
-    
-    return docs
+    # One clean-text document per entity section, with name/region/vision/url metadata.
+    # Lazy: records stream from data/corpus/ (see corpus.py) as the indexer consumes them
+    return iter_documents()
+
 # ------------------------------------------
-# STEP 2: Chunking and Embedding
+# STEP 2: Embedding
 # ------------------------------------------
 def create_vector_store(docs):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150)
-    chunks = splitter.split_documents(docs)
-
     embedder = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    vectordb = FAISS.from_documents(chunks, embedder)
-    vectordb.save_local("genshin_vector_db")
+    # Only new or changed chunks are embedded; see incremental_index.py
+    vectordb, stats = update_index(embedder, docs, index_dir="genshin_vector_db")
+    print(f"✅ Vector DB ready ({stats['mode']}): +{stats['added']} / -{stats['removed']} chunks")
     return vectordb
 
 # ------------------------------------------
 # STEP 3: Setup Modern RAG Chain
 # ------------------------------------------
 def setup_modern_rag_chain(vectorstore, groq_llm):
-    # Create a retriever
-    retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 5})
+    # Create a retriever that fuses dense and BM25 results, restricted to the
+    # chunks of any character or place named in the question; RERANKER=auto
+    # re-scores the top 30 candidates (see reranker.py)
+    bm25 = BM25Index.load("genshin_vector_db") if has_bm25_index("genshin_vector_db") else None
+    router = EntityRouter.from_vectorstore(vectorstore)
+    reranker = create_reranker(os.getenv("RERANKER", "off"), budget_ms=float(os.getenv("RERANK_BUDGET_MS", "150")))
+    retriever = HybridRetriever(vectorstore=vectorstore, bm25=bm25, router=router, k=5, reranker=reranker)
     
     # Define the system prompt
     system_template = """You are Akasha, a helpful and intelligent AI from Sumeru.
@@ -151,14 +133,8 @@ def chat_with_akasha(vectorstore, groq_llm):
 # ENTRY POINT
 # ------------------------------------------
 if __name__ == "__main__":
-    if not os.path.exists("genshin_vector_db"):
-        print("📦 Vector DB not found. Creating it from JSON data...")
-        documents = load_documents()
-        vectorstore = create_vector_store(documents)
-    else:
-        print("✅ Vector DB found. Loading from disk...")
-        embedder = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        # Adding the allow_dangerous_deserialization flag to fix the loading issue
-        vectorstore = FAISS.load_local("genshin_vector_db", embeddings=embedder, allow_dangerous_deserialization=True)
+    print("📦 Syncing vector DB with JSON data...")
+    documents = load_documents()
+    vectorstore = create_vector_store(documents)
 
     chat_with_akasha(vectorstore, groq_llm)
\ No newline at end of file
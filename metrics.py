@@ -0,0 +1,449 @@
+import os
+import time
+import uuid
+import bisect
+import threading
+import contextvars
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from conversation_context import count_tokens
+
+# Set METRICS=0 to turn every stage timer into a no-op
+ENABLED = os.getenv("METRICS", "1") == "1"
+
+# Seconds; from a cache lookup (~0.1 ms) up to a long Groq answer
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ------------------------------------------
+# Metric types
+# ------------------------------------------
+class Metric:
+    """A named metric with optional labels, rendered in the Prometheus text format.
+
+    ``labels(*values)`` returns the child for one label combination; keep a
+    reference to it on hot paths to skip the lookup. Counters and gauges can
+    instead be backed by ``function``, called at scrape time, which returns a
+    number or ``{label values tuple: number}``; that costs nothing per request.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), function=None, registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self):
+        if self.function is None:
+            for values, child in list(self._children.items()):
+                yield from child.samples(self.name, self.labelnames, values)
+            return
+        result = self.function()
+        if not isinstance(result, dict):
+            result = {(): result}
+        for values, value in result.items():
+            if value is not None:
+                yield self.name, _format_labels(self.labelnames, values), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        try:
+            lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in self._samples()]
+        except Exception as e:
+            # A component that isn't initialized yet (e.g. the index during startup)
+            lines.append(f"# {self.name} unavailable: {e.__class__.__name__}")
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def samples(self, name, labelnames, values):
+        yield name, _format_labels(labelnames, values), self.value
+
+
+class _CounterChild(_Value):
+    __slots__ = ()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class _GaugeChild(_Value):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # Per-bucket (not cumulative) counts; the last slot is +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def samples(self, name, labelnames, values):
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), counts):
+            cumulative += count
+            yield f"{name}_bucket", _format_labels(labelnames, values, f'le="{_format_value(float(bound))}"'), cumulative
+        yield f"{name}_sum", _format_labels(labelnames, values), total
+        yield f"{name}_count", _format_labels(labelnames, values), cumulative
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry=registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = Histogram("akasha_stage_seconds", "Time spent in each pipeline stage", ("stage",))
+STAGE_ERRORS = Counter("akasha_stage_errors_total", "Exceptions raised inside a pipeline stage", ("stage",))
+STARTUP_SECONDS = Gauge("akasha_startup_phase_seconds", "Duration of each startup phase", ("phase",))
+REQUEST_SECONDS = Histogram("akasha_http_request_seconds", "HTTP request duration, including streamed bodies",
+                            ("method", "handler", "status"))
+LLM_TOKENS = Counter("akasha_llm_tokens_total", "Tokens sent to (in) and generated by (out) each LLM",
+                     ("model", "direction"))
+SLOW_REQUESTS = Counter("akasha_slow_requests_total", "Requests slower than SLOW_REQUEST_MS", ("handler",))
+
+
+# ------------------------------------------
+# Per-request traces and stage timers
+# ------------------------------------------
+class Trace:
+    """The stages one request went through, for the slow-request log."""
+
+    __slots__ = ("trace_id", "start", "stages")
+
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.start = time.perf_counter()
+        self.stages = []
+
+    def summary(self):
+        return ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.stages)
+
+
+_current_trace = contextvars.ContextVar("akasha_trace", default=None)
+
+
+def current_trace_id():
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+def record_stage(name, seconds, trace=None):
+    """Record a stage timed elsewhere (e.g. by an LLM callback)."""
+    STAGE_SECONDS.labels(name).observe(seconds)
+    trace = trace or _current_trace.get()
+    if trace is not None:
+        trace.stages.append((name, seconds))
+
+
+class _Stage:
+    __slots__ = ("histogram", "name", "start")
+
+    def __init__(self, name, histogram):
+        self.name = name
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        self.histogram.observe(seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.stages.append((self.name, seconds))
+        if exc_type is not None:
+            STAGE_ERRORS.labels(self.name).inc()
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+# stage name -> its akasha_stage_seconds child, skipping the label lookup
+_stage_histograms = {}
+
+
+def stage(name):
+    """``with stage("embed"): ...`` times the block into ``akasha_stage_seconds``
+    and the current request's trace."""
+    if not ENABLED:
+        return _NO_STAGE
+    histogram = _stage_histograms.get(name)
+    if histogram is None:
+        histogram = _stage_histograms[name] = STAGE_SECONDS.labels(name)
+    return _Stage(name, histogram)
+
+
+def set_enabled(enabled):
+    global ENABLED
+    ENABLED = enabled
+
+
+_startup_phases = []
+
+
+def record_startup_phase(name, seconds):
+    STARTUP_SECONDS.labels(name).set(seconds)
+    _startup_phases.append((name, seconds))
+
+
+class startup_phase:
+    """``with startup_phase("vectorstore"): ...`` records how long a startup step took."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record_startup_phase(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def startup_summary():
+    return ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in _startup_phases)
+
+
+# ------------------------------------------
+# LLM calls
+# ------------------------------------------
+class LLMMetricsHandler(BaseCallbackHandler):
+    """LangChain callback timing each call of one model as stage ``stage``
+    (plus ``<stage>_first_token`` when streaming) and counting its tokens.
+
+    Token counts come from the provider's usage report; when there is none,
+    the prompt and answer are estimated like conversation_context does.
+    """
+
+    # Called directly on the event loop instead of through a thread pool
+    run_inline = True
+
+    def __init__(self, stage, model):
+        self.stage = stage
+        self.model = model
+        self.tokens_in = LLM_TOKENS.labels(model, "in")
+        self.tokens_out = LLM_TOKENS.labels(model, "out")
+        # run_id -> [start, first token seen, estimated prompt tokens, trace]
+        self._runs = {}
+
+    def _start(self, run_id, text):
+        self._runs[run_id] = [time.perf_counter(), False, count_tokens(text), _current_trace.get()]
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "".join(prompts))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "".join(str(m.content) for batch in messages for m in batch))
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None and not run[1] and token:
+            run[1] = True
+            record_stage(f"{self.stage}_first_token", time.perf_counter() - run[0], run[3])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        record_stage(self.stage, time.perf_counter() - run[0], run[3])
+        tokens_in = tokens_out = 0
+        reported = False
+        for generation in (response.generations[0] if response.generations else []):
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                reported = True
+                tokens_in += usage.get("input_tokens", 0)
+                tokens_out += usage.get("output_tokens", 0)
+            else:
+                tokens_out += count_tokens(generation.text)
+        if not reported:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            tokens_in = usage.get("prompt_tokens") or run[2]
+            tokens_out = usage.get("completion_tokens") or tokens_out
+        self.tokens_in.inc(tokens_in)
+        self.tokens_out.inc(tokens_out)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            record_stage(self.stage, time.perf_counter() - run[0], run[3])
+        STAGE_ERRORS.labels(self.stage).inc()
+
+
+# ------------------------------------------
+# ASGI middleware: request latency, trace ids and the slow-request log
+# ------------------------------------------
+class MetricsMiddleware:
+    """Times every HTTP request (streamed bodies included) and, with
+    ``tracing``, gives it a trace id that its stages are recorded under.
+
+    The id is taken from an incoming ``X-Request-ID`` header when present and
+    returned as ``X-Trace-Id``. Requests slower than ``slow_ms`` are logged
+    with their per-stage breakdown.
+    """
+
+    def __init__(self, app, tracing=True, slow_ms=2000.0):
+        self.app = app
+        self.tracing = tracing
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        trace = token = None
+        if self.tracing:
+            request_id = dict(scope.get("headers") or ()).get(b"x-request-id", b"").decode("latin-1")[:64]
+            trace = Trace(request_id or None)
+            token = _current_trace.set(trace)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_trace(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trace is not None:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-trace-id", trace.trace_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            elapsed = time.perf_counter() - start
+            endpoint = scope.get("endpoint")
+            handler = getattr(endpoint, "__name__", "none")
+            REQUEST_SECONDS.labels(scope["method"], handler, str(status)).observe(elapsed)
+            if token is not None:
+                _current_trace.reset(token)
+            if self.slow_ms is not None and elapsed * 1000 > self.slow_ms:
+                SLOW_REQUESTS.labels(handler).inc()
+                breakdown = f": {trace.summary()}" if trace is not None and trace.stages else ""
+                trace_id = f" [{trace.trace_id}]" if trace is not None else ""
+                print(f"🐢 Slow request{trace_id} {scope['method']} {scope['path']} "
+                      f"{elapsed * 1000:.0f} ms{breakdown}")
@@ -0,0 +1,174 @@
+import threading
+from collections import OrderedDict, defaultdict
+
+from hybrid_retrieval import RRF_K, document_for_row
+from query_embeddings import normalize_query
+
+# Added to a chunk's fused score (reciprocal-rank units) when it matches the
+# user; a character match is worth what separates ranks 1 and 21 of one
+# ranking. Strong enough to lift the user's chunks on open-ended questions,
+# too weak to push them past the page a specific question asks about
+CHARACTER_BOOST = 1 / (RRF_K + 1) - 1 / (RRF_K + 21)
+REGION_BOOST = CHARACTER_BOOST / 2
+ELEMENT_BOOST = CHARACTER_BOOST / 2
+
+# Metadata fields the preferences are matched against
+FIELDS = ("name", "region", "vision")
+
+
+class PreferenceIndex:
+    """Chunk rows by metadata value: ``rows("region", "Inazuma")``.
+
+    Built with one pass over the docstore, like the entity router; a chunk
+    with ``region: "Mondstadt, Khaenri'ah"`` is listed under both regions.
+    """
+
+    def __init__(self, field_rows):
+        self.field_rows = field_rows
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        field_rows = {field: defaultdict(list) for field in FIELDS}
+        for row in range(vectorstore.index.ntotal):
+            metadata = document_for_row(vectorstore, row).metadata
+            for field in FIELDS:
+                for value in str(metadata.get(field) or "").split(", "):
+                    if value:
+                        field_rows[field][value.lower()].append(row)
+        return cls({field: dict(rows) for field, rows in field_rows.items()})
+
+    def rows(self, field, value):
+        return self.field_rows[field].get((value or "").strip().lower(), [])
+
+
+class UserProfile:
+    """What retrieval needs to know about one version of a user's preferences."""
+
+    __slots__ = ("version", "boosts", "prefetched", "prefetched_ids")
+
+    def __init__(self, version, boosts, prefetched):
+        self.version = version
+        # row -> amount added to its fused score
+        self.boosts = boosts
+        # row -> Document, loaded ahead of time for the user's own characters
+        self.prefetched = prefetched
+        self.prefetched_ids = {id(doc) for doc in prefetched.values()}
+
+
+class Personalizer:
+    """Biases retrieval towards the characters, region and element a user saved.
+
+    Preferences come from ``store`` (see preferences_store.py) together with
+    their version. Each (user, version) gets a profile: the rows whose
+    metadata matches the user, with a score boost each, and the documents of
+    the user's characters, prefetched so they are never read from the
+    docstore again. Retrieval results are cached per (user, version,
+    normalized query). Saving new preferences bumps the version, so stale
+    profiles and results are simply never looked up again and age out of
+    their LRUs.
+    """
+
+    def __init__(self, index, store, router=None, max_prefetch=256, profile_entries=1024, result_entries=4096,
+                 character_boost=CHARACTER_BOOST, region_boost=REGION_BOOST, element_boost=ELEMENT_BOOST):
+        self.index = index
+        self.store = store
+        self.router = router
+        self.max_prefetch = max_prefetch
+        self.profile_entries = profile_entries
+        self.result_entries = result_entries
+        self.character_boost = character_boost
+        self.region_boost = region_boost
+        self.element_boost = element_boost
+        self._profiles = OrderedDict()
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prefetch_hits = 0
+        self.profiles_built = 0
+
+    def _characters(self, preferences):
+        names = [preferences.get("favoriteCharacter")] + list(preferences.get("mainTeam") or [])
+        characters = []
+        for name in filter(None, names):
+            # Profile chunks use short names ("Kazuha"), wiki chunks the full ones the
+            # router resolves them to ("Kaedehara Kazuha")
+            canonical = self.router.tag(name) if self.router is not None else []
+            for character in [name] + canonical:
+                if character not in characters:
+                    characters.append(character)
+        return characters
+
+    def _build(self, preferences, version, vectorstore):
+        boosts = {}
+        character_rows = []
+        for character in self._characters(preferences):
+            for row in self.index.rows("name", character):
+                boosts[row] = boosts.get(row, 0.0) + self.character_boost
+                character_rows.append(row)
+        for row in self.index.rows("region", preferences.get("favoriteRegion")):
+            boosts[row] = boosts.get(row, 0.0) + self.region_boost
+        for row in self.index.rows("vision", preferences.get("preferredElement")):
+            boosts[row] = boosts.get(row, 0.0) + self.element_boost
+        prefetched = {row: document_for_row(vectorstore, row) for row in character_rows[:self.max_prefetch]}
+        return UserProfile(version, boosts, prefetched)
+
+    def profile(self, user_id, vectorstore):
+        """The user's current profile, or None if they have no saved preferences."""
+        preferences, version = self.store.get_versioned(user_id)
+        if preferences is None:
+            return None
+        key = (user_id, version)
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is not None:
+                self._profiles.move_to_end(key)
+                return profile
+        profile = self._build(preferences, version, vectorstore)
+        with self._lock:
+            self._profiles[key] = profile
+            self.profiles_built += 1
+            while len(self._profiles) > self.profile_entries:
+                self._profiles.popitem(last=False)
+        return profile
+
+    def retrieve(self, retriever, query, user_id=None):
+        """``retriever``'s documents for ``query``, personalized when ``user_id`` has preferences."""
+        profile = self.profile(user_id, retriever.vectorstore) if user_id else None
+        if profile is None:
+            return retriever.invoke(query)
+
+        key = (user_id, profile.version, normalize_query(query))
+        with self._lock:
+            docs = self._results.get(key)
+            if docs is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return list(docs)
+            self.misses += 1
+
+        docs = retriever.retrieve(query, profile.boosts, profile.prefetched)
+        with self._lock:
+            self.prefetch_hits += sum(id(doc) in profile.prefetched_ids for doc in docs)
+            self._results[key] = docs
+            while len(self._results) > self.result_entries:
+                self._results.popitem(last=False)
+        return list(docs)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+            self._results.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "profiles": len(self._profiles),
+                "profiles_built": self.profiles_built,
+                "results": len(self._results),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "prefetch_hits": self.prefetch_hits,
+            }
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from collections import OrderedDict
+
+PREFERENCES_DB = "data/user_preferences.db"
+LEGACY_PREFERENCES_JSON = "data/user_preferences.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS preferences (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class PreferencesStore:
+    """User preferences in SQLite (WAL), one row per user, with an LRU read cache.
+
+    A save is a single upsert of that user's row, so its cost doesn't grow
+    with the number of users. WAL lets readers proceed during a write. Every
+    uvicorn worker can open the same file. Each row carries a ``version`` that
+    is bumped on every save.
+
+    Reads are served from an in-process cache of ``cache_entries`` users.
+    The cache is dropped whenever ``PRAGMA data_version`` shows that another
+    connection has committed, so a worker never serves preferences that a
+    different worker has since overwritten.
+    """
+
+    def __init__(self, path=PREFERENCES_DB, cache_entries=10_000):
+        self.path = path
+        self.cache_entries = cache_entries
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # user_id -> (preferences or None, version)
+        self._cache = OrderedDict()
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_data_version(self):
+        # data_version only changes when a *different* connection commits
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._cache.clear()
+            self.invalidations += 1
+
+    def _remember(self, user_id, entry):
+        self._cache[user_id] = entry
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+
+    def get_versioned(self, user_id):
+        """``(preferences, version)`` for ``user_id``; ``(None, 0)`` if none are saved."""
+        with self._lock:
+            self._check_data_version()
+            entry = self._cache.get(user_id)
+            if entry is not None:
+                self._cache.move_to_end(user_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            row = self._conn.execute("SELECT data, version FROM preferences WHERE user_id = ?",
+                                     (user_id,)).fetchone()
+            entry = (json.loads(row[0]), row[1]) if row else (None, 0)
+            self._remember(user_id, entry)
+            return entry
+
+    def get(self, user_id):
+        return self.get_versioned(user_id)[0]
+
+    def put(self, user_id, preferences):
+        """Insert or replace ``user_id``'s preferences; returns the new version."""
+        data = json.dumps(preferences, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            version = self._conn.execute(
+                "INSERT INTO preferences (user_id, data, version, updated_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET data = excluded.data, version = version + 1, "
+                "updated_at = excluded.updated_at RETURNING version",
+                (user_id, data, time.time()),
+            ).fetchone()[0]
+            # Our own commits don't move data_version; keep the cache in step by hand
+            self._remember(user_id, (json.loads(data), version))
+        return version
+
+    def delete(self, user_id):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM preferences WHERE user_id = ?", (user_id,))
+            self._cache.pop(user_id, None)
+        return cursor.rowcount > 0
+
+    # ------------------------------------------
+    # Migration from the old JSON file
+    # ------------------------------------------
+    def migrate_json(self, path=LEGACY_PREFERENCES_JSON):
+        """Import the old ``{user_id: preferences}`` file once; returns the number of users imported.
+
+        Runs in one write transaction, so concurrently starting workers import
+        it exactly once. Users already in the database keep their newer rows.
+        The JSON file is left in place.
+        """
+        if not os.path.exists(path):
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone():
+                    self._conn.execute("COMMIT")
+                    return 0
+                with open(path, encoding="utf-8") as f:
+                    legacy = json.load(f)
+                now = time.time()
+                cursor = self._conn.executemany(
+                    "INSERT OR IGNORE INTO preferences (user_id, data, version, updated_at) VALUES (?, ?, 1, ?)",
+                    [(user_id, json.dumps(prefs, ensure_ascii=False, separators=(",", ":")), now)
+                     for user_id, prefs in legacy.items()],
+                )
+                self._conn.execute("INSERT INTO meta VALUES ('migrated_json', ?)", (os.path.abspath(path),))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._cache.clear()
+        return cursor.rowcount
+
+    def items(self):
+        """Every ``(user_id, preferences)`` pair, by user id."""
+        with self._lock:
+            rows = self._conn.execute("SELECT user_id, data FROM preferences ORDER BY user_id").fetchall()
+        return [(user_id, json.loads(data)) for user_id, data in rows]
+
+    def stats(self):
+        with self._lock:
+            users = self._conn.execute("SELECT COUNT(*) FROM preferences").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "users": users,
+                "cached": len(self._cache),
+                "cache_entries": self.cache_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    def close(self):
+        self._conn.close()
+
+
+# ------------------------------------------
+# CLI entry point
+# ------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate user preferences from JSON to SQLite, or show stats")
+    parser.add_argument("--db", default=PREFERENCES_DB)
+    parser.add_argument("--json", default=LEGACY_PREFERENCES_JSON, help="old preferences file to import")
+    parser.add_argument("--export", help="write every user's preferences to this JSON file")
+    args = parser.parse_args()
+
+    store = PreferencesStore(args.db)
+    imported = store.migrate_json(args.json)
+    print(f"✅ Imported {imported} users from {args.json}" if imported else f"ℹ️ Nothing to import from {args.json}")
+    if args.export:
+        with open(args.export, "w", encoding="utf-8") as f:
+            json.dump(dict(store.items()), f, indent=2, ensure_ascii=False)
+        print(f"📤 Exported preferences to {args.export}")
+    print(json.dumps(store.stats(), indent=2))
@@ -0,0 +1,157 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Representative questions of different lengths; the first real request
+# shouldn't be the one paying for lazy model and tokenizer initialization
+WARM_UP_QUERIES = [
+    "Who is Zhongli?",
+    "What weapon does Xiao use?",
+    "Tell me about the history of Khaenri'ah and what happened to it 500 years ago.",
+    "How is the Raiden Shogun connected to Ei, Makoto and the Vision Hunt Decree in Inazuma?",
+]
+
+
+def normalize_query(text):
+    # all-MiniLM-L6-v2 is uncased and splits on whitespace, so this never
+    # changes the embedding; it only lets "Who is Xiao" share "who is  xiao"
+    return " ".join(text.lower().split())
+
+
+# Query-side encoder backends. "onnx" runs one of the ONNX exports published
+# with the model (int8-quantized by default) through onnxruntime, which needs
+# `pip install "optimum[onnxruntime]"`; documents are still embedded with torch
+EMBEDDING_BACKENDS = ("torch", "onnx")
+DEFAULT_ONNX_FILE = "onnx/model_quint8_avx2.onnx"
+
+
+def load_query_embedder(model_name, backend="torch", onnx_file=DEFAULT_ONNX_FILE):
+    """The MiniLM query encoder on ``backend``; falls back to torch if ONNX can't be loaded."""
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {', '.join(EMBEDDING_BACKENDS)}")
+    # Imported here: sentence-transformers pulls in torch, which dominates import time
+    from langchain_huggingface import HuggingFaceEmbeddings
+    if backend == "onnx":
+        try:
+            return HuggingFaceEmbeddings(model_name=model_name,
+                                         model_kwargs={"backend": "onnx", "model_kwargs": {"file_name": onnx_file}})
+        except Exception as e:
+            print(f"⚠️ ONNX query encoder unavailable ({e.__class__.__name__}); using torch")
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+def set_torch_threads(threads):
+    """Cap torch intra-op threads; returns the value in effect, or None without torch."""
+    try:
+        import torch
+    except ImportError:
+        return None
+    if threads:
+        torch.set_num_threads(threads)
+    return torch.get_num_threads()
+
+
+def default_torch_threads():
+    # Split the cores between uvicorn workers so they don't oversubscribe them
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an embedder with an LRU cache of query embeddings.
+
+    Vectors live in one float32 matrix, allocated on the first miss when
+    the dimension is known. The cache evicts least-recently-used entries
+    to stay within ``max_bytes``, counting both the vectors and their
+    normalized keys. Document embedding (index builds, batches) passes
+    straight through.
+    """
+
+    def __init__(self, base, max_bytes=8 * 1024 * 1024):
+        self.base = base
+        self.max_bytes = max_bytes
+        self._vectors = None
+        # key -> slot, in LRU order
+        self._slots = OrderedDict()
+        self._free_slots = []
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _entry_bytes(self, key):
+        return self._vectors.shape[1] * 4 + len(key.encode("utf-8"))
+
+    def _allocate(self, dim):
+        rows = max(1, self.max_bytes // (dim * 4))
+        self._vectors = np.zeros((rows, dim), dtype=np.float32)
+        self._free_slots = list(range(rows - 1, -1, -1))
+
+    def embed_query_array(self, text):
+        """Return the query embedding as a float32 array (a copy, safe to keep)."""
+        key = normalize_query(text)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None:
+                self._slots.move_to_end(key)
+                self.hits += 1
+                return self._vectors[slot].copy()
+            self.misses += 1
+
+        vector = np.asarray(self.base.embed_query(text), dtype=np.float32)
+
+        with self._lock:
+            if self._vectors is None:
+                self._allocate(vector.shape[0])
+            if key not in self._slots:
+                size = self._entry_bytes(key)
+                while self._slots and (not self._free_slots or self._bytes + size > self.max_bytes):
+                    old_key, old_slot = self._slots.popitem(last=False)
+                    self._free_slots.append(old_slot)
+                    self._bytes -= self._entry_bytes(old_key)
+                    self.evictions += 1
+                if self._free_slots and size <= self.max_bytes:
+                    slot = self._free_slots.pop()
+                    self._vectors[slot] = vector
+                    self._slots[key] = slot
+                    self._bytes += size
+        return vector
+
+    def embed_query(self, text):
+        return self.embed_query_array(text).tolist()
+
+    def embed_documents(self, texts):
+        return self.base.embed_documents(texts)
+
+    def warm_up(self, queries=WARM_UP_QUERIES):
+        """Run the base model on a few queries, bypassing the cache. Returns the time taken in ms."""
+        start = time.perf_counter()
+        for query in queries:
+            self.base.embed_query(query)
+        self.base.embed_documents(list(queries))
+        return (time.perf_counter() - start) * 1000
+
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+            if self._vectors is not None:
+                self._free_slots = list(range(self._vectors.shape[0] - 1, -1, -1))
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._slots),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
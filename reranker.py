@@ -0,0 +1,231 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from query_embeddings import normalize_query
+
+# Small enough to score 30 candidates on CPU within the default budget
+CROSS_ENCODER_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+SCORERS = ("auto", "cross-encoder", "lexical", "off")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "do", "does", "for", "from", "had", "has",
+    "have", "how", "in", "is", "it", "its", "me", "of", "on", "or", "s", "tell", "that", "the", "their",
+    "to", "was", "what", "when", "where", "which", "who", "whom", "why", "with", "about", "his", "her",
+}
+
+
+def content_tokens(text):
+    return {t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS}
+
+
+# ------------------------------------------
+# Scorers: (query, [texts]) -> relevance scores, higher is better
+# ------------------------------------------
+class CrossEncoderScorer:
+    """A sentence-transformers cross-encoder reading each (query, chunk) pair jointly."""
+
+    name = "cross-encoder"
+
+    def __init__(self, model_name=CROSS_ENCODER_MODEL, max_length=256):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+
+    def score(self, query, texts):
+        return [float(s) for s in self.model.predict([(query, t) for t in texts], show_progress_bar=False)]
+
+
+class LexicalScorer:
+    """Model-free fallback: how much of the question a chunk covers, and
+    whether the chunk belongs to an entity the question names.
+
+    Chunks start with their ``"<name> — <section>"`` header (see
+    document_builder.py), so the header words stand in for the entity name.
+    """
+
+    name = "lexical"
+
+    def __init__(self, coverage_weight=0.6, name_weight=0.4):
+        self.coverage_weight = coverage_weight
+        self.name_weight = name_weight
+
+    def score(self, query, texts):
+        query_tokens = content_tokens(query)
+        scores = []
+        for text in texts:
+            header, _, body = text.partition("\n")
+            tokens = content_tokens(body) | content_tokens(header)
+            coverage = len(query_tokens & tokens) / len(query_tokens) if query_tokens else 0.0
+            name_tokens = content_tokens(header.split(" — ")[0])
+            named = len(name_tokens & query_tokens) / len(name_tokens) if name_tokens else 0.0
+            scores.append(self.coverage_weight * coverage + self.name_weight * named)
+        return scores
+
+
+def load_scorer(name="auto"):
+    """Cross-encoder when sentence-transformers and the model are available, else lexical."""
+    if name in ("auto", "cross-encoder"):
+        try:
+            return CrossEncoderScorer()
+        except Exception as e:
+            if name == "cross-encoder":
+                raise
+            print(f"⚠️ Cross-encoder unavailable ({e.__class__.__name__}); re-ranking with lexical features")
+    return LexicalScorer()
+
+
+# ------------------------------------------
+# Re-ranking stage
+# ------------------------------------------
+class Reranker:
+    """Re-orders over-fetched retrieval candidates and keeps the best ``k``.
+
+    Candidates are scored in batches of ``batch_size`` with ``scorer``;
+    scores are cached per (normalized query, chunk text) in an LRU of
+    ``cache_entries``. Before each batch the stage checks that the time spent
+    so far plus the batch, at the running per-pair cost, fits in
+    ``budget_ms``; if it doesn't, the candidates are returned in their
+    incoming (dense/fused) order. The per-pair cost is seeded by a warm-up
+    batch at construction, so the first request is held to the budget too.
+    Selection is MMR: ``mmr_lambda`` trades relevance against word overlap
+    with the chunks already picked, so three near-identical chunks don't
+    fill the context.
+    """
+
+    def __init__(self, scorer, budget_ms=150.0, batch_size=8, cache_entries=50_000, mmr_lambda=0.8,
+                 prior_weight=0.1):
+        self.scorer = scorer
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self.cache_entries = cache_entries
+        self.mmr_lambda = mmr_lambda
+        # Small pull towards the incoming order, to break ties between similar scores
+        self.prior_weight = prior_weight
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._pair_ms = self.warm_up()
+        self.calls = 0
+        self.fallbacks = 0
+        self.hits = 0
+        self.misses = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def warm_up(self):
+        """Run the scorer once to load it, then time one full batch; returns ms per pair."""
+        self.scorer.score("warm up", ["warm up"])
+        texts = ["Warm up — Summary\nA chunk of roughly the usual shape."] * self.batch_size
+        start = time.perf_counter()
+        self.scorer.score("warm up query", texts)
+        return (time.perf_counter() - start) * 1000 / len(texts)
+
+    @staticmethod
+    def _chunk_key(text):
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+    def _cached(self, query_key, chunk_keys):
+        with self._lock:
+            scores = []
+            for key in chunk_keys:
+                score = self._cache.get((query_key, key))
+                if score is not None:
+                    self._cache.move_to_end((query_key, key))
+                scores.append(score)
+            hits = sum(s is not None for s in scores)
+            self.hits += hits
+            self.misses += len(scores) - hits
+            return scores
+
+    def _store(self, query_key, chunk_keys, scores):
+        with self._lock:
+            for key, score in zip(chunk_keys, scores):
+                self._cache[(query_key, key)] = score
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+    def _score(self, query, texts, start):
+        """Scores for ``texts``, or None once the budget can't fit the next batch."""
+        query_key = normalize_query(query)
+        chunk_keys = [self._chunk_key(t) for t in texts]
+        scores = self._cached(query_key, chunk_keys)
+        missing = [i for i, s in enumerate(scores) if s is None]
+        for lo in range(0, len(missing), self.batch_size):
+            batch = missing[lo:lo + self.batch_size]
+            elapsed = (time.perf_counter() - start) * 1000
+            if self.budget_ms is not None and elapsed + len(batch) * self._pair_ms > self.budget_ms:
+                return None
+            batch_start = time.perf_counter()
+            batch_scores = self.scorer.score(query, [texts[i] for i in batch])
+            pair_ms = (time.perf_counter() - batch_start) * 1000 / len(batch)
+            self._pair_ms = 0.8 * self._pair_ms + 0.2 * pair_ms
+            self._store(query_key, [chunk_keys[i] for i in batch], batch_scores)
+            for i, score in zip(batch, batch_scores):
+                scores[i] = score
+        return scores
+
+    def _select(self, scores, texts, k):
+        # Min-max normalize so cross-encoder logits and lexical scores mix with the prior the same way
+        lo, hi = min(scores), max(scores)
+        span = (hi - lo) or 1.0
+        n = len(scores)
+        relevance = [(s - lo) / span + self.prior_weight * (1 - i / n) for i, s in enumerate(scores)]
+        tokens = [content_tokens(t) for t in texts]
+        selected = []
+        remaining = list(range(n))
+        while remaining and len(selected) < k:
+            def mmr(i):
+                overlap = max((len(tokens[i] & tokens[j]) / (len(tokens[i] | tokens[j]) or 1) for j in selected),
+                              default=0.0)
+                return self.mmr_lambda * relevance[i] - (1 - self.mmr_lambda) * overlap
+            best = max(remaining, key=mmr)
+            selected.append(best)
+            remaining.remove(best)
+        return selected
+
+    def rerank(self, query, docs, k):
+        """The ``k`` best of ``docs`` (ranked best first by the retriever), re-ordered."""
+        start = time.perf_counter()
+        texts = [doc.page_content for doc in docs]
+        scores = self._score(query, texts, start) if len(docs) > 1 else None
+        if scores is None:
+            result = docs[:k]
+        else:
+            result = [docs[i] for i in self._select(scores, texts, k)]
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.calls += 1
+            self.fallbacks += scores is None and len(docs) > 1
+            self.total_ms += elapsed
+            self.max_ms = max(self.max_ms, elapsed)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "scorer": self.scorer.name,
+                "budget_ms": self.budget_ms,
+                "calls": self.calls,
+                "fallbacks": self.fallbacks,
+                "avg_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+                "max_ms": round(self.max_ms, 2),
+                "cache_entries": len(self._cache),
+                "cache_hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def create_reranker(name="off", budget_ms=150.0, **kwargs):
+    """``None`` for "off"; otherwise a Reranker with the named scorer (see ``SCORERS``)."""
+    if name not in SCORERS:
+        raise ValueError(f"Unknown re-ranker {name!r}; expected one of {', '.join(SCORERS)}")
+    if name == "off":
+        return None
+    return Reranker(load_scorer(name), budget_ms=budget_ms, **kwargs)
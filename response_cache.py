@@ -0,0 +1,137 @@
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticResponseCache:
+    """Caches answers keyed on query embeddings.
+
+    A lookup returns a stored answer when the cosine similarity between the
+    incoming question and a cached one is at or above ``threshold``. Vectors
+    live in one preallocated float32 matrix so a lookup is a single
+    matrix-vector product. Entries are evicted least-recently-used first,
+    when they are older than ``ttl`` seconds, or when the total size of
+    stored vectors and answers would exceed ``max_bytes``.
+    """
+
+    def __init__(self, dim=384, threshold=0.92, ttl=3600, max_entries=1024, max_bytes=16 * 1024 * 1024):
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, got {max_entries}")
+        self.dim = dim
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._valid = np.zeros(max_entries, dtype=bool)
+        # slot -> (question, answer, created_at, size_bytes), in LRU order
+        self._entries = OrderedDict()
+        # slot -> created_at, in insertion order, so the oldest entries are at the front
+        self._created = OrderedDict()
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _normalize(self, vector):
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, slot):
+        _, _, _, size = self._entries.pop(slot)
+        del self._created[slot]
+        self._valid[slot] = False
+        self._free_slots.append(slot)
+        self._bytes -= size
+
+    def _expire(self, now):
+        # Only the front of the creation order can have expired
+        while self._created:
+            slot, created = next(iter(self._created.items()))
+            if now - created <= self.ttl:
+                break
+            self._remove(slot)
+            self.evictions += 1
+
+    def _match(self, query):
+        # The slot of the most similar cached question at or above the threshold
+        if not self._entries:
+            return None
+        scores = self._vectors @ query
+        scores[~self._valid] = -1.0
+        slot = int(np.argmax(scores))
+        return slot if scores[slot] >= self.threshold else None
+
+    def lookup(self, vector):
+        query = self._normalize(vector)
+        now = time.time()
+        with self._lock:
+            if self.ttl:
+                self._expire(now)
+            slot = self._match(query)
+            if slot is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            return self._entries[slot][1]
+
+    def put(self, vector, question, answer):
+        query = self._normalize(vector)
+        size = query.nbytes + len(question.encode("utf-8")) + len(answer.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # A near-duplicate question replaces the entry it matches instead of adding a copy
+            slot = self._match(query)
+            if slot is not None:
+                self._remove(slot)
+
+            while self._entries and (not self._free_slots or self._bytes + size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+            slot = self._free_slots.pop()
+            self._vectors[slot] = query
+            self._valid[slot] = True
+            created = time.time()
+            self._entries[slot] = (question, answer, created, size)
+            self._created[slot] = created
+            self._bytes += size
+
+    def invalidate(self):
+        # Called whenever the vector DB is rebuilt; cached answers may cite stale context
+        with self._lock:
+            self._entries.clear()
+            self._created.clear()
+            self._valid[:] = False
+            self._free_slots = list(range(self.max_entries - 1, -1, -1))
+            self._bytes = 0
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "threshold": self.threshold,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
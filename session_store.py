@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# History is capped at the last 10 exchanges (20 messages) per session
+MAX_MESSAGES = 20
+
+
+def new_session_id():
+    # Random ids never collide after deletions, unlike a counter
+    return f"session_{uuid.uuid4().hex}"
+
+
+def history_bytes(history):
+    return sum(len(role.encode("utf-8")) + len(message.encode("utf-8")) for role, message in history)
+
+
+# ------------------------------------------
+# In-memory backend
+# ------------------------------------------
+class MemorySessionStore:
+    """Conversation histories held in process memory.
+
+    Sessions are kept in an OrderedDict in last-access order, so the least
+    recently used session is always at the front: expiring idle sessions
+    (older than ``ttl`` seconds) and evicting for the ``max_bytes`` budget
+    only ever pop from the front, which is O(1) per evicted session.
+    """
+
+    def __init__(self, ttl=6 * 3600, max_bytes=64 * 1024 * 1024, max_messages=MAX_MESSAGES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        # session_id -> [history, last_access, size_bytes]
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _pop(self, session_id):
+        _, _, size = self._sessions.pop(session_id)
+        self._bytes -= size
+
+    def _expire(self, now):
+        while self._sessions:
+            session_id, (_, last_access, _) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl:
+                break
+            self._pop(session_id)
+            self.expirations += 1
+
+    def get(self, session_id):
+        """Return a copy of the session's history, or ``None`` if it doesn't exist."""
+        now = time.time()
+        with self._lock:
+            if self.ttl:
+                self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            entry[1] = now
+            self._sessions.move_to_end(session_id)
+            return list(entry[0])
+
+    def append(self, session_id, *messages):
+        """Append ``(role, message)`` pairs, creating the session if needed."""
+        now = time.time()
+        with self._lock:
+            if self.ttl:
+                self._expire(now)
+            entry = self._sessions.pop(session_id, None)
+            if entry is None:
+                entry = [[], now, 0]
+            history = (entry[0] + list(messages))[-self.max_messages:]
+            size = history_bytes(history)
+            self._bytes += size - entry[2]
+            self._sessions[session_id] = [history, now, size]
+
+            # Never evict the session being written to
+            while self._bytes > self.max_bytes and len(self._sessions) > 1:
+                self._pop(next(iter(self._sessions)))
+                self.evictions += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            if session_id not in self._sessions:
+                return False
+            self._pop(session_id)
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# ------------------------------------------
+# SQLite backend
+# ------------------------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    history TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access);
+CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO totals VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS sessions_insert AFTER INSERT ON sessions
+    BEGIN UPDATE totals SET bytes = bytes + NEW.size; END;
+CREATE TRIGGER IF NOT EXISTS sessions_update AFTER UPDATE OF size ON sessions
+    BEGIN UPDATE totals SET bytes = bytes + NEW.size - OLD.size; END;
+CREATE TRIGGER IF NOT EXISTS sessions_delete AFTER DELETE ON sessions
+    BEGIN UPDATE totals SET bytes = bytes - OLD.size; END;
+"""
+
+
+class SQLiteSessionStore:
+    """Conversation histories in a local SQLite file.
+
+    Every uvicorn worker opening the same file sees the same sessions, and
+    they survive restarts. The index on ``last_access`` keeps expiry and LRU
+    eviction to range scans over the oldest rows; the total history size is
+    maintained by triggers so the byte budget never needs a full scan.
+    """
+
+    def __init__(self, path="data/sessions.db", ttl=6 * 3600, max_bytes=64 * 1024 * 1024,
+                 max_messages=MAX_MESSAGES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expire(self, now):
+        cursor = self._conn.execute("DELETE FROM sessions WHERE last_access < ?", (now - self.ttl,))
+        self.expirations += cursor.rowcount
+
+    def _evict(self, keep):
+        total = self._conn.execute("SELECT bytes FROM totals").fetchone()[0]
+        while total > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT id, size FROM sessions WHERE id != ? ORDER BY last_access LIMIT 64", (keep,)
+            ).fetchall()
+            if not rows:
+                break
+            victims = []
+            for session_id, size in rows:
+                if total <= self.max_bytes:
+                    break
+                victims.append((session_id,))
+                total -= size
+            self._conn.executemany("DELETE FROM sessions WHERE id = ?", victims)
+            self.evictions += len(victims)
+
+    def get(self, session_id):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE sessions SET last_access = ? WHERE id = ? AND last_access >= ? RETURNING history",
+                (now, session_id, now - self.ttl if self.ttl else float("-inf")),
+            ).fetchone()
+        if row is None:
+            return None
+        return [tuple(message) for message in json.loads(row[0])]
+
+    def append(self, session_id, *messages):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.ttl:
+                    self._expire(now)
+                row = self._conn.execute("SELECT history FROM sessions WHERE id = ?", (session_id,)).fetchone()
+                history = json.loads(row[0]) if row else []
+                history = (history + [list(m) for m in messages])[-self.max_messages:]
+                self._conn.execute(
+                    "INSERT INTO sessions (id, history, size, last_access) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET history = excluded.history, size = excluded.size, "
+                    "last_access = excluded.last_access",
+                    (session_id, json.dumps(history, ensure_ascii=False),
+                     history_bytes(tuple(m) for m in history), now),
+                )
+                self._evict(session_id)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, session_id):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def stats(self):
+        with self._lock:
+            if self.ttl:
+                self._expire(time.time())
+            sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            total = self._conn.execute("SELECT bytes FROM totals").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "sessions": sessions,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+def create_session_store(backend="memory", path="data/sessions.db", **kwargs):
+    if backend == "memory":
+        return MemorySessionStore(**kwargs)
+    if backend == "sqlite":
+        return SQLiteSessionStore(path, **kwargs)
+    raise ValueError(f"Unknown session backend: {backend!r} (expected 'memory' or 'sqlite')")
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Tests import the top-level modules and read data/ relative to the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
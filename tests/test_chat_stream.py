@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+
+import app
+
+ANSWER = "Ad astra abyssosque, Traveler."
+
+
+class RecordingChatModel(GenericFakeChatModel):
+    """Streams ``messages`` word by word and records the session history seen at each chunk."""
+
+    session_id: str = ""
+    seen: list = []
+
+    async def _astream(self, *args, **kwargs):
+        async for chunk in super()._astream(*args, **kwargs):
+            self.seen.append(app.session_store.get(self.session_id))
+            yield chunk
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = "message", None
+        for line in block.splitlines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        events.append((event, data))
+    return events
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    llm = RecordingChatModel(messages=iter([AIMessage(content=ANSWER)]), session_id="stream_test", seen=[])
+    docs = [Document(page_content="Amber is an Outrider of the Knights of Favonius.", metadata={"name": "Amber"})]
+    chain = RunnablePassthrough.assign(docs=RunnableLambda(lambda inputs: docs)) | app.setup_answer_chain(llm)
+    # Set the globals startup would, without loading MiniLM or the index
+    monkeypatch.setattr(app, "groq_llm", llm)
+    monkeypatch.setattr(app, "vectorstore", object())
+    monkeypatch.setattr(app, "rag_chain", chain)
+    monkeypatch.setattr(app, "embedder", None)
+    monkeypatch.setattr(app, "attribute_store", None)
+    monkeypatch.setattr(app, "personalizer", None)
+    app.session_store.delete("stream_test")
+    yield llm
+    app.session_store.delete("stream_test")
+
+
+def test_stream_emits_tokens_then_done(fake_llm):
+    client = TestClient(app.app)
+    response = client.post("/api/chat/stream", json={"message": "Who is Amber?", "session_id": "stream_test"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_events(response.text)
+    tokens = [data["token"] for event, data in events if event == "message"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == ANSWER
+
+    event, done = events[-1]
+    assert event == "done"
+    assert done["session_id"] == "stream_test"
+    assert done["route"] == "rag"
+    assert done["prompt_tokens"] > 0
+    assert 0 <= done["ttft_ms"] <= done["total_ms"]
+
+
+def test_history_is_written_after_the_stream(fake_llm):
+    client = TestClient(app.app)
+    client.post("/api/chat/stream", json={"message": "Who is Amber?", "session_id": "stream_test"})
+
+    # Nothing was recorded while tokens were still being generated
+    assert fake_llm.seen and all(not history for history in fake_llm.seen)
+    assert app.session_store.get("stream_test") == [("User", "Who is Amber?"), ("Akasha", ANSWER)]
@@ -0,0 +1,63 @@
+import asyncio
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from conversation_context import ConversationContextManager, count_tokens
+
+REWRITTEN = "What is Amber's Vision?"
+
+
+def fake_llm(prompts):
+    """Answers summary prompts with a long summary and rewrite prompts with REWRITTEN."""
+
+    def invoke(prompt_value):
+        system, human = (message.content for message in prompt_value.to_messages())
+        prompts.append((system, human))
+        if system.startswith("Rewrite"):
+            return AIMessage(content=REWRITTEN)
+        return AIMessage(content="The user asked about Mondstadt. " * 200)
+
+    return RunnableLambda(invoke)
+
+
+def conversation(turns):
+    history = []
+    for i in range(turns):
+        history.append(("User", f"Question {i} about the Knights of Favonius " + "detail " * 40))
+        history.append(("Akasha", f"Answer {i} about Mondstadt " + "lore " * 80))
+    return history
+
+
+def test_history_stays_within_the_budget():
+    manager = ConversationContextManager(llm=fake_llm([]), history_budget=400)
+    question = "What happened next?"
+    result = asyncio.run(manager.build("s1", conversation(20), question))
+
+    assert result["summarized_turns"] > 0
+    assert 0 < result["history_tokens"] <= manager.history_budget
+    assert count_tokens(result["question"]) - count_tokens(question) == result["history_tokens"]
+
+
+def test_follow_up_is_rewritten_with_the_turns_leaving_the_window():
+    prompts = []
+    manager = ConversationContextManager(llm=fake_llm(prompts), history_budget=400)
+    history = [("User", "Tell me about Amber"), ("Akasha", "Amber is an Outrider of the Knights of Favonius.")]
+    history += conversation(6)
+    result = asyncio.run(manager.build("s2", history, "What is her vision?"))
+
+    assert result["query"] == REWRITTEN
+    assert "What is her vision?" in result["question"]
+    # Amber has left the verbatim window and isn't summarized yet; the rewrite still sees her
+    older, recent = manager.window(history, "What is her vision?")
+    assert history[:2] == older[:2] and all("Amber" not in message for _, message in recent)
+    rewrite_prompt = next(human for system, human in prompts if system.startswith("Rewrite"))
+    assert "Amber" in rewrite_prompt
+
+
+def test_standalone_question_is_not_rewritten():
+    prompts = []
+    manager = ConversationContextManager(llm=fake_llm(prompts))
+    result = asyncio.run(manager.build("s3", [("User", "Hi"), ("Akasha", "Hello!")], "Who is Diluc?"))
+    assert result["query"] == "Who is Diluc?"
+    assert manager.rewrite_calls == 0
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from document_builder import CHARACTERS_FILE, iter_json_entries
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("", []),
+    ("  \n", []),
+    ("[]", []),
+    ('[1, 22, 333, {"a": "b"}]', [(0, 1), (1, 22), (2, 333), (3, {"a": "b"})]),
+    ('{"k": [1, 2], "j": "v"}', [("k", [1, 2]), ("j", "v")]),
+    ("42", [(None, 42)]),
+])
+@pytest.mark.parametrize("chunk_size", [1, 3, 1 << 20])
+def test_entries_across_chunk_boundaries(tmp_path, text, expected, chunk_size):
+    path = tmp_path / "entries.json"
+    path.write_text(text, encoding="utf-8")
+    assert list(iter_json_entries(path, chunk_size)) == expected
+
+
+def test_truncated_file(tmp_path):
+    path = tmp_path / "entries.json"
+    path.write_text("[1, 2", encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_entries(path, 2))
+
+
+def test_matches_json_load():
+    with open(CHARACTERS_FILE, encoding="utf-8") as f:
+        expected = list(enumerate(json.load(f)))
+    assert list(iter_json_entries(CHARACTERS_FILE, 4096)) == expected
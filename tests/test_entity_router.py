@@ -0,0 +1,35 @@
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from entity_router import EntityRouter, entity_aliases
+from hybrid_retrieval import BM25Index, HybridRetriever
+
+
+@pytest.fixture(scope="module")
+def aliases():
+    return entity_aliases()
+
+
+def test_shared_name_words_are_not_aliases(aliases):
+    assert "kamisato" not in aliases
+    assert aliases["ayaka"] == {"Kamisato Ayaka"}
+    assert aliases["ayato"] == {"Kamisato Ayato"}
+    assert aliases["kazuha"] == {"Kaedehara Kazuha"}
+
+
+def test_narrow_route_falls_back_to_a_global_search():
+    texts = ["Amber is an Outrider.", "Amber uses a bow.", "Diluc owns a winery.", "Diluc is a pyro user.",
+             "Kaeya is the cavalry captain.", "Jean is the acting grand master."]
+    metadatas = [{"name": "Amber"}, {"name": "Amber"}, {"name": "Diluc"}, {"name": "Diluc"}, {"name": "Kaeya"},
+                 {"name": "Jean"}]
+    vectorstore = FAISS.from_texts(texts, DeterministicFakeEmbedding(size=16), metadatas=metadatas)
+    router = EntityRouter.from_vectorstore(vectorstore, aliases={"amber": {"Amber"}})
+    retriever = HybridRetriever(vectorstore=vectorstore, bm25=BM25Index.build(texts), router=router, k=2,
+                                lexical_budget_ms=None)
+
+    assert router.route("Who is Amber?") == [0, 1]
+    # Two Amber chunks are enough for k=2 and too few for k=3
+    assert {doc.metadata["name"] for doc in retriever.invoke("Who is Amber?")} == {"Amber"}
+    retriever.k = 3
+    assert len(retriever.invoke("Who is Amber?")) == 3
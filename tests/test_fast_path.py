@@ -0,0 +1,63 @@
+import pytest
+
+import fast_path
+
+
+@pytest.fixture(scope="module")
+def store():
+    return fast_path.CharacterAttributeStore.from_file()
+
+
+@pytest.mark.parametrize("question", [
+    "What is the best weapon for Hu Tao?",
+    "Is Bennett stubborn?",
+    "What does Diluc think of the Knights from Mondstadt?",
+    "What constellation should I aim for on Xiangling?",
+    "which pyro character is best for vaporize",
+    "Who is Diluc?",
+])
+def test_opinion_and_narrative_questions_go_to_the_rag_chain(store, question):
+    assert fast_path.classify(question, store) is None
+
+
+@pytest.mark.parametrize("question, column", [
+    ("What weapon does Hu Tao use?", "weapon"),
+    ("When is Bennett's birthday?", "birthday"),
+    ("Where is Diluc from?", "region"),
+    ("What is Xiangling's constellation?", "constellation"),
+])
+def test_attribute_questions(store, question, column):
+    route = fast_path.classify(question, store)
+    assert route is not None and route[0] == "attribute"
+    assert route[2] == [column]
+
+
+def test_list_question(store):
+    route = fast_path.classify("List all pyro bow users", store)
+    assert route == ("list", {"vision": {"pyro"}, "weapon": {"bow"}})
+    assert "Amber" in fast_path.answer("List all pyro bow users", store)
+
+
+@pytest.mark.parametrize("question", [
+    "list the catalyst users from Sumeru",
+    "Which region is Liyue?",
+])
+def test_region_questions_the_table_cannot_answer(store, question):
+    assert fast_path.classify(question, store) is None
+
+
+def test_region_roster(store):
+    route = fast_path.classify("Which characters are from Liyue?", store)
+    assert route == ("list", {"region": {"liyue"}})
+
+
+def test_shared_name_words_are_not_aliases(store):
+    # Both Traveller rows carry the word; neither may answer for it
+    assert fast_path.classify("What is the Traveller's birthday?", store) is None
+
+    shared = fast_path.CharacterAttributeStore([
+        {"name": "Kamisato Ayaka", "birthday": "September 28th"},
+        {"name": "Kamisato Ayato", "birthday": "March 26th"},
+    ])
+    assert fast_path.classify("When is Kamisato's birthday?", shared) is None
+    assert fast_path.classify("When is Ayato's birthday?", shared) == ("attribute", [1], ["birthday"])
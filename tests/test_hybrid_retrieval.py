@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from hybrid_retrieval import BM25Index, HybridRetriever
+
+WORDS = ["amber", "the", "of", "mondstadt", "knight", "bow", "pyro", "diluc", "wine"]
+
+
+@pytest.fixture(scope="module")
+def texts():
+    rng = np.random.default_rng(0)
+    return [" ".join(rng.choice(WORDS, 12)) for _ in range(2000)]
+
+
+@pytest.fixture(scope="module")
+def bm25(texts):
+    return BM25Index.build(texts)
+
+
+def test_routed_search_scores_only_allowed_rows(bm25):
+    allowed = list(range(0, 2000, 37))
+    everything = dict(bm25.search("the amber of bow", k=2000))
+    expected = sorted((everything[row] for row in allowed if row in everything), reverse=True)[:10]
+
+    results = bm25.search("the amber of bow", k=10, allowed_rows=allowed)
+    assert {row for row, _ in results} <= set(allowed)
+    assert np.allclose([score for _, score in results], expected)
+
+
+def test_unknown_terms_return_nothing(bm25):
+    assert bm25.search("xiao", k=5) == []
+
+
+def test_lexical_mode_falls_back_to_dense_search(texts, bm25):
+    vectorstore = FAISS.from_texts(texts, DeterministicFakeEmbedding(size=32))
+    retriever = HybridRetriever(vectorstore=vectorstore, bm25=bm25, mode="lexical", k=3, lexical_budget_ms=None)
+
+    assert len(retriever.invoke("amber bow")) == 3
+    # No query term is in the BM25 vocabulary
+    assert len(retriever.invoke("xiao yaksha")) == 3
@@ -0,0 +1,47 @@
+import time
+
+from langchain_core.documents import Document
+
+from reranker import LexicalScorer, Reranker
+
+
+class SlowScorer(LexicalScorer):
+    """Lexical scores, ``pair_ms`` per pair, and ``cold_ms`` more on the first call."""
+
+    def __init__(self, pair_ms, cold_ms=0.0):
+        super().__init__()
+        self.pair_ms = pair_ms
+        self.cold_ms = cold_ms
+        self.calls = 0
+
+    def score(self, query, texts):
+        time.sleep((self.cold_ms * (self.calls == 0) + self.pair_ms * len(texts)) / 1000)
+        self.calls += 1
+        return super().score(query, texts)
+
+
+DOCS = [Document(page_content=f"Chunk {i} — Summary\nSome text about chunk number {i}.") for i in range(10)]
+
+
+def test_slow_scorer_falls_back_within_the_budget():
+    scorer = SlowScorer(pair_ms=20.0, cold_ms=200.0)
+    reranker = Reranker(scorer, budget_ms=50.0)
+    calls = scorer.calls
+
+    start = time.perf_counter()
+    result = reranker.rerank("Tell me about chunk 7", DOCS, 3)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    assert elapsed < 50.0
+    assert scorer.calls == calls
+    assert result == DOCS[:3]
+    assert reranker.stats()["fallbacks"] == 1
+
+
+def test_cold_start_is_absorbed_by_the_warm_up():
+    scorer = SlowScorer(pair_ms=0.1, cold_ms=200.0)
+    reranker = Reranker(scorer, budget_ms=50.0)
+
+    result = reranker.rerank("Tell me about chunk 7", DOCS, 3)
+    assert result[0] is DOCS[7]
+    assert reranker.stats()["fallbacks"] == 0
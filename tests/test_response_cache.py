@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from response_cache import SemanticResponseCache
+
+
+def unit(*values, dim=4):
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[:len(values)] = values
+    return vector
+
+
+def test_max_entries_must_be_positive():
+    with pytest.raises(ValueError):
+        SemanticResponseCache(dim=4, max_entries=0)
+
+
+def test_near_duplicate_replaces_the_matching_entry():
+    cache = SemanticResponseCache(dim=4, threshold=0.9, max_entries=4)
+    cache.put(unit(1, 0), "Who is Amber?", "An Outrider.")
+    cache.put(unit(1, 0.05), "who is amber", "The Outrider of the Knights.")
+
+    assert cache.stats()["entries"] == 1
+    assert cache.lookup(unit(1, 0)) == "The Outrider of the Knights."
+
+
+def test_distinct_questions_are_kept_and_evicted_lru():
+    cache = SemanticResponseCache(dim=4, threshold=0.9, max_entries=2)
+    cache.put(unit(1, 0), "a", "A")
+    cache.put(unit(0, 1), "b", "B")
+    assert cache.lookup(unit(1, 0)) == "A"
+    cache.put(unit(0, 0, 1), "c", "C")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup(unit(0, 1)) is None
+    assert cache.lookup(unit(1, 0)) == "A"
+    assert cache.lookup(unit(0, 0, 1)) == "C"
+
+
+def test_expired_entries_are_dropped_oldest_first(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("response_cache.time.time", lambda: clock[0])
+    cache = SemanticResponseCache(dim=4, threshold=0.9, ttl=10, max_entries=4)
+    cache.put(unit(1, 0), "a", "A")
+    clock[0] += 6
+    cache.put(unit(0, 1), "b", "B")
+    # A hit moves "a" to the back of the LRU order, but not of the expiry order
+    assert cache.lookup(unit(1, 0)) == "A"
+
+    clock[0] += 6
+    assert cache.lookup(unit(1, 0)) is None
+    assert cache.lookup(unit(0, 1)) == "B"
+    assert cache.stats()["entries"] == 1
+
+    clock[0] += 6
+    assert cache.lookup(unit(0, 1)) is None
+    assert cache.stats()["entries"] == 0